@@ -168,6 +168,7 @@ class Atom(AtomPointer):
         else:
             try:
                 self._ag._data[label][self._index] = data
+                self._ag._selcache = None
             except KeyError:
                 raise AttributeError('data with label {0} must be set for'
                                        ' AtomGroup first'.format(repr(label)))
@@ -270,6 +271,7 @@ for fname, field in ATOMIC_FIELDS.items():
             raise AttributeError('attribute of the AtomGroup is '
                                  'not set')
         array[self._index] = value
+        self._ag._selcache = None
         if none: self._ag._none(none)
     setData = wrapSetMethod(setData)
     setData.__name__ = setMeth
@@ -4,6 +4,7 @@ multiple coordinate sets in :class:`~numpy.ndarray` instances."""
 
 from time import time
 from numbers import Integral
+from collections import OrderedDict
 
 import numpy as np
 
@@ -18,7 +19,8 @@ from .flags import PLANTERS as FLAG_PLANTERS
 from .flags import ALIASES as FLAG_ALIASES
 from .flags import FIELDS as FLAG_FIELDS
 from .atom import Atom
-from .bond import Bond, evalBonds
+from .bond import Bond, evalBonds, evalFragments, splitFragments
+from .bond import COVALENT_RADII
 from .angle import Angle, evalAngles
 from .dihedral import Dihedral, evalDihedrals
 from .crossterm import Crossterm, evalCrossterms
@@ -130,7 +132,7 @@ class AtomGroup(Atomic):
                  '_donors', '_acceptors', '_nbexclusions', '_crossterms',
                  '_cslabels', '_acsi', '_n_csets', '_data',
                  '_fragments', '_flags', '_flagsts', '_subsets',
-                 '_msa', '_sequenceMap']
+                 '_msa', '_sequenceMap', '_selcache']
 
     def __init__(self, title='Unnamed'):
 
@@ -170,6 +172,7 @@ class AtomGroup(Atomic):
         self._subsets = None
         self._msa = None
         self._sequenceMap = None
+        self._selcache = None
 
     def __repr__(self):
 
@@ -438,6 +441,18 @@ class AtomGroup(Atomic):
         else:
             return None
 
+    def _getSelCache(self):
+        """Returns the dictionary where coordinate independent selection
+        results are memoized.  Memoized results are discarded when atomic
+        data, flags, bonds, or flag definitions change."""
+
+        if flags.TIMESTAMP != self._flagsts:
+            self._resetFlags()
+            self._flagsts = flags.TIMESTAMP
+        if self._selcache is None:
+            self._selcache = OrderedDict()
+        return self._selcache
+
     def _getSN2I(self):
         """Returns a mapping of serial numbers to indices."""
 
@@ -825,11 +840,13 @@ class AtomGroup(Atomic):
                 raise ValueError('len(data) must match number of atoms')
 
             self._data[label] = data
+            self._selcache = None
 
     def delData(self, label):
         """Returns data associated with *label* and remove from the instance.
         If data associated with *label* is not found, return **None**."""
 
+        self._selcache = None
         return self._data.pop(label, None)
 
     def getData(self, label):
@@ -941,6 +958,7 @@ class AtomGroup(Atomic):
         if self._flags is None:
             self._flags = {}
             self._subsets = {}
+        self._selcache = None
         for label in FLAG_ALIASES.get(label, [label]):
             self._flags[label] = flags
 
@@ -948,6 +966,7 @@ class AtomGroup(Atomic):
         """Returns flags associated with *label* and remove from the instance.
         If flags associated with *label* is not found, return **None**."""
 
+        self._selcache = None
         return self._flags.pop(label, None)
 
     def _setSubset(self, label, indices):
@@ -999,6 +1018,7 @@ class AtomGroup(Atomic):
     def _resetFlags(self, field=None):
         """Reset flags and subsets associated with *field*."""
 
+        self._selcache = None
         flags = self._flags
         if flags is None:
             return
@@ -1099,6 +1119,7 @@ class AtomGroup(Atomic):
         is empty or **None**, then all bonds will be removed for this 
         :class:`.AtomGroup`. """
 
+        self._selcache = None
         if bonds is None or len(bonds) == 0:
             self._bmap = None
             self._bonds = None
@@ -1142,19 +1163,44 @@ class AtomGroup(Atomic):
             return np.array([Bond(self, bond, acsi) for bond in self._bonds])
         return None
 
-    def inferBonds(self, max_bond=1.6, min_bond=0, set_bonds=True):
-        """Returns bonds based on distances **max_bond** and **min_bond**."""
-
-        bonds = []
-        for atom_i in self.iterAtoms():
-            sele = self.select('index > {0} and exwithin {1} of index {0}'
-                               .format(atom_i.getIndex(), max_bond))
-            if sele is not None:
-                for atom_j in sele.iterAtoms():
-                    distance = getDistance(atom_i.getCoords(),
-                                           atom_j.getCoords())
-                    if distance > min_bond:
-                        bonds.append([atom_i._index, atom_j._index])
+    def inferBonds(self, max_bond=1.6, min_bond=0, set_bonds=True,
+                   tolerance=0.4):
+        """Returns bonds based on distances **max_bond** and **min_bond**.
+        When elements are set, a pair of atoms is bonded only if their
+        distance is also shorter than the sum of their covalent radii plus
+        *tolerance*.  Atoms with unknown elements are bonded using
+        **max_bond** alone.
+
+        :arg max_bond: maximum bond length, default is 1.6 A
+        :type max_bond: float
+
+        :arg min_bond: minimum bond length, default is 0 A
+        :type min_bond: float
+
+        :arg set_bonds: set inferred bonds using :meth:`setBonds`,
+            default is **True**
+        :type set_bonds: bool
+
+        :arg tolerance: added to the sum of covalent radii, default is 0.4 A
+        :type tolerance: float"""
+
+        kdtree = self._getKDTree()
+        if kdtree is None:
+            raise ValueError('coordinates are not set')
+        offsets, indices, distances = kdtree.searchCenters(max_bond,
+                                                           self._getCoords())
+        rows = np.repeat(np.arange(self._n_atoms), np.diff(offsets))
+        which = (indices > rows) & (distances > min_bond)
+        rows, indices, distances = rows[which], indices[which], distances[which]
+
+        radii = self._getCovalentRadii()
+        if radii is not None:
+            cutoffs = radii[rows] + radii[indices] + tolerance
+            which = ~(distances > cutoffs)
+            rows, indices = rows[which], indices[which]
+
+        order = np.lexsort((indices, rows))
+        bonds = np.array([rows[order], indices[order]]).T
 
         if set_bonds:
             self.setBonds(bonds)
@@ -1162,6 +1208,18 @@ class AtomGroup(Atomic):
         acsi = self._acsi
         return np.array([Bond(self, bond, acsi) for bond in bonds])
 
+    def _getCovalentRadii(self):
+        """Returns covalent radii of atoms based on their elements, **nan**
+        for unknown elements, or **None** if elements are not set."""
+
+        elements = self._getData('element')
+        if elements is None:
+            return None
+        elements, inverse = np.unique(elements, return_inverse=True)
+        radii = np.array([COVALENT_RADII.get(str(element).upper(), np.nan)
+                          for element in elements])
+        return radii[inverse]
+
     def iterBonds(self):
         """Yield bonds.  Use :meth:`setBonds` or `inferBonds` for setting bonds."""
 
@@ -1203,6 +1261,7 @@ class AtomGroup(Atomic):
         angles = angles[angles[:, 1].argsort(), ]
         angles = angles[angles[:, 0].argsort(), ]
 
+        self._selcache = None
         self._angmap, self._data['numangles'] = evalAngles(angles, n_atoms)
         self._angles = angles
 
@@ -1263,6 +1322,7 @@ class AtomGroup(Atomic):
         dihedrals = dihedrals[dihedrals[:, 1].argsort(), ]
         dihedrals = dihedrals[dihedrals[:, 0].argsort(), ]
 
+        self._selcache = None
         self._dmap, self._data['numdihedrals'] = evalDihedrals(
             dihedrals, n_atoms)
         self._dihedrals = dihedrals
@@ -1324,6 +1384,7 @@ class AtomGroup(Atomic):
         impropers = impropers[impropers[:, 1].argsort(), ]
         impropers = impropers[impropers[:, 0].argsort(), ]
 
+        self._selcache = None
         self._imap, self._data['numimpropers'] = evalImpropers(
             impropers, n_atoms)
         self._impropers = impropers
@@ -1391,6 +1452,7 @@ class AtomGroup(Atomic):
         donors = donors[donors[:, 0].argsort(), ]
         donors = np.unique(donors, axis=0)
 
+        self._selcache = None
         self._domap, self._data['numdonors'] = evalDonors(donors, n_atoms)
         self._donors = donors
 
@@ -1457,6 +1519,7 @@ class AtomGroup(Atomic):
         acceptors = acceptors[acceptors[:, 0].argsort(), ]
         acceptors = np.unique(acceptors, axis=0)
 
+        self._selcache = None
         self._acmap, self._data['numacceptors'] = evalAcceptors(acceptors, n_atoms)
         self._acceptors = acceptors
 
@@ -1523,6 +1586,7 @@ class AtomGroup(Atomic):
         nbexclusions = nbexclusions[nbexclusions[:, 0].argsort(), ]
         nbexclusions = np.unique(nbexclusions, axis=0)
 
+        self._selcache = None
         self._nbemap, self._data['numnbexclusions'] = evalNBExclusions(
             nbexclusions, n_atoms)
         self._nbexclusions = nbexclusions
@@ -1584,6 +1648,7 @@ class AtomGroup(Atomic):
         crossterms = crossterms[crossterms[:, 1].argsort(), ]
         crossterms = crossterms[crossterms[:, 0].argsort(), ]
 
+        self._selcache = None
         self._cmap, self._data['numcrossterms'] = evalCrossterms(
             crossterms, n_atoms)
         self._crossterms = crossterms
@@ -1651,51 +1716,9 @@ class AtomGroup(Atomic):
             raise ValueError('bonds must be set for fragment determination, '
                              'use `setBonds` or `inferBonds` to set them')
 
-        fids = np.zeros(self._n_atoms, int)
-        fdict = {}
-        c = 0
-        for a, b in self._bonds:
-            af = fids[a]
-            bf = fids[b]
-            if af and bf:
-                if af != bf:
-                    frag = fdict[af]
-                    temp = fdict[bf]
-                    fids[temp] = af
-                    frag.extend(temp)
-                    fdict.pop(bf)
-            elif af:
-                fdict[af].append(b)
-                fids[b] = af
-            elif bf:
-                fdict[bf].append(a)
-                fids[a] = bf
-            else:
-                c += 1
-                fdict[c] = [a, b]
-                fids[a] = fids[b] = c
-        fragindices = np.zeros(self._n_atoms, int)
-        fragments = []
-        append = fragments.append
-        fidset = set()
-        c = 0
-        for i, fid in enumerate(fids):
-            if fid in fidset:
-                continue
-            elif fid:
-                fidset.add(fid)
-                indices = fdict[fid]
-                indices.sort()
-                append(indices)
-                fragindices[indices] = c
-                c += 1
-            else:
-                # these are non-bonded atoms, e.g. ions
-                fragindices[i] = c
-                append([i])
-                c += 1
+        fragindices = evalFragments(self._bonds, self._n_atoms)
         self._data['fragindex'] = fragindices
-        self._fragments = fragments
+        self._fragments = splitFragments(fragindices)
 
 
 for fname, field in ATOMIC_FIELDS.items():
@@ -1753,6 +1776,7 @@ for fname, field in ATOMIC_FIELDS.items():
         else:
             if np.isscalar(array):
                 self._data[var][:] = array
+                self._selcache = None
             else:
                 if self._n_atoms == 0:
                     self._n_atoms = len(array)
@@ -1784,6 +1808,7 @@ for fname, field in ATOMIC_FIELDS.items():
                         raise ValueError('array cannot be assigned type '
                                          '{0}'.format(dtype))
                 self._data[var] = array
+                self._selcache = None
                 if none:
                     self._none(none)
                 if flags and self._flags:
@@ -7,6 +7,16 @@ import numpy as np
 
 __all__ = ['Bond']
 
+COVALENT_RADII = {
+    'H': 0.31, 'HE': 0.28, 'LI': 1.28, 'BE': 0.96, 'B': 0.84, 'C': 0.76,
+    'N': 0.71, 'O': 0.66, 'F': 0.57, 'NE': 0.58, 'NA': 1.66, 'MG': 1.41,
+    'AL': 1.21, 'SI': 1.11, 'P': 1.07, 'S': 1.05, 'CL': 1.02, 'AR': 1.06,
+    'K': 2.03, 'CA': 1.76, 'MN': 1.39, 'FE': 1.32, 'CO': 1.26, 'NI': 1.24,
+    'CU': 1.32, 'ZN': 1.22, 'SE': 1.20, 'BR': 1.20, 'I': 1.39,
+}
+"""Covalent radii (A) of common elements from Cordero et al. *Dalton Trans*
+2008 (21):2832-2838, used by :meth:`.AtomGroup.inferBonds`."""
+
 class Bond(object):
 
     """A pointer class for bonded atoms.  Following built-in functions are
@@ -119,24 +129,68 @@ def evalBonds(bonds, n_atoms):
     """Returns an array mapping atoms to their bonded neighbors and an array
     that stores number of bonds made by each atom."""
 
-    numbonds = np.bincount(bonds.reshape((bonds.shape[0] * 2)))
+    atoms = bonds.ravel()
+    numbonds = np.bincount(atoms, minlength=n_atoms)
     bmap = np.zeros((n_atoms, numbonds.max()), int)
     bmap.fill(-1)
-    index = np.zeros(n_atoms, int)
-    for bond in bonds:
-        a, b = bond
-        bmap[a, index[a]] = b
-        bmap[b, index[b]] = a
-        index[bond] += 1
+    # neighbors of an atom are listed in the order bonds are given
+    order = atoms.argsort(kind='stable')
+    atoms = atoms[order]
+    starts = np.cumsum(numbonds) - numbonds
+    bmap[atoms, np.arange(len(atoms)) - starts[atoms]] = \
+        bonds[:, ::-1].ravel()[order]
     return bmap, numbonds
 
 
 def trimBonds(bonds, indices):
     """Returns bonds between atoms at given indices."""
 
-    iset = set(indices)
-    bonds = [bond for bond in bonds if bond[0] in iset and bond[1] in iset]
-    if bonds:
+    indices = np.asarray(indices)
+    bonds = np.asarray(bonds)
+    if not len(indices) or not len(bonds):
+        return None
+    mask = np.zeros(max(indices.max(), bonds.max()) + 1, bool)
+    mask[indices] = True
+    bonds = bonds[mask[bonds[:, 0]] & mask[bonds[:, 1]]]
+    if len(bonds):
         newindices = np.zeros(indices.max()+1, int)
         newindices[indices] = np.arange(len(indices))
-        return newindices[np.array(bonds)]
+        return newindices[bonds]
+
+
+def evalFragments(bonds, n_atoms):
+    """Returns an array of fragment indices, i.e. connected atom subsets
+    numbered in the order of their lowest atom index.  Atoms that do not
+    make any bonds form fragments on their own."""
+
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    bonds = np.asarray(bonds)
+    if not len(bonds):
+        return np.arange(n_atoms)
+    graph = coo_matrix((np.ones(len(bonds), bool), (bonds[:, 0], bonds[:, 1])),
+                       shape=(n_atoms, n_atoms))
+    labels = connected_components(graph, directed=False)[1]
+    firsts = np.unique(labels, return_index=True)[1]
+    fragindices = np.zeros(len(firsts), int)
+    fragindices[labels[np.sort(firsts)]] = np.arange(len(firsts))
+    return fragindices[labels]
+
+
+def splitFragments(fragindices, indices=None):
+    """Returns a list of sorted arrays of atom *indices* that belong to the
+    same fragment, in the order fragments first appear in *indices*."""
+
+    if indices is None:
+        indices = np.arange(len(fragindices))
+    else:
+        indices = np.asarray(indices)
+    fids = fragindices[indices]
+    firsts, inverse = np.unique(fids, return_index=True,
+                                return_inverse=True)[1:]
+    ranks = np.zeros(len(firsts), int)
+    ranks[firsts.argsort()] = np.arange(len(firsts))
+    ranks = ranks[inverse]
+    order = np.lexsort((indices, ranks))
+    return np.split(indices[order], np.cumsum(np.bincount(ranks))[:-1])
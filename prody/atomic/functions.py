@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 """This module defines some functions for handling atomic classes and data."""
 
+import os
+from os.path import isdir, join
 from textwrap import wrap
 
-from numpy import load, savez, ones, zeros, array, argmin, where
+from numpy import load, save, savez, ones, zeros, array, argmin, where, dtype
 from numpy import ndarray, asarray, isscalar, concatenate, arange, ix_
 
 from prody.utilities import openFile, rangeString, getDistance, fastin
+from prody.utilities import makePath
 from prody import LOGGER
 
 from . import flags
@@ -15,7 +18,7 @@ from . import select
 from .atomic import Atomic
 from .atomgroup import AtomGroup
 from .atommap import AtomMap
-from .bond import trimBonds, evalBonds
+from .bond import trimBonds, evalBonds, evalFragments, splitFragments
 from .fields import ATOMIC_FIELDS
 from .selection import Selection
 from .hierview import HierView
@@ -35,7 +38,12 @@ def saveAtoms(atoms, filename=None, **kwargs):
     accepted as *atoms* argument.  This function saves user set atomic data as
     well.  Note that title of the :class:`.AtomGroup` instance is used as the
     filename when *atoms* is not an :class:`.AtomGroup`.  To avoid overwriting
-    an existing file with the same name, specify a *filename*."""
+    an existing file with the same name, specify a *filename*.
+
+    When ``memmap=True`` is passed, *atoms* are saved in a :file:`.ag`
+    directory instead, where each data, flag, bond and coordinate array is
+    a separate uncompressed :file:`.npy` file, so that :func:`loadAtoms` can
+    memory map them."""
 
     try:
         atoms.getACSIndex()
@@ -53,9 +61,13 @@ def saveAtoms(atoms, filename=None, **kwargs):
         SKIP = SAVE_SKIP_POINTER
         title = str(atoms)
 
+    memmap = kwargs.pop('memmap', False)
     if filename is None:
         filename = ag.getTitle().replace(' ', '_')
-    if '.ag.npz' not in filename:
+    if memmap:
+        if not filename.endswith('.ag'):
+            filename += '.ag'
+    elif '.ag.npz' not in filename:
         filename += '.ag.npz'
 
     attr_dict = {'title': title}
@@ -91,6 +103,16 @@ def saveAtoms(atoms, filename=None, **kwargs):
             continue
         attr_dict[label] = atoms._getFlags(label)
 
+    if memmap:
+        if isdir(filename):
+            for name in os.listdir(filename):
+                if name.endswith('.npy'):
+                    os.remove(join(filename, name))
+        makePath(filename)
+        for label, value in attr_dict.items():
+            save(join(filename, label + '.npy'), value)
+        return filename
+
     ostream = openFile(filename, 'wb', **kwargs)
     savez(ostream, **attr_dict)
     ostream.close()
@@ -102,22 +124,39 @@ SKIPLOAD = set(['title', 'n_atoms', 'n_csets', 'bonds', 'bmap',
                 'segindex', 'chindex', 'resindex'])
 
 
-def loadAtoms(filename):
+def loadAtoms(filename, **kwargs):
     """Returns :class:`.AtomGroup` instance loaded from *filename* using
-    :func:`numpy.load` function.  See also :func:`saveAtoms`."""
+    :func:`numpy.load` function.  See also :func:`saveAtoms`.
+
+    Arrays in a :file:`.ag` directory saved using ``memmap=True`` are memory
+    mapped, so that coordinates and data are read from disk when they are
+    accessed.  By default, arrays are mapped copy-on-write, so that changes
+    to the atom group are not written to the files.
+
+    :arg mmap_mode: mode for memory mapping arrays in a :file:`.ag`
+        directory, default is ``'c'``, **None** reads arrays into memory
+    :type mmap_mode: str"""
 
     LOGGER.timeit('_prody_loadatoms')
-    attr_dict = load(filename)
-    files = set(attr_dict.files)
+    if isdir(filename):
+        mmap_mode = kwargs.get('mmap_mode', 'c')
+        attr_dict = {}
+        for name in os.listdir(filename):
+            if name.endswith('.npy'):
+                attr_dict[name[:-4]] = _loadArray(join(filename, name),
+                                                  mmap_mode)
+    else:
+        attr_dict = load(filename)
+    files = set(attr_dict)
 
     if not 'n_atoms' in files:
         raise ValueError('{0} is not a valid atomic data file'
                          .format(repr(filename)))
     title = str(attr_dict['title'])
 
+    ag = AtomGroup(title)
     if 'coordinates' in files:
         coords = attr_dict['coordinates']
-        ag = AtomGroup(title)
         ag._n_csets = int(attr_dict['n_csets'])
         ag._coords = coords
     ag._n_atoms = int(attr_dict['n_atoms'])
@@ -141,6 +180,10 @@ def loadAtoms(filename):
             else:
                 ag._setFlags(label, data)
                 skip_flags.update(flags.ALIASES.get(label, [label]))
+        elif _isFieldArray(label, data):
+            # arrays saved from an atom group already have field dtypes, so
+            # they are used as they are, e.g. without copying memory maps
+            ag._data[label] = data
         else:
             ag.setData(label, data)
 
@@ -158,6 +201,32 @@ def loadAtoms(filename):
     return ag
 
 
+def _loadArray(filename, mmap_mode):
+    """Returns array in *filename*, memory mapped unless it is empty or a
+    scalar."""
+
+    try:
+        array = load(filename, mmap_mode=mmap_mode)
+    except ValueError:
+        return load(filename)
+    if array.ndim == 0 or not array.size:
+        return load(filename)
+    return array
+
+
+def _isFieldArray(label, data):
+    """Returns **True** if *data* can be stored for atomic field *label*
+    without conversion."""
+
+    field = ATOMIC_FIELDS.get(label)
+    if field is None or data.ndim != field.ndim:
+        return False
+    field_dtype = dtype(field.dtype)
+    if label == 'chain':
+        return data.dtype.kind == field_dtype.kind
+    return data.dtype == field_dtype
+
+
 def iterFragments(atoms):
     """Yield fragments, connected subsets in *atoms*, as :class:`.Selection`
     instances."""
@@ -172,50 +241,18 @@ def iterFragments(atoms):
     except AttributeError:
         raise TypeError('atoms must be an Atomic instance')
 
-    bonds = atoms._iterBonds()
-    return _iterFragments(atoms, ag, bonds)
+    return _iterFragments(atoms, ag, ag._bonds)
 
 
 def _iterFragments(atoms, ag, bonds):
 
-    fids = zeros((len(ag)), int)
-    fdict = {}
-    c = 0
-    for a, b in bonds:
-        af = fids[a]
-        bf = fids[b]
-        if af and bf:
-            if af != bf:
-                frag = fdict[af]
-                temp = fdict[bf]
-                fids[temp] = af
-                frag.extend(temp)
-                fdict.pop(bf)
-        elif af:
-            fdict[af].append(b)
-            fids[b] = af
-        elif bf:
-            fdict[bf].append(a)
-            fids[a] = bf
-        else:
-            c += 1
-            fdict[c] = [a, b]
-            fids[a] = fids[b] = c
-    fragments = []
-    append = fragments.append
-    fidset = set()
+    if bonds is None:
+        raise ValueError('bonds are not set, use `setBonds` or `inferBonds`')
     indices = atoms._getIndices()
-    for i, fid in zip(indices, fids[indices]):
-        if fid in fidset:
-            continue
-        elif fid:
-            fidset.add(fid)
-            indices = fdict[fid]
-            indices.sort()
-            append(indices)
-        else:
-            # these are non-bonded atoms, e.g. ions
-            append([i])
+    within = zeros(len(ag), bool)
+    within[indices] = True
+    bonds = bonds[within[bonds[:, 0]] & within[bonds[:, 1]]]
+    fragments = splitFragments(evalFragments(bonds, len(ag)), indices)
 
     acsi = atoms.getACSIndex()
     for indices in fragments:
@@ -441,7 +441,7 @@ all alphanumeric characters."""
 
 import sys
 from re import compile as re_compile
-from collections import Iterable
+from collections import Iterable, OrderedDict
 
 import numpy as np
 from numpy import array, ndarray, ones, zeros, arange
@@ -797,6 +797,65 @@ PP_NRANGE.setParseAction(rangeParseAction)
 
 UNARY = set(['not', 'bonded', 'exbonded', 'within', 'exwithin', 'same'])
 
+# number of parsed selection strings kept for reuse
+COMPILED_SIZE = 256
+COMPILED = OrderedDict()
+
+# number of coordinate independent results kept for an atom group
+MEMO_SIZE = 64
+
+
+class SelectionNode(object):
+
+    """A parse action call recorded when compiling a selection string.  A
+    node is evaluated by calling :class:`Select` method *method* with the
+    recorded *tokens*, after replacing child nodes in them with their values.
+    Nodes that do not depend on coordinates are marked *static*, and *key*
+    identifies them across selection strings."""
+
+    __slots__ = ['method', 'loc', 'tokens', 'key', 'static']
+
+    def __init__(self, method, loc, tokens):
+
+        self.method = method
+        self.loc = loc
+        self.tokens = tokens
+        key, self.static = _describeTokens(tokens)
+        self.key = (method, key)
+
+    def __repr__(self):
+
+        return '<SelectionNode: {0} {1}>'.format(self.method, self.tokens)
+
+
+def _describeTokens(tokens):
+    """Returns a hashable key for *tokens* and whether they are independent of
+    coordinates."""
+
+    keys = []
+    static = True
+    for token in tokens:
+        if isinstance(token, SelectionNode):
+            keys.append(token.key)
+            static = static and token.static
+        elif isinstance(token, list):
+            key, flag = _describeTokens(token)
+            keys.append(key)
+            static = static and flag
+        else:
+            keys.append(token)
+            if isinstance(token, str) and token in XYZDIST:
+                static = False
+    return tuple(keys), static
+
+
+def _recordAction(method):
+    """Returns a parse action that records a call to *method*."""
+
+    def action(sel, loc, tokens):
+        return SelectionNode(method, loc, tokens.asList())
+    return action
+
 
 class Select(object):
 
@@ -818,6 +877,7 @@ class Select(object):
         self._ss2idx = False
         self._data = dict()
         self._replace = False
+        self._memo = None
 
         self._parsers = {}
 
@@ -837,6 +897,7 @@ class Select(object):
         self._indices = None
         self._n_atoms = None
         self._coords = None
+        self._memo = None
         self._data.clear()
 
     def _evalAtoms(self, atoms):
@@ -990,12 +1051,46 @@ class Select(object):
                                      'user data label')
 
         selstr = replaceMacros(selstr)
+        tree = self._compile(selstr)
+        if DEBUG: print('_evalSelstr', tree)
+        if self._indices is None and not kwargs:
+            self._memo = self._ag._getSelCache()
+        if isinstance(tree, SelectionNode):
+            torf = self._evalNode(selstr, tree)
+        else:
+            torf = tree
+
+        if not isinstance(torf, ndarray):
+            if DEBUG: print(torf)
+            raise SelectionError(selstr)
+        elif torf.dtype != bool:
+            if DEBUG:
+                print('_select torf.dtype', torf.dtype, isinstance(torf.dtype,
+                                                                   bool))
+            raise SelectionError(selstr)
+        if DEBUG:
+            print('_select', torf)
+        return torf
+
+    def _compile(self, selstr):
+        """Returns the tree of :class:`SelectionNode` instances parsed from
+        *selstr*.  Trees are kept in an LRU cache shared by all instances,
+        so each selection string is parsed once.  Macros are replaced before
+        compiling, so that the cache follows changes in macro definitions."""
+
+        try:
+            tree = COMPILED.pop(selstr)
+        except KeyError:
+            pass
+        else:
+            COMPILED[selstr] = tree
+            return tree
+
         try:
             parser = self._getParser(selstr)
             tokens = parser(selstr, parseAll=True)
         except pp.ParseException as err:
             self._parsers.pop(self._parser, None)
-            pass
             which = selstr.rfind(' ', 0, err.column)
             if which > -1:
                 if selstr[which + 1] == '(':
@@ -1010,21 +1105,50 @@ class Select(object):
                 msg = 'parsing failed here'
 
             raise SelectionError(selstr, err.column, msg + '\n' + str(err))
-        else:
-            if DEBUG: print('_evalSelstr', tokens)
-            torf = tokens[0]
 
-        if not isinstance(torf, ndarray):
-            if DEBUG: print(torf)
-            raise SelectionError(selstr)
-        elif torf.dtype != bool:
-            if DEBUG:
-                print('_select torf.dtype', torf.dtype, isinstance(torf.dtype,
-                                                                   bool))
-            raise SelectionError(selstr)
-        if DEBUG:
-            print('_select', torf)
-        return torf
+        tree = tokens[0]
+        COMPILED[selstr] = tree
+        while len(COMPILED) > COMPILED_SIZE:
+            COMPILED.popitem(last=False)
+        return tree
+
+    def _evalNode(self, sel, node):
+        """Returns the value of *node*.  Boolean results of static nodes are
+        memoized for the atom group, when whole atom groups are evaluated."""
+
+        memo = self._memo if node.static else None
+        if memo is not None:
+            try:
+                torf = memo.pop(node.key)
+            except KeyError:
+                pass
+            else:
+                memo[node.key] = torf
+                return torf.copy()
+
+        value = getattr(self, node.method)(sel, node.loc,
+                                           self._evalTokens(sel, node.tokens))
+        if memo is not None:
+            self._memoize(node.key, value)
+        return value
+
+    def _evalTokens(self, sel, tokens):
+        """Returns a new list of *tokens* where nodes are replaced with their
+        values."""
+
+        return [self._evalNode(sel, token) if isinstance(token, SelectionNode)
+                else self._evalTokens(sel, token) if isinstance(token, list)
+                else token for token in tokens]
+
+    def _memoize(self, key, torf):
+        """Store a copy of boolean array *torf* in the memo."""
+
+        memo = self._memo
+        if (memo is not None and isinstance(torf, ndarray) and
+            torf.dtype == bool):
+            memo[key] = torf.copy()
+            while len(memo) > MEMO_SIZE:
+                memo.popitem(last=False)
 
     def _getParser(self, selstr):
         """Returns an efficient parser that can handle *selstr*."""
@@ -1063,22 +1187,24 @@ class Select(object):
 
         oplist = []
         if funcs:
-            oplist.append((FUNCNAMES_OPLIST, 1, pp.opAssoc.RIGHT, self._func))
+            oplist.append((FUNCNAMES_OPLIST, 1, pp.opAssoc.RIGHT,
+                           _recordAction('_func')))
             # following causes 20% slow down
             #word += FUNCNAMES_EXPR
 
         if funcs or opers:
             oplist.extend([
-                (pp.oneOf('+ -'), 1, pp.opAssoc.RIGHT, self._sign),
-                (pp.oneOf('** ^'), 2, pp.opAssoc.LEFT, self._pow),
-                (pp.oneOf('* / %'), 2, pp.opAssoc.LEFT, self._binop),
-                (pp.oneOf('+ -'), 2, pp.opAssoc.LEFT, self._binop),
+                (pp.oneOf('+ -'), 1, pp.opAssoc.RIGHT, _recordAction('_sign')),
+                (pp.oneOf('** ^'), 2, pp.opAssoc.LEFT, _recordAction('_pow')),
+                (pp.oneOf('* / %'), 2, pp.opAssoc.LEFT,
+                 _recordAction('_binop')),
+                (pp.oneOf('+ -'), 2, pp.opAssoc.LEFT, _recordAction('_binop')),
                 (pp.oneOf('< > <= >= == = !='), 2, pp.opAssoc.LEFT,
-                 self._comp)])
+                 _recordAction('_comp'))])
 
         oplist.extend([
-          (pp.Optional(AND), 2, pp.opAssoc.LEFT, self._and),
-          (OR, 2, pp.opAssoc.LEFT, self._or)])
+          (pp.Optional(AND), 2, pp.opAssoc.LEFT, _recordAction('_and')),
+          (OR, 2, pp.opAssoc.LEFT, _recordAction('_or'))])
 
         word += WORD
 
@@ -1088,7 +1214,7 @@ class Select(object):
         if nrange: expr = PP_NRANGE | expr
 
         parser = pp.operatorPrecedence(expr, oplist)
-        parser.setParseAction(self._default)
+        parser.setParseAction(_recordAction('_default'))
         parser.leaveWhitespace()
         parser.enablePackrat()
         self._parsers[key] = parser, expr, oplist
@@ -1097,7 +1223,7 @@ class Select(object):
     def _noParser(self, selstr, parseAll=True):
 
         debug(selstr, 0, ['_noParser'])
-        return [self._default(selstr, 0, selstr.split())]
+        return [SelectionNode('_default', 0, selstr.split())]
 
     def _getZeros(self, subset=None):
         """Returns a bool array with zero elements."""
@@ -1540,11 +1666,28 @@ class Select(object):
         if not which:
             return None, SelectionError(sel, loc, '{0} must be followed by '
                 .format(repr(' '.join(what))), what)
-        if len(which) == 1:
-            which, err = self._eval(sel, loc, which)
+        # operands of within, bonded, etc. made of plain words are memoized,
+        # so that "within 5 of resname LIG" only repeats the distance search
+        memo = self._memo
+        key = None
+        if memo is not None:
+            key = ('_unary', tuple(which))
+            for token in which:
+                if not isinstance(token, str) or token in XYZDIST:
+                    key = None
+                    break
+        if key is not None and key in memo:
+            torf = memo.pop(key)
+            memo[key] = torf
+            which = torf.copy()
         else:
-            which, err = self._and2(sel, loc, which)
-        if err: raise err
+            if len(which) == 1:
+                which, err = self._eval(sel, loc, which)
+            else:
+                which, err = self._and2(sel, loc, which)
+            if err: raise err
+            if key is not None:
+                self._memoize(key, which)
 
         tokens = [what, which]
         if what[0] == 'not':
@@ -1627,14 +1770,8 @@ class Select(object):
 
         if other or len(which) < 20:
             kdtree = self._atoms._getKDTree()
-            get_indices = kdtree.getIndices
-            search = kdtree.search
-            get_count = kdtree.getCount
             torf = zeros(self._ag.numAtoms(), bool)
-            for index in which:
-                search(within, coords[index])
-                if get_count():
-                    torf[get_indices()] = True
+            torf[kdtree.searchCenters(within, coords[which])[1]] = True
             if self._indices is not None:
                 torf = torf[self._indices]
             if exclude:
@@ -1649,16 +1786,8 @@ class Select(object):
 
             cxyz = coords[check]
             kdtree = KDTree(coords[which])
-            search = kdtree.search
-            get_count = kdtree.getCount
-            select = []
-            append = select.append
-            for i, xyz in enumerate(cxyz):
-                search(within, xyz)
-                if get_count():
-                    append(i)
-
-            torf[check[select]] = True
+            offsets = kdtree.searchCenters(within, cxyz)[0]
+            torf[check[offsets[1:] > offsets[:-1]]] = True
             if not exclude:
                 torf[which] = True
 
@@ -144,6 +144,7 @@ class AtomSubset(AtomPointer):
         else:
             try:
                 self._ag._data[label][self._indices] = data
+                self._ag._selcache = None
             except KeyError:
                 raise AttributeError('data with label {0} must be set for '
                                      'AtomGroup first'.format(repr(label)))
@@ -167,6 +168,7 @@ class AtomSubset(AtomPointer):
             raise AttributeError('flags with label {0} must be set for '
                                     'AtomGroup first'.format(repr(label)))
         flags[self._indices] = value
+        self._ag._selcache = None
 
 
 for fname, field in ATOMIC_FIELDS.items():
@@ -197,6 +199,7 @@ for fname, field in ATOMIC_FIELDS.items():
         if array is None:
             raise AttributeError(var + ' data is not set')
         array[self._indices] = value
+        self._ag._selcache = None
         if none: self._ag._none(none)
     setData = wrapSetMethod(setData)
     setData.__name__ = setMeth
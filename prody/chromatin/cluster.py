@@ -324,12 +324,11 @@ def calcGNMDomains(modes, method=Discretize, **kwargs):
     if isinstance(model, MaskedGNM):
         currlbl = labels[0]
         labels = model._extend(labels, -1)
-        
-        for i, l in enumerate(labels):
-            if l < 0:
-                labels[i] = currlbl
-            elif currlbl != l:
-                currlbl = l
+
+        # unmapped loci take the label of the closest mapped locus before them
+        mapped = labels >= 0
+        last = np.maximum.accumulate(np.where(mapped, np.arange(len(labels)), 0))
+        labels = np.where(mapped[last], labels[last], currlbl)
 
     return labels
     
\ No newline at end of file
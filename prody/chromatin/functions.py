@@ -149,8 +149,7 @@ def _getEigvecs(modes, row_norm=False, dummy_mode=False):
     # normalize the rows so that feature vectors are unit vectors
     if row_norm:
         norms = la.norm(V, axis=1)
-        N = np.diag(div0(1., norms))
-        V = np.dot(N, V)
+        V = V * div0(1., norms)[:, np.newaxis]
 
     return V
 
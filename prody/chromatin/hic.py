@@ -2,7 +2,7 @@ from numbers import Integral
 
 from numpy import ma
 import numpy as np
-from scipy.sparse import coo_matrix
+from scipy.sparse import coo_matrix, csr_matrix, issparse, diags, triu
 from scipy.stats import mode
 from prody.chromatin.norm import VCnorm, SQRTVCnorm, Filenorm
 from prody.chromatin.functions import div0, showDomains, _getEigvecs
@@ -21,6 +21,9 @@ class HiC(object):
 
     """This class is used to store and preprocess Hi-C contact map. A :class:`.GNM`
     instance for analyzing the contact map can be also created by using this class.
+    The contact map may be a :class:`numpy.ndarray` or a sparse matrix, which is
+    kept in compressed sparse row format, so that high-resolution maps are never
+    converted to dense arrays.
     """
 
     def __init__(self, title='Unknown', map=None, bin=None):
@@ -44,18 +47,21 @@ class HiC(object):
         if value is None: 
             self._map = None
         else:
-            self._map = np.asarray(value)
-            self._map = makeSymmetric(self._map)
+            if issparse(value):
+                self._map = makeSymmetric(value.tocsr())
+            else:
+                self._map = np.asarray(value)
+                self._map = makeSymmetric(self._map)
             self._maskUnmappedRegions()
-            self._labels = np.zeros(len(self._map), dtype=int)
+            self._labels = np.zeros(self._map.shape[0], dtype=int)
 
     def __repr__(self):
         mask = self.mask
         
         if np.isscalar(mask):
-            return '<HiC: {0} ({1} loci)>'.format(self._title, len(self._map))
+            return '<HiC: {0} ({1} loci)>'.format(self._title, self._map.shape[0])
         else:
-            return '<HiC: {0} ({1} mapped loci; {2} in total)>'.format(self._title, np.count_nonzero(mask), len(self._map))
+            return '<HiC: {0} ({1} mapped loci; {2} in total)>'.format(self._title, np.count_nonzero(mask), self._map.shape[0])
 
     def __str__(self):
 
@@ -63,7 +69,10 @@ class HiC(object):
 
     def __getitem__(self, index):
         if isinstance(index, Integral):
-            return self.map.flatten()[index]
+            M = self.map
+            if issparse(M):
+                return M[divmod(index, M.shape[1])]
+            return M.flatten()[index]
         else:
             i, j = index
             return self.map[i,j]
@@ -72,12 +81,17 @@ class HiC(object):
         mask = self.mask 
         
         if np.isscalar(mask):
-            return len(self._map)
+            return self._map.shape[0]
         else:
             return np.count_nonzero(mask)
     
     def numAtoms(self):
-        return len(self.map)
+        return self.map.shape[0]
+
+    def isSparse(self):
+        """Returns **True** if the contact map is stored as a sparse matrix."""
+
+        return issparse(self._map)
 
     def getTitle(self):
         """Returns title of the instance."""
@@ -102,6 +116,9 @@ class HiC(object):
         if np.isscalar(self.mask):
             return self._map
 
+        if issparse(self._map):
+            return self._map[self.mask][:, self.mask]
+
         M = ma.array(self._map)
         M.mask = np.diag(~self.mask)
         return ma.compress_rowcols(M)
@@ -187,7 +204,13 @@ class HiC(object):
             return None
         else:
             M = self.map
-            
+
+            if issparse(M):
+                A = (M - diags(M.diagonal())).astype(float)
+                A.eliminate_zeros()
+                D = diags(np.asarray(A.sum(axis=0)).ravel())
+                return (D - A).tocsr()
+
             I = np.eye(M.shape[0], dtype=bool)
             A = M.copy()
             A[I] = 0.
@@ -201,7 +224,9 @@ class HiC(object):
         M = self._map
         if M is None: return
 
-        if diag:
+        if issparse(M):
+            d = M.diagonal() if diag else np.asarray(M.sum(0)).ravel()
+        elif diag:
             # Obtain the diagonal values, need to make sure d is an array 
             # instead of a matrix, otherwise diag() later will not work as 
             # intended.
@@ -221,10 +246,14 @@ class HiC(object):
     
     def calcGNM(self, n_modes=None, **kwargs):
         """Calculates GNM on the current Hi-C map. By default, ``n_modes`` is 
-        set to **None** and ``zeros`` to **True**."""
+        set to **None** and ``zeros`` to **True**. For sparse maps, the sparse
+        Kirchhoff matrix is passed to an iterative eigensolver and ``n_modes``
+        defaults to 20, since calculating all modes requires a dense matrix."""
 
         if 'zeros' not in kwargs:
             kwargs['zeros'] = True
+        if n_modes is None and self.isSparse():
+            n_modes = 20
             
         if self.masked:
             gnm = MaskedGNM(self._title, self.mask)
@@ -328,6 +357,8 @@ class HiC(object):
                 dm_kwargs[k[7:]] = kwargs.pop(k)
 
         M = self.map
+        if issparse(M):
+            M = M.toarray()
         if 'p' in spec:
             p = kwargs.pop('p', 5)
             lp = kwargs.pop('lp', p)
@@ -389,57 +420,100 @@ def parseHiC(filename, **kwargs):
 
     return hic
 
-def _sparse2dense(I, J, values, bin=None):
+def _sparse2csr(I, J, values, bin=None):
     I = np.asarray(I, dtype=int)
     J = np.asarray(J, dtype=int)
     values = np.asarray(values, dtype=float)
     # determine the bin size by the most frequent interval
     if bin is None:
-        loci = np.unique(np.sort(I))
+        loci = np.unique(I)
         bins = np.diff(loci)
         bin = mode(bins)[0][0]
     # convert coordinate from basepair to locus index
     bin = int(bin)
     I = I // bin
     J = J // bin
-    # make sure that the matrix is square
-    # if np.max(I) != np.max(J):
-    #     b = np.max(np.append(I, J))
-    #     I = np.append(I, b)
-    #     J = np.append(J, b)
-    #     values = np.append(values, 0.)
-    # Convert to sparse matrix format, then full matrix format
-    # and finally array type. Matrix format is avoided because
-    # diag() won't work as intended for Matrix instances.
-    M = np.array(coo_matrix((values, (I, J))).todense())
+    # make sure that the matrix is square, duplicate entries are summed
+    n = max(I.max(), J.max()) + 1 if len(I) else 0
+    M = coo_matrix((values, (I, J)), shape=(n, n)).tocsr()
     return M, bin
 
+def _sparse2dense(I, J, values, bin=None):
+    M, bin = _sparse2csr(I, J, values, bin=bin)
+    return M.toarray(), bin
+
+def _parseColumns(stream, delimiter, chunk_size=2**24):
+    """Returns a 2D array of numbers in delimited text *stream*, which is read
+    and parsed in chunks of about *chunk_size* characters."""
+
+    import warnings
+
+    whitespace = not delimiter.strip()
+    n_cols = None
+    arrays = []
+    rest = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        text = rest + chunk
+        if chunk:
+            end = text.rfind('\n') + 1
+            text, rest = text[:end], text[end:]
+        if text.strip():
+            if n_cols is None:
+                line = text.lstrip().split('\n', 1)[0]
+                n_cols = len(line.split() if whitespace
+                             else line.split(delimiter))
+            if not whitespace:
+                text = text.replace(delimiter, ' ')
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', DeprecationWarning)
+                try:
+                    values = np.fromstring(text, sep=' ')
+                except (DeprecationWarning, ValueError):
+                    raise ValueError('cannot parse the file: input file '
+                                     'contains values that are not numbers')
+            if values.size % n_cols:
+                raise ValueError('cannot parse the file: rows of input file '
+                                 'have different numbers of columns')
+            arrays.append(values.reshape((-1, n_cols)))
+        if not chunk:
+            break
+
+    if not arrays:
+        raise ValueError('cannot parse the file: input file is empty')
+    return np.concatenate(arrays)
+
 def parseHiCStream(stream, **kwargs):
-    """Returns an :class:`.HiC` from a stream of Hi-C data lines.
+    """Returns a contact map and its bin size from a stream of Hi-C data
+    lines.  Contact maps in sparse format are returned as
+    :class:`scipy.sparse.csr_matrix` instances.
 
     :arg stream: Anything that implements the method ``read``, ``seek``
         (e.g. :class:`file`, buffer, stdin)
+
+    :arg sparse: whether the data is in sparse format, i.e. three columns for
+        a pair of loci and their contact count, default is to use sparse format
+        when the data has three columns
+    :type sparse: bool
+
+    :arg dense: convert contact maps in sparse format to dense arrays, default
+        is **False**
+    :type dense: bool
     """
 
     issparse = kwargs.get('sparse', None)
+    dense = kwargs.get('dense', False)
 
     import csv
     dialect = csv.Sniffer().sniff(stream.read(1024))
     stream.seek(0)
-    reader = csv.reader(stream, dialect)
-    D = list()
-    for row in reader:
-        d = list()
-        for element in row:
-            d.append(np.double(element))
-        D.append(d)
-    D = np.array(D)
+    D = _parseColumns(stream, dialect.delimiter)
 
     res = kwargs.get('bin', None)
     if res is not None:
         res = int(res)
     size = D.shape
-    if len(D.shape) <= 1:
+    if size[1] <= 1:
         raise ValueError("cannot parse the file: input file only contains one column.")
     
     if issparse is None:
@@ -453,10 +527,33 @@ def parseHiCStream(stream, **kwargs):
         except ValueError:
             raise ValueError('the sparse matrix format should have three columns')
         
-        M, res = _sparse2dense(I, J, values, bin=res)
+        M, res = _sparse2csr(I, J, values, bin=res)
+        if dense:
+            M = M.toarray()
     return M, res
 
 def parseHiCBinary(filename, **kwargs):
+    """Returns a contact map in :class:`scipy.sparse.csr_matrix` format and
+    its bin size from a .hic file, which is read using :func:`.straw`.
+
+    :arg chrom: chromosome name and optionally its range, e.g. ``'1'`` or
+        ``'1:10000:25000'``
+    :type chrom: str
+
+    :arg bin: bin size of the contact map
+    :type bin: int
+
+    :arg norm: normalization stored in the file, one of ``'NONE'``, ``'VC'``,
+        ``'VC_SQRT'`` or ``'KR'``, default is ``'NONE'``
+    :type norm: str
+
+    :arg n_cpu: number of threads decompressing the data blocks, default is
+        the number of CPUs
+    :type n_cpu: int
+
+    :arg dense: convert the contact map to a dense array, default is **False**
+    :type dense: bool
+    """
 
     chrloc = kwargs.get('chrom', None)
     if chrloc is None:
@@ -472,9 +569,12 @@ def parseHiCBinary(filename, **kwargs):
     res = int(res)
 
     from .straw import straw
-    result = straw(norm, filename, chrloc1, chrloc2, unit, res)
+    result = straw(norm, filename, chrloc1, chrloc2, unit, res,
+                   n_cpu=kwargs.get('n_cpu', None))
 
-    M, res = _sparse2dense(*result, bin=res)
+    M, res = _sparse2csr(*result, bin=res)
+    if kwargs.get('dense', False):
+        M = M.toarray()
     return M, res
 
 def writeMap(filename, map, bin=None, format='%f'):
@@ -484,31 +584,38 @@ def writeMap(filename, map, bin=None, format='%f'):
     :type filename: str
 
     :arg map: a Hi-C contact map.
-    :type map: :class:`numpy.ndarray`
+    :type map: :class:`numpy.ndarray`, :class:`scipy.sparse.csr_matrix`
 
     :arg bin: bin size of the *map*. If bin is `None`, *map* will be 
-              written in full matrix format.
+              written in full matrix format. Otherwise, the upper triangle
+              of *map* is written in sparse format, skipping zero elements
+              of sparse matrices.
     :type bin: int
 
     :arg format: output format for map elements.
     :type format: str
     """
 
+    if issparse(map):
+        if bin is None:
+            map = map.toarray()
+        else:
+            # only nonzero elements of the upper triangle are written
+            U = triu(map, format='csr')
+            U.sum_duplicates()
+            U = U.tocoo()
+            spmat = np.array([U.row * bin, U.col * bin, U.data]).T
+            fmt = ['%d', '%d', format]
+            return writeArray(filename, spmat, format=fmt)
+
     assert isinstance(map, np.ndarray), 'map must be a numpy.ndarray.'
 
     if bin is None:
         return writeArray(filename, map, format=format)
     else:
-        L = int(map.size - np.diag(map).size)//2 + np.diag(map).size
-        spmat = np.zeros((L, 3))
-        m,n = map.shape
-        l = 0
-        for i in range(m):
-            for j in range(i,n):
-                spmat[l, 0] = i * bin
-                spmat[l, 1] = j * bin
-                spmat[l, 2] = map[i, j]
-                l += 1
+        m, n = map.shape
+        I, J = np.triu_indices(m, m=n)
+        spmat = np.array([I * bin, J * bin, map[I, J]]).T
         fmt = ['%d', '%d', format]
         return writeArray(filename, spmat, format=fmt)
 
@@ -533,6 +640,12 @@ def saveHiC(hic, filename=None, map=True, **kwargs):
     attr_dict = hic.__dict__.copy()
     if not map:
         attr_dict.pop('_map')
+    elif issparse(hic._map):
+        M = attr_dict.pop('_map')
+        attr_dict['_map_data'] = M.data
+        attr_dict['_map_indices'] = M.indices
+        attr_dict['_map_indptr'] = M.indptr
+        attr_dict['_map_shape'] = np.array(M.shape)
 
     ostream = openFile(filename, 'wb', **kwargs)
     np.savez_compressed(ostream, **attr_dict)
@@ -555,6 +668,12 @@ def loadHiC(filename):
         if len(val.shape) == 0:
             val = np.asscalar(val)
         setattr(hic, k, val)
+
+    if '_map_data' in keys:
+        hic._map = csr_matrix((hic._map_data, hic._map_indices,
+                               hic._map_indptr), shape=tuple(hic._map_shape))
+        for k in ('_map_data', '_map_indices', '_map_indptr', '_map_shape'):
+            delattr(hic, k)
     return hic
 
 def saveHiC_h5(hic, filename=None, **kwargs):
@@ -1,80 +1,222 @@
 import numpy as np
+from scipy.sparse import issparse, diags, coo_matrix
+from scipy.sparse import triu as sptriu
 
 from prody.chromatin.functions import div0
-from prody.utilities import importLA
+from prody.utilities import importLA, isSymmetric
 from prody import LOGGER
 
-__all__ = ['VCnorm', 'SQRTVCnorm', 'Filenorm', 'SCN']
+__all__ = ['VCnorm', 'SQRTVCnorm', 'Filenorm', 'SCN', 'KRnorm']
 
 def VCnorm(M, **kwargs):
-    """ Performs vanilla coverage normalization on matrix *M*."""
+    """ Performs vanilla coverage normalization on matrix *M*, which may be a
+    :class:`numpy.ndarray` or a sparse matrix.
+
+    :arg largemem: process dense matrices in blocks of *chunk_size* rows to
+        bound the memory used besides the output, default is **False**
+    :type largemem: bool"""
 
     total_count = kwargs.get('total_count', 'original')
+    chunk_size = _getChunkSize(**kwargs)
 
-    C = np.diag(div0(1., np.sum(M, axis=0)))
-    R = np.diag(div0(1., np.sum(M, axis=1)))
+    c = div0(1., _sumAxis(M, 0))
+    r = div0(1., _sumAxis(M, 1))
 
     # N = R * M * C
-    N = np.dot(np.dot(R,M),C)
+    N = _scaleRowsCols(M, r, c, chunk_size)
 
     if total_count == 'original':
-        total_count = np.sum(M)
+        total_count = M.sum()
 
     if total_count is not None:
-        sum_N = np.sum(N)
+        sum_N = N.sum()
         k = total_count / sum_N
-        N = N * k
+        N *= k
     return N
 
 def SQRTVCnorm(M, **kwargs):
-    """ Performs square-root vanilla coverage normalization on matrix *M*."""
+    """ Performs square-root vanilla coverage normalization on matrix *M*,
+    which may be a :class:`numpy.ndarray` or a sparse matrix. *largemem* is
+    handled as in :func:`.VCnorm`."""
 
     total_count = kwargs.get('total_count', 'original')
+    chunk_size = _getChunkSize(**kwargs)
 
-    C = np.diag(np.sqrt(div0(1., np.sum(M, axis=0))))
-    R = np.diag(np.sqrt(div0(1., np.sum(M, axis=1))))
+    c = np.sqrt(div0(1., _sumAxis(M, 0)))
+    r = np.sqrt(div0(1., _sumAxis(M, 1)))
 
     # N = R * M * C
-    N = np.dot(np.dot(R,M),C)
+    N = _scaleRowsCols(M, r, c, chunk_size)
 
     if total_count == 'original':
-        total_count = np.sum(M)
+        total_count = M.sum()
 
     if total_count is not None:
-        sum_N = np.sum(N)
+        sum_N = N.sum()
         k = total_count / sum_N
-        N = N * k
+        N *= k
+    return N
+
+def _getChunkSize(**kwargs):
+    """Returns the number of rows of dense matrices processed at a time,
+    which is **None** unless *largemem* is set."""
+
+    if kwargs.get('largemem', False):
+        return int(kwargs.get('chunk_size', 10000))
+    return None
+
+def _iterChunks(n, chunk_size=None):
+    """Yields slices covering *n* rows in blocks of *chunk_size* rows, or a
+    single slice if *chunk_size* is **None**."""
+
+    if not chunk_size:
+        chunk_size = max(n, 1)
+    for start in range(0, n, chunk_size):
+        yield slice(start, min(start + chunk_size, n))
+
+def _sumAxis(M, axis):
+    """Returns sums of dense or sparse matrix *M* along *axis* as a 1D
+    array."""
+
+    return np.asarray(M.sum(axis=axis)).ravel()
+
+def _dot(M, x, chunk_size=None):
+    """Returns the product of dense or sparse matrix *M* and vector *x* as a
+    1D array. Dense matrices are multiplied in blocks of *chunk_size* rows."""
+
+    if issparse(M) or not chunk_size:
+        return np.asarray(M.dot(x)).ravel()
+
+    y = np.empty(M.shape[0])
+    for rows in _iterChunks(M.shape[0], chunk_size):
+        y[rows] = np.dot(M[rows], x)
+    return y
+
+def _scaleRowsCols(M, r, c, chunk_size=None):
+    """Returns ``diag(r) * M * diag(c)`` without forming diagonal matrices.
+    Sparse matrices are returned in compressed sparse row format. Dense
+    matrices are scaled in blocks of *chunk_size* rows."""
+
+    if issparse(M):
+        return (diags(r) * M * diags(c)).tocsr()
+    if not chunk_size:
+        return np.asarray(M) * r[:, None] * c
+
+    N = np.empty(M.shape)
+    for rows in _iterChunks(M.shape[0], chunk_size):
+        N[rows] = M[rows] * r[rows, None] * c
+    return N
+
+def _symmetrize(M, r, c, chunk_size=None):
+    """Returns ``(N + N.T) / 2`` where ``N = diag(r) * M * diag(c)``."""
+
+    if issparse(M):
+        N = _scaleRowsCols(M, r, c)
+        return ((N + N.T) / 2.).tocsr()
+
+    N = np.empty(M.shape)
+    for rows in _iterChunks(M.shape[0], chunk_size):
+        upper = M[rows] * r[rows, None] * c
+        lower = M[:, rows] * r[:, None] * c[rows]
+        N[rows] = (upper + lower.T) / 2.
     return N
 
+def _asymmetry(M, r, c, chunk_size=None, symmetric=False):
+    """Returns the mean of ``abs(N - N.T)`` where ``N = diag(r) * M *
+    diag(c)``, which is not formed as a whole for dense matrices. If
+    *symmetric* is **True**, *M* is taken to be symmetric and only its
+    elements are scaled, i.e. ``N[i,j] - N[j,i] = M[i,j] * (r[i] * c[j] -
+    r[j] * c[i])``, and for sparse matrices only the elements of the upper
+    triangle are used."""
+
+    n_elements = float(M.shape[0] * M.shape[1])
+    if issparse(M):
+        if not symmetric:
+            N = _scaleRowsCols(M, r, c)
+            return abs(N - N.T).sum() / n_elements
+        M = M.tocoo()
+        upper = M.row < M.col
+        row, col = M.row[upper], M.col[upper]
+        diff = r[row] * c[col] - r[col] * c[row]
+        return 2. * np.abs(M.data[upper] * diff).sum() / n_elements
+
+    total = 0.
+    for rows in _iterChunks(M.shape[0], chunk_size):
+        if symmetric:
+            diff = r[rows, None] * c - c[rows, None] * r
+            total += np.abs(M[rows] * diff).sum()
+        else:
+            upper = M[rows] * r[rows, None] * c
+            lower = M[:, rows] * r[:, None] * c[rows]
+            total += np.abs(upper - lower.T).sum()
+    return total / n_elements
+
+def _isSymmetric(M, chunk_size=None, rtol=1e-05, atol=1e-08):
+    """Returns **True** if dense or sparse matrix *M* is symmetric within
+    tolerances *rtol* and *atol*, as in :func:`.isSymmetric`."""
+
+    if M.shape[0] != M.shape[1]:
+        return False
+
+    if issparse(M):
+        return isSymmetric(M.tocsr(), rtol, atol)
+
+    for rows in _iterChunks(M.shape[0], chunk_size):
+        if not np.allclose(M[rows], M[:, rows].T, rtol, atol):
+            return False
+    return True
+
+def _isNonnegative(M, chunk_size=None):
+    """Returns **True** if dense or sparse matrix *M* has no negative
+    elements."""
+
+    if issparse(M):
+        M = M.tocsr()
+        return not M.nnz or M.data.min() >= 0
+
+    for rows in _iterChunks(M.shape[0], chunk_size):
+        if (M[rows] < 0).any():
+            return False
+    return True
+
 def SCN(M, **kwargs):
-    """ Performs Sequential Component Normalization on matrix *M*.
-    
-    .. [AC12] Cournac A, Marie-Nelly H, Marbouty M, Koszul R, Mozziconacci J. 
-       Normalization of a chromosomal contact map. *BMC Genomics* **2012**. 
+    """ Performs Sequential Component Normalization on matrix *M*, which may
+    be a :class:`numpy.ndarray` or a sparse matrix. *largemem* is handled as
+    in :func:`.VCnorm`.
+
+    .. [AC12] Cournac A, Marie-Nelly H, Marbouty M, Koszul R, Mozziconacci J.
+       Normalization of a chromosomal contact map. *BMC Genomics* **2012**.
     """
 
     total_count = kwargs.pop('total_count', None)
     max_loops = kwargs.pop('max_loops', 100)
     tol = kwargs.pop('tol', 1e-5)
+    chunk_size = _getChunkSize(**kwargs)
 
-    N = M.copy()
+    # the normalized matrix N = diag(r) * M * diag(c) is only formed at the
+    # end, each iteration updates the scaling vectors
+    # asymmetry of symmetric sparse maps is measured on their upper triangle
+    symmetric = _isSymmetric(M, chunk_size)
+    if symmetric and issparse(M):
+        A = sptriu(M, 1, format='coo')
+    else:
+        A = M
+    r = np.ones(M.shape[0])
+    c = np.ones(M.shape[1])
     n = 0
     d0 = None
     p = 1
     last_p = None
 
     while True:
-        C = np.diag(div0(1., np.sum(N, axis=0)))
-        N = np.dot(N, C)
-
-        R = np.diag(div0(1., np.sum(N, axis=1)))
-        N = np.dot(R, N)
+        c = c * div0(1., c * _dot(M.T, r, chunk_size))
+        r = r * div0(1., r * _dot(M, c, chunk_size))
 
         n += 1
 
         # check convergence of symmetry
-        d = np.mean(np.abs(N - N.T))
-        
+        d = _asymmetry(A, r, c, chunk_size, symmetric)
+
         if d0 is not None:
             p = div0(d, d0)
             dp = np.abs(p - last_p)
@@ -84,21 +226,21 @@ def SCN(M, **kwargs):
             d0 = d
         LOGGER.debug('Iteration {0}: d = {1}, p = {2}'.format(str(n), str(d), str(p)))
         last_p = p
-        
+
         if max_loops is not None:
             if n >= max_loops:
                 LOGGER.warn('The SCN algorithm did not converge after {0} '
                             'iterations.'.format(max_loops))
                 break
     # guarantee symmetry
-    N = (N + N.T) / 2.
+    N = _symmetrize(M, r, c, chunk_size)
     if total_count == 'original':
-        total_count = np.sum(M)
+        total_count = M.sum()
 
     if total_count is not None:
-        sum_N = np.sum(N)
+        sum_N = N.sum()
         k = total_count / sum_N
-        N = N * k
+        N *= k
     return N
 
 def bnewt(A, mask=[], tol = 1e-6, delta_lower = 0.1, delta_upper = 3, fl = 0, check = 1, largemem = 0, chunk_size = 10000):
@@ -106,159 +248,180 @@ def bnewt(A, mask=[], tol = 1e-6, delta_lower = 0.1, delta_upper = 3, fl = 0, ch
     BNEWT A balancing algorithm for symmetric matrices
     X = BNEWT(A) attempts to find a vector X such that
     diag(X)*A*diag(X) is close to doubly stochastic. A must
-    be symmetric and nonnegative.
-    
-    X0: initial guess. TOL: error tolerance.
+    be symmetric and nonnegative, and may be a sparse matrix.
+
+    MASK: loci excluded from balancing.
+    TOL: error tolerance.
     delta/Delta: how close/far balancing vectors can get
     to/from the edge of the positive cone.
     We use a relative measure on the size of elements.
     FL: intermediate convergence statistics on/off.
+    CHECK: verify that A is symmetric and nonnegative.
+    LARGEMEM: multiply dense A in blocks of CHUNK_SIZE rows.
     RES: residual error, measured by norm(diag(x)*A*x - e).
     """
     # see details in Knight and Ruiz (2012)
     (n,m) = A.shape
-    #np.seterr(divide='ignore')
-    print('Verifying Matrix')
     if (n != m):
-        print('Matrix must be symmetric to converge')
-        return 'NaN'
+        raise ValueError('matrix must be square to be balanced')
+
+    if not largemem:
+        chunk_size = None
     if (check):
-        for i in range(0,n):
-            for j in range(i,n):
-                if (A[i][j] != A[j][i])or(A[i][j] < 0):
-                    print('Matrix must be symmetric and nonnegative to converge')
-                    return 'NaN'
-        print('Check OK\n')
-    else:
-        print('Check escaped\n')
-  
-    e        = np.ones((n,1))
-    e[mask]  = 0
-    #res      = np.empty((n,1))
-    
+        if not (_isSymmetric(A, chunk_size) and
+                _isNonnegative(A, chunk_size)):
+            raise ValueError('matrix must be symmetric and nonnegative to '
+                             'be balanced')
+        LOGGER.debug('Matrix is symmetric and nonnegative.')
+
+    masked = np.zeros(n, dtype=bool)
+    masked[mask] = True
+    if masked.all():
+        raise ValueError('all loci are masked')
+
+    e        = np.ones(n)
+    e[masked] = 0
+
     g        = 0.9
     etamax   = 0.1
     eta      = etamax
     stop_tol = tol*0.5
     x        = e #initial guess
     rt       = tol*tol
-    if largemem:
-        v      = x * chunking_dot(A,x,chunk_size=chunk_size)
-    else:
-        v      = x*np.dot(A,x)
+    v        = x*_dot(A,x,chunk_size)
     rk       = 1 - v
-    rk[mask] = 0
-    rho_km1  = np.dot(np.transpose(rk),rk)
+    rk[masked] = 0
+    rho_km1  = np.dot(rk,rk)
     rout     = rho_km1
     rold     = rout
-    
+
     MVP = 0 #matrix vector products
     i = 0
-  
+
     while rout > rt:
         i = i+1
         k=0
         y=e
         innertol = max(eta*eta*rout,rt)
-    
+
         while rho_km1 > innertol: #inner iteration by CG
             k = k+1
             if k==1:
-                with np.errstate(invalid='ignore'):
-                    Z       = rk/v
-                Z[mask] = 0
+                Z       = div0(rk,v)
+                Z[masked] = 0
                 p       = Z
-                rho_km1 = np.dot(np.transpose(rk),Z)
+                rho_km1 = np.dot(rk,Z)
             else:
                 beta = rho_km1/rho_km2
                 p    =  Z + beta*p
-      
-            #update search direction 
-            if largemem:
-                w   = x*chunking_dot(A,x*p,chunk_size=chunk_size) + v*p
-            else:
-                w   = x*np.dot(A,x*p) + v*p
-      
-            alpha = rho_km1/np.dot(np.transpose(p),w)
+
+            #update search direction
+            w   = x*_dot(A,x*p,chunk_size) + v*p
+
+            alpha = rho_km1/np.dot(p,w)
             ap = alpha*p
-      
+
             #test distance to boundary of cone
             ynew = y + ap
-            if min(np.delete(ynew,mask)) <= delta_lower:
+            if ynew[~masked].min() <= delta_lower:
                 if delta_lower == 0:
                     break
-                else:
-                    ind = np.nonzero(ap < 0)
-                    gamma = min((delta_lower - y[ind])/ap[ind])
-                    y = y + gamma*ap
-                    break
-                if max(ynew) >= delta_upper:
-                    ind = np.nonzero(ynew > delta_upper)
-                    gamma = min((delta_upper-y[ind])/ap[ind])
-                    y = y + gamma*ap
-                    break
-      
+                ind = ap < 0
+                gamma = np.min((delta_lower - y[ind])/ap[ind])
+                y = y + gamma*ap
+                break
+            if ynew.max() >= delta_upper:
+                ind = ynew > delta_upper
+                gamma = np.min((delta_upper-y[ind])/ap[ind])
+                y = y + gamma*ap
+                break
+
             y       = ynew
             rk      = rk - alpha*w
             rho_km2 = rho_km1
-            with np.errstate(invalid='ignore'):
-                Z       = rk/v
-            Z[mask] = 0
-            rho_km1 = np.dot(np.transpose(rk),Z)
+            Z       = div0(rk,v)
+            Z[masked] = 0
+            rho_km1 = np.dot(rk,Z)
         #end inner iteration
-    
+
         x        = x*y
-        if largemem:
-            v      = x * chunking_dot(A,x,chunk_size=chunk_size)
-        else:
-            v      = x*np.dot(A,x)
+        v        = x*_dot(A,x,chunk_size)
         rk       = 1-v
-        rk[mask] = 0
-        rho_km1  = np.dot(np.transpose(rk),rk)
+        rk[masked] = 0
+        rho_km1  = np.dot(rk,rk)
         rout     = rho_km1
         MVP      = MVP + k + 1
-        #print MVP,res
         #update inner iteration stopping criterion
         rat      = rout/rold
         rold     = rout
-        res_norm = math.sqrt(rout)
+        res_norm = np.sqrt(rout)
         eta_o    = eta
         eta      = g*rat
-    
+
         if g*eta_o*eta_o > 0.1:
             eta = max(eta,g*eta_o*eta_o)
         eta = max(min(eta,etamax),stop_tol/res_norm)
-    
+
         if fl == 1:
-            print('%3d %6d %.3f \n' % (i,k,r_norm))
-      
+            LOGGER.info('Iteration {0}: {1} inner iterations, residual '
+                        '{2:.3g}'.format(i, k, res_norm))
+
         if MVP > 50000:
+            LOGGER.warn('Matrix balancing did not converge after {0} '
+                        'matrix vector products.'.format(MVP))
             break
     #end outer
-  
-    print('Matrix vector products = %6d' % MVP)
-    #x = np.array(x)
-    #x[mask] = 0
+
+    LOGGER.debug('Matrix vector products = {0}'.format(MVP))
     return x
 
 def KRnorm(M, mask=None, **kwargs):
-    """
-    Uses Knight-Ruiz normalization to balance the matrix.
+    """ Performs Knight-Ruiz normalization on matrix *M*, which may be a
+    :class:`numpy.ndarray` or a sparse matrix, so that its rows and columns
+    sum up to one. *M* must be nonnegative and symmetric, at least within
+    rounding errors, and is symmetrized before balancing. Loci in *mask* and
+    loci without contacts are excluded from balancing and set to zero. Other
+    keyword arguments, e.g. *tol* and *largemem*, are passed to the balancing
+    algorithm.
+
+    .. [PK13] Knight PA, Ruiz D. A fast algorithm for matrix balancing.
+       *IMA J Numer Anal* **2013**.
     """
 
-    x = bnewt(M, mask=mask, check=0, **kwargs)*100
-    M *= X 
-    M *= X.T
+    total_count = kwargs.pop('total_count', None)
+    chunk_size = _getChunkSize(**kwargs)
 
-    return M
+    if not _isSymmetric(M, chunk_size, 0, 0):
+        # maps that are symmetric only to rounding errors, e.g. those
+        # normalized by VCnorm, are symmetrized before balancing
+        if not _isSymmetric(M, chunk_size):
+            raise ValueError('matrix must be symmetric to be balanced')
+        ones = np.ones(M.shape[0])
+        M = _symmetrize(M, ones, ones, chunk_size)
+
+    masked = _sumAxis(M, 1) == 0
+    if mask is not None:
+        masked[mask] = True
+
+    x = bnewt(M, mask=masked, **kwargs)
+    N = _scaleRowsCols(M, x, x, chunk_size)
+
+    if total_count == 'original':
+        total_count = M.sum()
+
+    if total_count is not None:
+        sum_N = N.sum()
+        k = total_count / sum_N
+        N *= k
+    return N
 
 def Filenorm(M, **kwargs):
-    """ Performs normalization on matrix *M* given a file. *filename* specifies 
-    the path to the file. The file should be one-column, and ideally has the 
-    same number of entries with the size of *M* (extra entries will be ignored). 
-    Say *F* is vector of the normalization factors, *N* is the normalized matrix, 
-    if *expected* is **True**, ``N[i,j] = M[i,j]/F[i]/F[j]``. If *expected* is
-    **True**, ``N[i,j] = M[i,j]/F[|i-j|]``."""
+    """ Performs normalization on matrix *M* given a file. *filename* specifies
+    the path to the file. The file should be one-column, and ideally has the
+    same number of entries with the size of *M* (extra entries will be ignored).
+    Say *F* is vector of the normalization factors, *N* is the normalized matrix,
+    if *expected* is **False**, ``N[i,j] = M[i,j]/F[i]/F[j]``. If *expected* is
+    **True**, ``N[i,j] = M[i,j]/F[|i-j|]``. *M* may be a sparse matrix."""
 
     filename = kwargs.get('filename')
     expected = kwargs.get('expected', False)
@@ -269,13 +432,13 @@ def Filenorm(M, **kwargs):
     L = M.shape[0]
     if not expected:
         factors.resize(L)
-        norm_mat = np.outer(factors, factors)
-        
-        N = div0(M, norm_mat)
-        return N
+        f = div0(1., factors)
+        return _scaleRowsCols(M, f, f)
+    elif issparse(M):
+        M = coo_matrix(M)
+        data = div0(M.data, factors[np.abs(M.row - M.col)])
+        return coo_matrix((data, (M.row, M.col)), shape=M.shape).tocsr()
     else:
-        N = np.zeros(M.shape)
-        for i in range(L):
-            for j in range(L):
-                N[i,j] = div0(M[i,j], factors[abs(i-j)])
-        return N
+        loci = np.arange(L)
+        distance = np.abs(loci[:, None] - np.arange(M.shape[1]))
+        return div0(np.asarray(M, dtype=float), factors[distance])
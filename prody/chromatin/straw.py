@@ -30,10 +30,16 @@ __license__ = "MIT"
 import sys
 import struct
 import zlib
-import requests
 import io
 
+import numpy as np
+
 blockMap = dict()
+BLOCK_INDEX = np.dtype([('number', '<i4'), ('position', '<i8'),
+                        ('size', '<i4')])
+BLOCK_RECORD_V6 = np.dtype([('binX', '<i4'), ('binY', '<i4'),
+                            ('counts', '<f4')])
+SHORT_NAN = -32768
 # global version
 version=0
 
@@ -219,15 +225,12 @@ def readMatrixZoomData(req, myunit, mybinsize):
         myBlockColumnCount=blockColumnCount
         storeBlockData=True
     nBlocks = struct.unpack('<i',req.read(4))[0]
-    for b in range(nBlocks):
-        blockNumber = struct.unpack('<i',req.read(4))[0]
-        filePosition = struct.unpack('<q',req.read(8))[0]
-        blockSizeInBytes = struct.unpack('<i',req.read(4))[0]
-        entry=dict()
-        entry['size'] = blockSizeInBytes
-        entry['position'] = filePosition
-        if (storeBlockData):
-            blockMap[blockNumber] = entry
+    blocks = np.frombuffer(req.read(16 * nBlocks), dtype=BLOCK_INDEX,
+                           count=nBlocks)
+    if (storeBlockData):
+        for blockNumber, filePosition, blockSizeInBytes in blocks.tolist():
+            blockMap[blockNumber] = {'size': blockSizeInBytes,
+                                     'position': filePosition}
     return [storeBlockData, myBlockBinCount, myBlockColumnCount]
 
 def readMatrix(req, unit, binsize):
@@ -293,9 +296,82 @@ def getBlockNumbersForRegionFromBinPosition(regionIndices, blockBinCount, blockC
     # print(str(blocksSet))
     return blocksSet
 
+def _decodeRows(data, binXOffset, binYOffset, useShort):
+    """Decodes a list-of-rows block payload of version 7 or later. Rows are
+    walked to find where their records start, then all records are gathered
+    at once."""
+
+    rowCount = struct.unpack_from('<h', data, 14)[0]
+    recsize = 4 if useShort == 0 else 6
+    starts = np.empty(rowCount, dtype=np.int64)
+    lengths = np.empty(rowCount, dtype=np.int64)
+    ys = np.empty(rowCount, dtype=np.int64)
+    temp = 16
+    for i in range(rowCount):
+        y, colCount = struct.unpack_from('<hh', data, temp)
+        ys[i] = y
+        lengths[i] = colCount
+        starts[i] = temp + 4
+        temp += 4 + colCount * recsize
+
+    n = int(lengths.sum())
+    rows = np.repeat(np.arange(rowCount), lengths)
+    offsets = np.arange(n) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    offsets = offsets * recsize + starts[rows]
+
+    # all fields start at even offsets, so the payload is read as shorts
+    shorts = np.frombuffer(data, dtype='<i2', count=len(data) // 2)
+    offsets //= 2
+    x = shorts[offsets]
+    if useShort == 0:
+        counts = shorts[offsets + 1]
+    else:
+        halves = shorts[np.column_stack([offsets + 1, offsets + 2])]
+        counts = halves.view('<f4').ravel()
+    return x + binXOffset, ys[rows] + binYOffset, counts
+
+def _decodeDense(data, binXOffset, binYOffset, useShort):
+    """Decodes a dense block payload of version 7 or later, skipping empty
+    cells."""
+
+    nPts, w = struct.unpack_from('<ih', data, 14)
+    if useShort == 0:
+        counts = np.frombuffer(data, dtype='<i2', count=nPts, offset=20)
+        keep = counts != SHORT_NAN
+    else:
+        counts = np.frombuffer(data, dtype='<f4', count=nPts, offset=20)
+        keep = ~np.isnan(counts)
+    index = np.flatnonzero(keep)
+    row, col = np.divmod(index, w)
+    return col + binXOffset, row + binYOffset, counts[index]
+
+def decodeBlock(data, version):
+    """ Decodes a decompressed block payload into arrays
+
+    Args:
+       data (bytes): Decompressed block
+       version (int): Version of the .hic file
+
+    Returns:
+       tuple of arrays: binX, binY, counts of records in this block
+    """
+    nRecords = struct.unpack_from('<i', data, 0)[0]
+    if (version < 7):
+        records = np.frombuffer(data, dtype=BLOCK_RECORD_V6, count=nRecords,
+                                offset=4)
+        return records['binX'], records['binY'], records['counts']
+
+    binXOffset, binYOffset, useShort, type_ = struct.unpack_from('<iibb',
+                                                                 data, 4)
+    if (type_ == 1):
+        return _decodeRows(data, binXOffset, binYOffset, useShort)
+    elif (type_ == 2):
+        return _decodeDense(data, binXOffset, binYOffset, useShort)
+    raise ValueError("Unknown block type {0}".format(type_))
+
 def readBlock(req, size):
     """ Reads the block - reads the compressed bytes, decompresses, and stores
-    results in array. Presumes file pointer is in correct position.
+    results in arrays. Presumes file pointer is in correct position.
 
     Args:
        req (file): File to read from. Presumes file pointer is in correct
@@ -303,87 +379,10 @@ def readBlock(req, size):
        size (int): How many bytes to read
 
     Returns:
-       array containing row, column, count data for this block
+       tuple of arrays: binX, binY, counts of records in this block
     """
     compressedBytes = req.read(size)
-    uncompressedBytes = zlib.decompress(compressedBytes)
-    nRecords = struct.unpack('<i',uncompressedBytes[0:4])[0]
-    v=[]
-    global version
-    if (version < 7):
-        for i in range(nRecords):
-            binX = struct.unpack('<i',uncompressedBytes[(12*i+4):(12*i+8)])[0]
-            binY = struct.unpack('<i',uncompressedBytes[(12*i+8):(12*i+12)])[0]
-            counts = struct.unpack('<f',uncompressedBytes[(12*i+12):(12*i+16)])[0]
-            record = dict()
-            record['binX'] = binX
-            record['binY'] = binY
-            record['counts'] = counts
-            v.append(record)
-    else:
-        binXOffset = struct.unpack('<i',uncompressedBytes[4:8])[0]
-        binYOffset = struct.unpack('<i',uncompressedBytes[8:12])[0]
-        useShort = struct.unpack('<b',uncompressedBytes[12:13])[0]
-        type_ = struct.unpack('<b',uncompressedBytes[13:14])[0]
-        index=0
-        if (type_==1):
-            rowCount = struct.unpack('<h',uncompressedBytes[14:16])[0]
-            temp = 16
-            for i in range(rowCount):
-                y = struct.unpack('<h',uncompressedBytes[temp:(temp+2)])[0]
-                temp=temp+2
-                binY = y + binYOffset
-                colCount = struct.unpack('<h',uncompressedBytes[temp:(temp+2)])[0]
-                temp=temp+2
-                for j in range(colCount):
-                    x = struct.unpack('<h',uncompressedBytes[temp:(temp+2)])[0]
-                    temp=temp+2
-                    binX = binXOffset + x
-                    if (useShort==0):
-                        c = struct.unpack('<h',uncompressedBytes[temp:(temp+2)])[0]
-                        temp=temp+2
-                        counts = c
-                    else:
-                        counts = struct.unpack('<f',uncompressedBytes[temp:(temp+4)])[0]
-                        temp=temp+4
-                    record = dict()
-                    record['binX'] = binX
-                    record['binY'] = binY
-                    record['counts'] = counts
-                    v.append(record)
-                    index = index + 1
-        elif (type_== 2):
-            temp=14
-            nPts = struct.unpack('<i',uncompressedBytes[temp:(temp+4)])[0]
-            temp=temp+4
-            w = struct.unpack('<h',uncompressedBytes[temp:(temp+2)])[0]
-            temp=temp+2
-            for i in range(nPts):
-                row=int(i/w)
-                col=i-row*w
-                bin1=int(binXOffset+col)
-                bin2=int(binYOffset+row)
-                if (useShort==0):
-                    c = struct.unpack('<h',uncompressedBytes[temp:(temp+2)])[0]
-                    temp=temp+2
-                    if (c != -32768):
-                        record = dict()
-                        record['binX'] = bin1
-                        record['binY'] = bin2
-                        record['counts'] = c
-                        v.append(record)
-                        index = index + 1
-                else:
-                    counts = struct.unpack('<f',uncompressedBytes[temp:(temp+4)])[0]
-                    temp=temp+4
-                    if (countsnot != 0x7fc00000):
-                        record = dict()
-                        record['binX'] = bin1
-                        record['binY'] = bin2
-                        record['counts'] = counts
-                        v.append(record)
-                        index = index + 1
-    return v
+    return decodeBlock(zlib.decompress(compressedBytes), version)
 
 def readNormalizationVector(req):
     """ Reads the normalization vector from the file; presumes file pointer is
@@ -397,16 +396,12 @@ def readNormalizationVector(req):
       Array of normalization values
 
     """
-    value = []
     nValues = struct.unpack('<i',req.read(4))[0]
-    for i in range(nValues):
-        d = struct.unpack('<d',req.read(8))[0]
-        value.append(d)
-    return value
+    return np.frombuffer(req.read(8 * nValues), dtype='<f8', count=nValues)
 
-def straw(norm, infile, chr1loc, chr2loc, unit, binsize):
+def straw(norm, infile, chr1loc, chr2loc, unit, binsize, n_cpu=None):
     """ This is the main workhorse method of the module. Reads a .hic file and
-    extracts the given contact matrix. Stores in an array in sparse upper
+    extracts the given contact matrix. Stores in arrays in sparse upper
     triangular format: row, column, (normalized) count
 
     Args:
@@ -416,12 +411,18 @@ def straw(norm, infile, chr1loc, chr2loc, unit, binsize):
        chr2loc(str): Chromosome name and (optionally) range, i.e. "1" or "1:10000:25000"
        unit(str): One of BP or FRAG
        binsize(int): Resolution, i.e. 25000 for 25K
+       n_cpu(int, optional): Number of threads decompressing blocks, default
+       is the number of CPUs
+
+    Returns:
+       list of arrays: row positions, column positions, counts
     """
     # clear the global variable blockMap so that it won't keep the data from previous calls
     for blockNum in list(blockMap.keys()):
         blockMap.pop(blockNum)
 
     if (infile.startswith("http")):
+        import requests
         # try URL first. 100K should be sufficient for header
         headers={'range' : 'bytes=0-100000', 'x-amz-meta-requester' : 'straw'}
         s = requests.Session()
@@ -531,45 +532,71 @@ def straw(norm, infile, chr1loc, chr2loc, unit, binsize):
     blockBinCount=list1[0]
     blockColumnCount=list1[1]
     blockNumbers = getBlockNumbersForRegionFromBinPosition(regionIndices, blockBinCount, blockColumnCount, c1==c2)
-    yActual=[]
-    xActual=[]
-    counts=[]
-
-    for i_set in (blockNumbers):
-        idx=dict()
-        if(i_set in blockMap):
-            idx=blockMap[i_set]
-        else:
-            idx['size']=0
-            idx['position']=0
-        if (idx['size']==0):
-            records=[]
-        else:
-            if (infile.startswith("http")):
-                endrange='bytes={0}-{1}'.format(idx['position'], idx['position']+idx['size'])
-                headers={'range' : endrange, 'x-amz-meta-requester' : 'straw'}
-                r=s.get(infile, headers=headers);
-                req=io.BytesIO(r.content);
-            else:
-                req.seek(idx['position'])
-            records=readBlock(req, idx['size'])
-
-        for j in range(len(records)):
-            rec=records[j]
-            x=rec['binX']*binsize
-            y=rec['binY']*binsize
-            c=rec['counts']
-            if (norm != "NONE"):
-                a=c1Norm[rec['binX']]*c2Norm[rec['binY']]
-                if (a!=0.0):
-                    c=(c/(c1Norm[rec['binX']]*c2Norm[rec['binY']]))
-                else:
-                    c="inf"
-            if ((x>=origRegionIndices[0] and x<=origRegionIndices[1] and y>=origRegionIndices[2] and y<=origRegionIndices[3]) or ((c1==c2) and y>=origRegionIndices[0] and y<=origRegionIndices[1] and x>= origRegionIndices[2] and x<=origRegionIndices[3])):
-	            xActual.append(x)
-	            yActual.append(y)
-	            counts.append(c)
-    return [xActual, yActual, counts]
+    http = infile.startswith("http")
+
+    def readCompressed(i_set):
+        if (i_set not in blockMap):
+            return b""
+        idx = blockMap[i_set]
+        if (idx['size'] == 0):
+            return b""
+        if (http):
+            endrange='bytes={0}-{1}'.format(idx['position'], idx['position']+idx['size'])
+            headers={'range' : endrange, 'x-amz-meta-requester' : 'straw'}
+            r=s.get(infile, headers=headers)
+            return r.content[:idx['size']]
+        req.seek(idx['position'])
+        return req.read(idx['size'])
+
+    def decode(compressedBytes):
+        if (not compressedBytes):
+            return None
+        return decodeBlock(zlib.decompress(compressedBytes), version)
+
+    # blocks are read one after another, while earlier ones are decompressed
+    # and decoded on a pool of threads, as zlib and numpy release the GIL
+    payloads = (readCompressed(i_set) for i_set in sorted(blockNumbers))
+    if (n_cpu is None):
+        from multiprocessing import cpu_count
+        n_cpu = cpu_count()
+    if (n_cpu > 1 and len(blockNumbers) > 1):
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(n_cpu)
+        try:
+            blocks = list(pool.imap(decode, payloads))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        blocks = [decode(payload) for payload in payloads]
+    if (not http):
+        req.close()
+
+    blocks = [block for block in blocks if block is not None]
+    if (blocks):
+        binX = np.concatenate([block[0] for block in blocks]).astype(np.int64)
+        binY = np.concatenate([block[1] for block in blocks]).astype(np.int64)
+        counts = np.concatenate([block[2] for block in blocks])
+    else:
+        binX = binY = np.zeros(0, dtype=np.int64)
+        counts = np.zeros(0)
+    counts = counts.astype(float)
+
+    x = binX * binsize
+    y = binY * binsize
+    keep = ((x >= origRegionIndices[0]) & (x <= origRegionIndices[1]) &
+            (y >= origRegionIndices[2]) & (y <= origRegionIndices[3]))
+    if (c1 == c2):
+        keep |= ((y >= origRegionIndices[0]) & (y <= origRegionIndices[1]) &
+                 (x >= origRegionIndices[2]) & (x <= origRegionIndices[3]))
+    x = x[keep]
+    y = y[keep]
+    counts = counts[keep]
+    if (norm != "NONE"):
+        a = c1Norm[binX[keep]] * c2Norm[binY[keep]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            counts = np.where(a != 0.0, counts / a, np.inf)
+    return [x, y, counts]
 
 def printme(norm, infile, chr1loc, chr2loc, unit, binsize, outfile):
     """ Reads a .hic file and extracts and prints the given contact matrix
@@ -590,9 +617,9 @@ def printme(norm, infile, chr1loc, chr2loc, unit, binsize, outfile):
     else:
         f = outfile
     result = straw(norm, infile, chr1loc, chr2loc, unit, binsize)
-    for i in range(len(result[0])):
-        f.write("{0}\t{1}\t{2}\n".format(result[0][i], result[1][i], result[2][i]))
-        #print("{0}\t{1}\t{2}".format(result[0][i], result[1][i], result[2][i]))
-    
+    lines = ["{0}\t{1}\t{2}\n".format(x, y, c)
+             for x, y, c in zip(*[column.tolist() for column in result])]
+    f.write("".join(lines))
+
     if isinstance(outfile, str):
         f.close()
@@ -8,12 +8,14 @@ import numpy as np
 
 from prody import LOGGER
 from prody.measure import calcDeformVector, calcRMSD, superpose, applyTransformation, calcDistance
+from prody.measure import calcTransformation
 from prody.atomic import Atomic, AtomGroup, sliceAtomicData
 from prody.utilities import getCoords
 from .compare import calcOverlap, calcCumulOverlap
 from prody.ensemble import PDBEnsemble, Ensemble
 from .mode import Vector
-from .anm import ANM
+from .anm import ANM, assembleHessian, calcRigidBodyModes
+from .gnm import checkENMParameters, getContacts, calcGammas
 from .functions import calcENM, reduceModel, sliceModel
 from .compare import matchModes
 from .modeset import ModeSet
@@ -71,6 +73,15 @@ class AdaptiveANM(object):
         This kwarg can be used when the same selection string works for both.
         It populates reduceSelA and reduceSelB when no values are given for them.
 
+    arg incremental: if **True**, a sparse Hessian of each structure is
+        assembled in bulk and modes are calculated using a sparse eigensolver
+        that is warm-started from the eigenvectors of the previous step,
+        default is **False**. This is not used when *trim* is ``'reduce'``.
+    type incremental: bool
+
+    Time taken by each step and the part of it spent on building the Hessian
+    and calculating modes are stored in *stepTimes* and *modeTimes*.
+
     Other kwargs can be provided that work for internal functions such as 
     :func:`.buildHessian`, :func:`.calcModes` and mapping functions, which are 
     only used if *alignSel* and *reduceSel* are not provided. 
@@ -85,6 +96,11 @@ class AdaptiveANM(object):
         self.cutoff = kwargs.pop('cutoff', 15.0) # default cutoff for ANM.buildHessian
         self.gamma = kwargs.pop('gamma', 1.0) # default gamma for ANM.buildHessian
 
+        self.incremental = kwargs.pop('incremental', False)
+        self._warmStarts = {}
+        self.stepTimes = []
+        self.modeTimes = []
+
         self.alignSel = kwargs.get('alignSel', None)
         self.alignSelA = kwargs.get('alignSelA', self.alignSel)
         self.alignSelB = kwargs.get('alignSelB', self.alignSel)
@@ -204,8 +220,10 @@ class AdaptiveANM(object):
         and *reduceSelA* and *reduceSelB*
         """
 
+        start = time.time()
+
         structA = kwargs.pop('structA', self.structA)
-        structB = kwargs.pop('structA', self.structB)
+        structB = kwargs.pop('structB', self.structB)
         
         alignSel = kwargs.pop('alignSel', self.alignSel)
         alignSelA = kwargs.pop('alignSelA', self.alignSelA)
@@ -285,7 +303,14 @@ class AdaptiveANM(object):
             self.n_modes = maxModes
 
         trim = kwargs.pop('trim', self.trim)
-        anmA, _ = calcENM(structA, n_modes=self.n_modes)
+        incremental = kwargs.pop('incremental', self.incremental)
+        mode_start = time.time()
+        if incremental and trim != 'reduce':
+            anmA = self._updateANM(structA, self.n_modes)
+        else:
+            # reduceModel needs a dense Hessian in the current frame
+            anmA, _ = calcENM(structA, n_modes=self.n_modes)
+        mode_time = time.time() - mode_start
 
         if trim == 'slice':
             trim_anmA, _ = sliceModel(anmA, structA, reduceSelA)
@@ -394,6 +419,12 @@ class AdaptiveANM(object):
 
         self.rmsds.append(rmsd)
 
+        step_time = time.time() - start
+        self.stepTimes.append(step_time)
+        self.modeTimes.append(mode_time)
+        LOGGER.info('Step took {0:.2f}s, {1:.2f}s of which was spent on '
+                    'calculating modes'.format(step_time, mode_time))
+
         if outputPDB:
             writePDB(filename + '_A', self.ensembleA)
             LOGGER.clear()
@@ -409,6 +440,39 @@ class AdaptiveANM(object):
         return
 
 
+    def _updateANM(self, atoms, n_modes):
+        """Returns an :class:`.ANM` for *atoms*, whose sparse Hessian is
+        assembled in bulk from current coordinates.  Eigenvectors of the
+        previous step for the same structure are rotated onto current
+        coordinates and used as a warm start for the eigensolver."""
+
+        coords = atoms.getCoords()
+        n_atoms = coords.shape[0]
+        cutoff, gamma, _ = checkENMParameters(self.cutoff, self.gamma)
+
+        i, j, dist2 = getContacts(coords, cutoff)
+        gammas = calcGammas(gamma, dist2, i, j)
+        hessian = assembleHessian(coords, i, j, dist2, gammas, sparse=True)
+
+        v0 = None
+        network = self._warmStarts.get(id(atoms))
+        if network is not None and network['coords'].shape == coords.shape:
+            rotation = calcTransformation(network['coords'],
+                                          coords).getRotation()
+            vectors = network['vectors']
+            v0 = np.einsum('xy,nyk->nxk', rotation,
+                           vectors.reshape(n_atoms, 3, -1))
+            v0 = v0.reshape(vectors.shape)
+
+        anm = ANM(atoms.getTitle())
+        anm.setHessian(hessian)
+        anm.calcModes(n_modes=n_modes, v0=v0,
+                      nullspace=calcRigidBodyModes(coords))
+
+        self._warmStarts[id(atoms)] = {'coords': coords,
+                                     'vectors': anm.getEigvecs()}
+        return anm
+
     def checkConvergence(self, **kwargs):
         converged = False
         rmsd_diff_cutoff = kwargs.get('rmsd_diff_cutoff', self.rmsd_diff_cutoff)
@@ -296,7 +296,7 @@ def _getModeProperties(modes):
                                 'not {0}'.format(type(mode)))
             V.append(mode._getArray())
             if isinstance(mode, Mode):
-                W.append(modes.getVariance())
+                W.append(mode.getVariance())
             else:
                 W.append(1.)
             if is3d is None:
@@ -334,96 +334,100 @@ def calcSqFlucts(modes):
     return sq_flucts
 
 
-def calcCrossCorr(modes, n_cpu=1, norm=True):
+def _getTileSize(n_rows, n_cols, n_cpu=1, max_memory=256):
+    """Returns the number of rows of a tile so that the tiles processed at the 
+    same time take at most *max_memory* megabytes."""
+
+    budget = max_memory * 1024. ** 2 / max(n_cpu, 1)
+    return int(min(max(budget // (8 * max(n_cols, 1)), 1), max(n_rows, 1)))
+
+def _calcTiledProduct(A, B, out=None, scale=None, n_cpu=1, max_memory=256):
+    """Returns ``A.dot(B.T)`` calculated in blocks of rows, which are written 
+    into *out*. If *scale* is given, each element (i, j) is divided by 
+    ``scale[i] * scale[j]``. Tiles are distributed over *n_cpu* threads."""
+
+    n, m = A.shape[0], B.shape[0]
+    if out is None:
+        out = np.empty((n, m))
+    elif out.shape != (n, m):
+        raise ValueError('out must be an array of shape ({0}, {1})'
+                         .format(n, m))
+
+    size = _getTileSize(n, m, n_cpu, max_memory)
+    starts = range(0, n, size)
+
+    def calcTile(start):
+        stop = min(start + size, n)
+        tile = np.dot(A[start:stop], B.T)
+        if scale is not None:
+            tile = div0(tile, np.outer(scale[start:stop], scale))
+        out[start:stop] = tile
+
+    if n_cpu > 1 and len(starts) > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(n_cpu)
+        try:
+            pool.map(calcTile, starts)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for start in starts:
+            calcTile(start)
+    return out
+
+def _getCrossCorrFactors(modes):
+    """Returns factors *A* and *B* such that ``A.dot(B.T)`` is the 
+    cross-correlations matrix of *modes*. For 3-d models, the three 
+    components of each atom are treated as separate modes."""
+
+    V, W, is3d, n_atoms = _getModeProperties(modes)
+    variances = np.diag(W)
+    if is3d:
+        n_modes = V.shape[1]
+        V = V.reshape((n_atoms, 3 * n_modes))
+        variances = np.tile(variances, 3)
+    return V, V * variances
+
+def calcCrossCorr(modes, n_cpu=1, norm=True, **kwargs):
     """Returns cross-correlations matrix.  For a 3-d model, cross-correlations
     matrix is an NxN matrix, where N is the number of atoms.  Each element of
     this matrix is the trace of the submatrix corresponding to a pair of atoms.
     Covariance matrix may be calculated using all modes or a subset of modes
     of an NMA instance.  For large systems, calculation of cross-correlations
     matrix may be time consuming.  Optionally, multiple processors may be
-    employed to perform calculations by passing ``n_cpu=2`` or more."""
+    employed to perform calculations by passing ``n_cpu=2`` or more.
+
+    The matrix is calculated in blocks of rows, so that apart from the output 
+    only a bounded amount of memory is used.
+
+    :arg out: array of shape (N, N) that the matrix is written into, e.g. a 
+        :class:`~numpy.memmap` for systems too large to fit into memory
+    :type out: :class:`~numpy.ndarray`
+
+    :arg max_memory: memory in megabytes used for blocks being processed at 
+        the same time, default is 256
+    :type max_memory: float"""
 
     if not isinstance(n_cpu, int):
         raise TypeError('n_cpu must be an integer')
     elif n_cpu < 1:
         raise ValueError('n_cpu must be equal to or greater than 1')
 
-    if not isinstance(modes, (Mode, NMA, ModeSet)):
-        if isinstance(modes, list):
-            try:
-                is3d = modes[0].is3d()
-            except:
-                raise TypeError('modes must be a list of Mode or Vector instances, '
-                            'not {0}'.format(type(modes)))
-        else:
-            raise TypeError('modes must be a Mode, NMA, or ModeSet instance, '
-                            'not {0}'.format(type(modes)))
-    else:
-        is3d = modes.is3d()
-    if is3d:
-        model = modes
-        if isinstance(modes, (Mode, ModeSet)):
-            model = modes._model
-            if isinstance(modes, (Mode)):
-                indices = [modes.getIndex()]
-                n_modes = 1
-            else:
-                indices = modes.getIndices()
-                n_modes = len(modes)
-        else:
-            n_modes = len(modes)
-            indices = np.arange(n_modes)
-        array = model._getArray()
-        n_atoms = model._n_atoms
-        variances = model._vars
-        if n_cpu == 1:
-            s = (n_modes, n_atoms, 3)
-            arvar = (array[:, indices]*variances[indices]).T.reshape(s)
-            array = array[:, indices].T.reshape(s)
-            covariance = np.tensordot(array.transpose(2, 0, 1),
-                                      arvar.transpose(0, 2, 1),
-                                      axes=([0, 1], [1, 0]))
-        else:
-            import multiprocessing
-            n_cpu = min(multiprocessing.cpu_count(), n_cpu)
-            queue = multiprocessing.Queue()
-            size = n_modes / n_cpu
-            for i in range(n_cpu):
-                if n_cpu - i == 1:
-                    indices = modes.indices[i*size:]
-                else:
-                    indices = modes.indices[i*size:(i+1)*size]
-                process = multiprocessing.Process(
-                    target=_crossCorrelations,
-                    args=(queue, n_atoms, array, variances, indices))
-                process.start()
-            while queue.qsize() < n_cpu:
-                time.sleep(0.05)
-            covariance = queue.get()
-            while queue.qsize() > 0:
-                covariance += queue.get()
-    else:
-        covariance = calcCovariance(modes)
-    if norm:
-        diag = np.power(covariance.diagonal(), 0.5)
-        D = np.outer(diag, diag)
-        covariance = div0(covariance, D)
-    return covariance
-
+    if not isinstance(modes, (VectorBase, NMA, ModeSet, list)):
+        raise TypeError('modes must be a Mode, NMA, or ModeSet instance, '
+                        'not {0}'.format(type(modes)))
 
-def _crossCorrelations(queue, n_atoms, array, variances, indices):
-    """Calculate covariance-matrix for a subset of modes."""
+    A, B = _getCrossCorrFactors(modes)
+    scale = None
+    if norm:
+        scale = np.sqrt((A * B).sum(1))
+    return _calcTiledProduct(A, B, out=kwargs.get('out'), scale=scale, 
+                             n_cpu=n_cpu, 
+                             max_memory=kwargs.get('max_memory', 256))
 
-    n_modes = len(indices)
-    arvar = (array[:, indices] * variances[indices]).T.reshape((n_modes,
-                                                                n_atoms, 3))
-    array = array[:, indices].T.reshape((n_modes, n_atoms, 3))
-    covariance = np.tensordot(array.transpose(2, 0, 1),
-                              arvar.transpose(0, 2, 1),
-                              axes=([0, 1], [1, 0]))
-    queue.put(covariance)
 
-def calcDistFlucts(modes, n_cpu=1, norm=True):
+def calcDistFlucts(modes, n_cpu=1, norm=True, **kwargs):
     """Returns the matrix of distance fluctuations (i.e. an NxN matrix
     where N is the number of residues, of MSFs in the inter-residue distances)
     computed from the cross-correlation matrix (see Eq. 12.E.1 in [IB18]_). 
@@ -432,10 +436,15 @@ def calcDistFlucts(modes, n_cpu=1, norm=True):
     .. [IB18] Dill K, Jernigan RL, Bahar I. Protein Actions: Principles and
        Modeling. *Garland Science* **2017**. """
 
-    cc = calcCrossCorr(modes, n_cpu=n_cpu, norm=norm)
-    cc_diag = np.diag(cc).reshape(-1,1)
-    distFluct = cc_diag.T + cc_diag -2.*cc
-    return distFluct
+    cc = calcCrossCorr(modes, n_cpu=n_cpu, norm=norm, **kwargs)
+    n = cc.shape[0]
+    cc_diag = np.diag(cc).copy()
+    size = _getTileSize(n, n, max_memory=kwargs.get('max_memory', 256))
+    for start in range(0, n, size):
+        stop = min(start + size, n)
+        cc[start:stop] = (cc_diag[start:stop, np.newaxis] + cc_diag 
+                          - 2. * cc[start:stop])
+    return cc
 
 def calcTempFactors(modes, atoms):
     """Returns temperature (β) factors calculated using *modes* from a
@@ -455,14 +464,22 @@ def calcTempFactors(modes, atoms):
     return sqf * (expBetas.sum() / sqf.sum())
 
 
-def calcCovariance(modes):
-    """Returns covariance matrix calculated for given *modes*."""
+def calcCovariance(modes, n_cpu=1, **kwargs):
+    """Returns covariance matrix calculated for given *modes*.  The matrix is 
+    calculated in blocks of rows, optionally using *n_cpu* threads, and 
+    accepts *out* and *max_memory* arguments as :func:`.calcCrossCorr`."""
 
-    if isinstance(modes, NMA):
-        return modes.getCovariance()
-    else:
-        V, W, _, _ = _getModeProperties(modes)
-        return np.dot(V, np.dot(W, V.T))
+    out = kwargs.get('out')
+    if isinstance(modes, NMA) and out is None and modes._cov is not None:
+        return modes._cov
+
+    V, W, _, _ = _getModeProperties(modes)
+    variances = np.diag(W)
+    cov = _calcTiledProduct(V, V * variances, out=out, n_cpu=n_cpu, 
+                            max_memory=kwargs.get('max_memory', 256))
+    if isinstance(modes, NMA) and out is None:
+        modes._cov = cov
+    return cov
 
 
 def calcPairDeformationDist(model, coords, ind1, ind2, kbt=1.):                                       
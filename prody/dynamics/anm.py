@@ -9,10 +9,10 @@ from prody import LOGGER
 from prody.atomic import Atomic, AtomGroup
 from prody.proteins import parsePDB
 from prody.utilities import checkCoords, solveEig
-from prody.kdtree import KDTree
 
 from .nma import NMA, MaskedNMA
-from .gnm import GNMBase, checkENMParameters
+from .gnm import GNMBase, checkENMParameters, getContacts, calcGammas, \
+    assembleKirchhoff
 
 __all__ = ['ANM', 'MaskedANM', 'calcANM']
 
@@ -25,6 +25,7 @@ class ANMBase(NMA):
         self._cutoff = None
         self._gamma = None
         self._hessian = None
+        self._nullspace = None
 
     def _reset(self):
 
@@ -32,6 +33,7 @@ class ANMBase(NMA):
         self._cutoff = None
         self._gamma = None
         self._hessian = None
+        self._nullspace = None
         self._is3d = True
     
     def _clear(self):
@@ -52,9 +54,15 @@ class ANMBase(NMA):
 
     def setHessian(self, hessian):
         """Set Hessian matrix.  A symmetric matrix is expected, i.e. not a
-        lower- or upper-triangular matrix."""
+        lower- or upper-triangular matrix.  Scipy sparse matrices are also
+        accepted."""
 
-        if not isinstance(hessian, np.ndarray):
+        try:
+            from scipy.sparse import issparse
+        except ImportError:
+            issparse = lambda matrix: False
+
+        if not isinstance(hessian, np.ndarray) and not issparse(hessian):
             raise TypeError('hessian must be a Numpy array')
         elif hessian.ndim != 2 or hessian.shape[0] != hessian.shape[1]:
             raise ValueError('hessian must be square matrix')
@@ -87,15 +95,18 @@ class ANMBase(NMA):
             Scipy is not found, :class:`ImportError` is raised.
         :type sparse: bool
 
-        :arg kdtree: elect to use KDTree for building Hessian matrix,
-            default is **False** since KDTree method is slower
+        :arg kdtree: elect to use KDTree for finding contacts, otherwise
+            distances are evaluated in blocks of rows, default is **False**
         :type kdtree: bool
 
         Instances of :class:`Gamma` classes and custom functions are
         accepted as *gamma* argument.
 
-        When Scipy is available, user can select to use sparse matrices for
-        efficient usage of memory at the cost of computation speed."""
+        Contacts are found in a single pass and all 3x3 super-elements are
+        computed and placed into the matrix in bulk, see
+        :func:`assembleHessian`.  Sparse matrices are assembled directly in
+        compressed sparse row format and use memory proportional to the
+        number of contacts."""
 
         try:
             coords = (coords._getCoords() if hasattr(coords, '_getCoords') else
@@ -117,79 +128,23 @@ class ANMBase(NMA):
         LOGGER.timeit('_anm_hessian')
 
         sparse = kwargs.get('sparse', False)
-        if sparse:
-            try:
-                from scipy import sparse as scipy_sparse
-            except ImportError:
-                raise ImportError('failed to import scipy.sparse, which  is '
-                                  'required for sparse matrix calculations')
-            kirchhoff = scipy_sparse.lil_matrix((n_atoms, n_atoms))
-            hessian = scipy_sparse.lil_matrix((dof, dof))
-        else:
-            kirchhoff = np.zeros((n_atoms, n_atoms), 'd')
-            hessian = np.zeros((dof, dof), float)
-
-        if kwargs.get('kdtree', False):
+        kdtree = kwargs.get('kdtree', False)
+        if kdtree:
             LOGGER.info('Using KDTree for building the Hessian.')
-            kdtree = KDTree(coords)
-            kdtree.search(cutoff)
-            for i, j in kdtree.getIndices():
-                i2j = coords[j] - coords[i]
-                dist2 = np.dot(i2j, i2j)
-                g = gamma(dist2, i, j)
-                super_element = np.outer(i2j, i2j) * (- g / dist2)
-                res_i3 = i*3
-                res_i33 = res_i3+3
-                res_j3 = j*3
-                res_j33 = res_j3+3
-                hessian[res_i3:res_i33, res_j3:res_j33] = super_element
-                hessian[res_j3:res_j33, res_i3:res_i33] = super_element
-                hessian[res_i3:res_i33, res_i3:res_i33] = \
-                    hessian[res_i3:res_i33, res_i3:res_i33] - super_element
-                hessian[res_j3:res_j33, res_j3:res_j33] = \
-                    hessian[res_j3:res_j33, res_j3:res_j33] - super_element
-                kirchhoff[i, j] = -g
-                kirchhoff[j, i] = -g
-                kirchhoff[i, i] = kirchhoff[i, i] + g
-                kirchhoff[j, j] = kirchhoff[j, j] + g
-        else:
-            cutoff2 = cutoff * cutoff
-            for i in range(n_atoms):
-                res_i3 = i*3
-                res_i33 = res_i3+3
-                i_p1 = i+1
-                i2j_all = coords[i_p1:, :] - coords[i]
-                for j, dist2 in enumerate((i2j_all ** 2).sum(1)):
-                    if dist2 > cutoff2:
-                        continue
-                    i2j = i2j_all[j]
-                    j += i_p1
-                    g = gamma(dist2, i, j)
-                    res_j3 = j*3
-                    res_j33 = res_j3+3
-                    super_element = np.outer(i2j, i2j) * (- g / dist2)
-                    hessian[res_i3:res_i33, res_j3:res_j33] = super_element
-                    hessian[res_j3:res_j33, res_i3:res_i33] = super_element
-                    hessian[res_i3:res_i33, res_i3:res_i33] = \
-                        hessian[res_i3:res_i33, res_i3:res_i33] - super_element
-                    hessian[res_j3:res_j33, res_j3:res_j33] = \
-                        hessian[res_j3:res_j33, res_j3:res_j33] - super_element
-                    kirchhoff[i, j] = -g
-                    kirchhoff[j, i] = -g
-                    kirchhoff[i, i] = kirchhoff[i, i] + g
-                    kirchhoff[j, j] = kirchhoff[j, j] + g
-
-        if sparse:
-            kirchhoff = kirchhoff.tocsr()
-            hessian = hessian.tocsr()
+        i, j, dist2 = getContacts(coords, cutoff, kdtree=kdtree)
+        gammas = calcGammas(g, dist2, i, j)
+
+        kirchhoff = assembleKirchhoff(n_atoms, i, j, gammas, sparse=sparse)
+        hessian = assembleHessian(coords, i, j, dist2, gammas, sparse=sparse)
 
         LOGGER.report('Hessian was built in %.2fs.', label='_anm_hessian')
         self._kirchhoff = kirchhoff
         self._hessian = hessian
+        self._nullspace = calcRigidBodyModes(coords)
         self._n_atoms = n_atoms
         self._dof = dof
 
-    def calcModes(self, n_modes=20, zeros=False, turbo=True):
+    def calcModes(self, n_modes=20, zeros=False, turbo=True, **kwargs):
         """Calculate normal modes.  This method uses :func:`scipy.linalg.eigh`
         function to diagonalize the Hessian matrix. When Scipy is not found,
         :func:`numpy.linalg.eigh` is used.
@@ -203,6 +158,15 @@ class ANMBase(NMA):
 
         :arg turbo: Use a memory intensive, but faster way to calculate modes.
         :type turbo: bool, default is **True**
+
+        :arg solver: eigensolver, ``'auto'``, ``'dense'``,
+            ``'arpack-shift-invert'`` or ``'lobpcg'``, see :func:`.solveEig`
+            for this and other solver options, e.g. *v0* for a warm start
+        :type solver: str
+
+        When the Hessian was built by :meth:`buildHessian`, rigid body
+        translations and rotations are passed to iterative solvers to be
+        deflated analytically.
         """
 
         if self._hessian is None:
@@ -215,8 +179,9 @@ class ANMBase(NMA):
         assert isinstance(turbo, bool), 'turbo must be a boolean'
         self._clear()
         LOGGER.timeit('_anm_calc_modes')
+        kwargs.setdefault('nullspace', self._nullspace)
         values, vectors, vars = solveEig(self._hessian, n_modes=n_modes, zeros=zeros, 
-                                         turbo=turbo, expct_n_zeros=6)
+                                         turbo=turbo, expct_n_zeros=6, **kwargs)
         self._eigvals = values
         self._array = vectors
         self._vars = vars
@@ -257,9 +222,9 @@ class MaskedANM(ANM, MaskedNMA):
         ANM.__init__(self, name)
         MaskedNMA.__init__(self, name, mask, masked)
 
-    def calcModes(self, n_modes=20, zeros=False, turbo=True):
+    def calcModes(self, n_modes=20, zeros=False, turbo=True, **kwargs):
         self._maskedarray = None
-        super(MaskedANM, self).calcModes(n_modes, zeros, turbo)
+        super(MaskedANM, self).calcModes(n_modes, zeros, turbo, **kwargs)
 
     def _reset(self):
         super(MaskedANM, self)._reset()
@@ -307,6 +272,77 @@ class MaskedANM(ANM, MaskedNMA):
         return hessian
 
 
+def calcRigidBodyModes(coords):
+    """Returns an array with shape ``(3 * n_atoms, 6)`` whose columns are rigid
+    body translations and rotations of *coords*.  Columns are not normalized
+    and rotations are linearly dependent for collinear coordinates."""
+
+    n_atoms = coords.shape[0]
+    centered = coords - coords.mean(0)
+    modes = np.zeros((n_atoms, 3, 6))
+    for k in range(3):
+        modes[:, k, k] = 1.
+    x, y, z = centered.T
+    modes[:, 1, 3] = -z
+    modes[:, 2, 3] = y
+    modes[:, 0, 4] = z
+    modes[:, 2, 4] = -x
+    modes[:, 0, 5] = -y
+    modes[:, 1, 5] = x
+    return modes.reshape((n_atoms * 3, 6))
+
+
+def assembleHessian(coords, i, j, dist2, gammas, sparse=False):
+    """Returns a Hessian matrix assembled in bulk from contact arrays *i* and
+    *j*, squared distances *dist2* and force constants *gammas*, as returned
+    by :func:`.getContacts` and :func:`.calcGammas`.  Super-elements of all
+    contacts are computed as a single ``(n_contacts, 3, 3)`` array.  When
+    *sparse* is **True**, a :class:`scipy.sparse.csr_matrix` is returned."""
+
+    n_atoms = coords.shape[0]
+    dof = n_atoms * 3
+
+    i2j = coords[j] - coords[i]
+    super_elements = i2j[:, :, np.newaxis] * i2j[:, np.newaxis, :]
+    super_elements *= (- gammas / dist2)[:, np.newaxis, np.newaxis]
+
+    diagonal = np.zeros((n_atoms, 3, 3))
+    for k in range(3):
+        for l in range(3):
+            elements = super_elements[:, k, l]
+            diagonal[:, k, l] = -(np.bincount(i, elements, n_atoms) +
+                                  np.bincount(j, elements, n_atoms))
+
+    if sparse:
+        try:
+            from scipy import sparse as scipy_sparse
+        except ImportError:
+            raise ImportError('failed to import scipy.sparse, which  is '
+                              'required for sparse matrix calculations')
+        nodes = np.arange(n_atoms)
+        block_rows = np.concatenate([i, j, nodes]) * 3
+        block_cols = np.concatenate([j, i, nodes]) * 3
+        blocks = np.concatenate([super_elements, super_elements, diagonal])
+        offsets = np.arange(3)
+        rows = block_rows[:, np.newaxis, np.newaxis] + \
+               offsets[np.newaxis, :, np.newaxis]
+        cols = block_cols[:, np.newaxis, np.newaxis] + \
+               offsets[np.newaxis, np.newaxis, :]
+        rows, cols = np.broadcast_arrays(rows, cols)
+        hessian = scipy_sparse.coo_matrix((blocks.ravel(),
+                                           (rows.ravel(), cols.ravel())),
+                                          shape=(dof, dof)).tocsr()
+        hessian.eliminate_zeros()
+    else:
+        hessian = np.zeros((dof, dof), float)
+        blocks = hessian.reshape(n_atoms, 3, n_atoms, 3)
+        blocks[i, :, j, :] = super_elements
+        blocks[j, :, i, :] = super_elements
+        nodes = np.arange(n_atoms)
+        blocks[nodes, :, nodes, :] = diagonal
+    return hessian
+
+
 def calcANM(pdb, selstr='calpha', cutoff=15., gamma=1., n_modes=20,
             zeros=False, title=None):
     """Returns an :class:`ANM` instance and atoms used for the calculations.
@@ -31,6 +31,17 @@ class Gamma(object):
 
         pass
 
+    def gamma_batch(self, dist2, i, j):
+        """Returns an array of force constants for all contacts at once.
+
+        Arrays of squared distances and of node indices of interacting pairs
+        are passed to this function.  This implementation calls :meth:`gamma`
+        for each pair, derived classes may override it to evaluate force
+        constants in a single array operation."""
+
+        return np.array([self.gamma(dist2_ij, i_, j_)
+                         for dist2_ij, i_, j_ in zip(dist2, i, j)], float)
+
 
 class GammaStructureBased(Gamma):
 
@@ -197,6 +208,28 @@ class GammaStructureBased(Gamma):
 
         return self._gamma
 
+    def gamma_batch(self, dist2, i, j):
+        """Returns an array of force constants for all contacts at once."""
+
+        dist2 = np.asarray(dist2)
+        sstr = self._sstr
+        ssid = self._ssid
+        rnum = self._rnum
+        sstr_i = sstr[i]
+        same = ssid[i] == ssid[j]
+        i_j = np.abs(rnum[j] - rnum[i])
+        helix = (same & (dist2 <= 49) &
+                 (((i_j <= 4) & (sstr_i == 'H')) |
+                  ((i_j <= 3) & (sstr_i == 'G')) |
+                  ((i_j <= 5) & (sstr_i == 'I'))))
+        sheet = ~same & (sstr_i == 'E') & (sstr[j] == 'E') & (dist2 <= 36)
+
+        gammas = np.ones(len(dist2)) * self._gamma
+        gammas[helix] = self._helix
+        gammas[sheet] = self._sheet
+        gammas[dist2 <= 16] = self._connected
+        return gammas
+
 
 class GammaVariableCutoff(Gamma):
 
@@ -299,3 +332,13 @@ class GammaVariableCutoff(Gamma):
                   'effective cutoff:', str(cutoff), 'distance:',
                   str(dist2**0.5), 'gamma:', str(gamma)]))  # PY3K: OK
         return gamma
+
+    def gamma_batch(self, dist2, i, j):
+        """Returns an array of force constants for all contacts at once."""
+
+        if self._debug:
+            return super(GammaVariableCutoff, self).gamma_batch(dist2, i, j)
+
+        radii = self._radii
+        cutoff2 = (radii[i] + radii[j]) ** 2
+        return np.where(np.asarray(dist2) < cutoff2, self._gamma, 0.)
@@ -13,6 +13,11 @@ from prody.proteins import parsePDB
 from prody.kdtree import KDTree
 from prody.utilities import importLA, checkCoords, solveEig, ZERO
 
+try:
+    from scipy.sparse import issparse
+except ImportError:
+    issparse = lambda matrix: False
+
 from .nma import NMA, MaskedNMA
 from .gamma import Gamma
 
@@ -98,6 +103,112 @@ def checkENMParameters(cutoff, gamma):
     return cutoff, gamma, gamma_func
 
 
+def getContacts(coords, cutoff, kdtree=True):
+    """Returns node pairs that are within *cutoff* of each other as three
+    arrays: indices of the first nodes, indices of the second nodes, and
+    squared distances.  Pairs are sorted and the first index is always
+    smaller than the second one.
+
+    :arg coords: coordinate array with shape ``(n_nodes, 3)``
+    :type coords: :class:`numpy.ndarray`
+
+    :arg cutoff: cutoff distance (Å)
+    :type cutoff: float
+
+    :arg kdtree: elect to use :class:`.KDTree` for finding contacts, otherwise
+        distances are evaluated in blocks of rows, default is **True**
+    :type kdtree: bool"""
+
+    n_atoms = coords.shape[0]
+    cutoff2 = cutoff * cutoff
+
+    if kdtree and n_atoms > 1:
+        tree = KDTree(coords)
+        tree.search(cutoff)
+        pairs = tree.getIndices()
+        if pairs is None:
+            pairs = np.zeros((0, 2), int)
+        pairs = np.asarray(pairs, int).reshape(-1, 2)
+        i = pairs.min(1)
+        j = pairs.max(1)
+    else:
+        # squared distances are evaluated in blocks of rows using matrix
+        # products, the margin accounts for round-off errors and candidate
+        # pairs are filtered using exact distances below
+        size = max(1, 2 ** 22 // max(n_atoms, 1))
+        norms = (coords ** 2).sum(1)
+        margin = 1e-8 * norms.max() + 1e-8
+        i_list = []
+        j_list = []
+        for start in range(0, n_atoms - 1, size):
+            stop = min(start + size, n_atoms - 1)
+            dist2 = np.dot(coords[start:stop], coords[start:].T)
+            dist2 *= -2
+            dist2 += norms[start:stop, np.newaxis]
+            dist2 += norms[np.newaxis, start:]
+            # only pairs from the upper triangle are kept
+            dist2[np.tril_indices(stop - start, 0, dist2.shape[1])] = np.inf
+            rows, cols = np.nonzero(dist2 <= cutoff2 + margin)
+            i_list.append(rows + start)
+            j_list.append(cols + start)
+        if i_list:
+            i = np.concatenate(i_list)
+            j = np.concatenate(j_list)
+        else:
+            i = j = np.zeros(0, int)
+
+    order = np.lexsort((j, i))
+    i = i[order]
+    j = j[order]
+    i2j = coords[j] - coords[i]
+    dist2 = (i2j ** 2).sum(1)
+    which = dist2 <= cutoff2
+    return i[which], j[which], dist2[which]
+
+
+def calcGammas(gamma, dist2, i, j):
+    """Returns an array of force constants for contacts given by arrays of
+    squared distances *dist2* and node indices *i* and *j*.  *gamma* may be
+    a number, a :class:`.Gamma` instance, or a custom function that accepts
+    a single pair, as in :func:`checkENMParameters`."""
+
+    if isinstance(gamma, Gamma):
+        gammas = gamma.gamma_batch(dist2, i, j)
+    elif isinstance(gamma, FunctionType):
+        gammas = [gamma(d, a, b) for d, a, b in zip(dist2, i, j)]
+    else:
+        return np.ones(len(dist2)) * float(gamma)
+    return np.asarray(gammas, float).reshape(len(dist2))
+
+
+def assembleKirchhoff(n_atoms, i, j, gammas, sparse=False):
+    """Returns a Kirchhoff matrix for *n_atoms* nodes assembled in bulk from
+    contact arrays *i* and *j* and force constants *gammas*.  When *sparse*
+    is **True**, a :class:`scipy.sparse.csr_matrix` is returned."""
+
+    diag = (np.bincount(i, gammas, n_atoms) +
+            np.bincount(j, gammas, n_atoms))
+    if sparse:
+        try:
+            from scipy import sparse as scipy_sparse
+        except ImportError:
+            raise ImportError('failed to import scipy.sparse, which  is '
+                              'required for sparse matrix calculations')
+        nodes = np.arange(n_atoms)
+        rows = np.concatenate([i, j, nodes])
+        cols = np.concatenate([j, i, nodes])
+        data = np.concatenate([-gammas, -gammas, diag])
+        kirchhoff = scipy_sparse.coo_matrix((data, (rows, cols)),
+                                            shape=(n_atoms, n_atoms)).tocsr()
+        kirchhoff.eliminate_zeros()
+    else:
+        kirchhoff = np.zeros((n_atoms, n_atoms), 'd')
+        kirchhoff[i, j] = -gammas
+        kirchhoff[j, i] = -gammas
+        kirchhoff[np.diag_indices(n_atoms)] = diag
+    return kirchhoff
+
+
 class GNM(GNMBase):
 
     """A class for Gaussian Network Model (GNM) analysis of proteins
@@ -116,9 +227,9 @@ class GNM(GNMBase):
         super(GNM, self).__init__(name)
 
     def setKirchhoff(self, kirchhoff):
-        """Set Kirchhoff matrix."""
+        """Set Kirchhoff matrix.  Scipy sparse matrices are also accepted."""
 
-        if not isinstance(kirchhoff, np.ndarray):
+        if not isinstance(kirchhoff, np.ndarray) and not issparse(kirchhoff):
             raise TypeError('kirchhoff must be a Numpy array')
         elif (not kirchhoff.ndim == 2 or
               kirchhoff.shape[0] != kirchhoff.shape[1]):
@@ -151,16 +262,17 @@ class GNM(GNMBase):
             Scipy is not found, :class:`ImportError` is raised.
         :type sparse: bool
 
-        :arg kdtree: elect to use KDTree for building Kirchhoff matrix faster,
-            default is **True**
+        :arg kdtree: elect to use KDTree for finding contacts, otherwise
+            distances are evaluated in blocks of rows, default is **True**
         :type kdtree: bool
 
 
         Instances of :class:`Gamma` classes and custom functions are
-        accepted as *gamma* argument.
+        accepted as *gamma* argument.  Force constants of all contacts are
+        obtained at once using :meth:`.Gamma.gamma_batch`.
 
-        When Scipy is available, user can select to use sparse matrices for
-        efficient usage of memory at the cost of computation speed."""
+        The matrix is assembled in bulk from contact arrays, and sparse
+        matrices are built directly in compressed sparse row format."""
 
         try:
             coords = (coords._getCoords() if hasattr(coords, '_getCoords') else
@@ -179,50 +291,11 @@ class GNM(GNMBase):
 
         n_atoms = coords.shape[0]
         start = time.time()
-        sparse = kwargs.get('sparse', False)
-        if sparse:
-            try:
-                from scipy import sparse as scipy_sparse
-            except ImportError:
-                raise ImportError('failed to import scipy.sparse, which  is '
-                                  'required for sparse matrix calculations')
-            kirchhoff = scipy_sparse.lil_matrix((n_atoms, n_atoms))
-        else:
-            kirchhoff = np.zeros((n_atoms, n_atoms), 'd')
-
-        if kwargs.get('kdtree', True):
-            kdtree = KDTree(coords)
-            kdtree.search(cutoff)
-            dist2 = kdtree.getDistances() ** 2
-            r = 0
-            for i, j in kdtree.getIndices():
-                g = gamma(dist2[r], i, j)
-                kirchhoff[i, j] = -g
-                kirchhoff[j, i] = -g
-                kirchhoff[i, i] = kirchhoff[i, i] + g
-                kirchhoff[j, j] = kirchhoff[j, j] + g
-                r += 1
-        else:
-            LOGGER.info('Using slower method for building the Kirchhoff.')
-            cutoff2 = cutoff * cutoff
-            mul = np.multiply
-            for i in range(n_atoms):
-                xyz_i = coords[i, :]
-                i_p1 = i+1
-                i2j = coords[i_p1:, :] - xyz_i
-                mul(i2j, i2j, i2j)
-                for j, dist2 in enumerate(i2j.sum(1)):
-                    if dist2 > cutoff2:
-                        continue
-                    j += i_p1
-                    g = gamma(dist2, i, j)
-                    kirchhoff[i, j] = -g
-                    kirchhoff[j, i] = -g
-                    kirchhoff[i, i] = kirchhoff[i, i] + g
-                    kirchhoff[j, j] = kirchhoff[j, j] + g
-
-        if sparse:
-            kirchhoff = kirchhoff.tocsr()
+        i, j, dist2 = getContacts(coords, cutoff,
+                                  kdtree=kwargs.get('kdtree', True))
+        gammas = calcGammas(g, dist2, i, j)
+        kirchhoff = assembleKirchhoff(n_atoms, i, j, gammas,
+                                      sparse=kwargs.get('sparse', False))
 
         LOGGER.debug('Kirchhoff was built in {0:.2f}s.'
                      .format(time.time()-start))
@@ -230,7 +303,7 @@ class GNM(GNMBase):
         self._n_atoms = n_atoms
         self._dof = n_atoms
 
-    def calcModes(self, n_modes=20, zeros=False, turbo=True):
+    def calcModes(self, n_modes=20, zeros=False, turbo=True, **kwargs):
         """Calculate normal modes.  This method uses :func:`scipy.linalg.eigh`
         function to diagonalize the Kirchhoff matrix. When Scipy is not found,
         :func:`numpy.linalg.eigh` is used.
@@ -245,6 +318,13 @@ class GNM(GNMBase):
         :arg turbo: Use a memory intensive, but faster way to calculate modes.
         :type turbo: bool, default is **True**
 
+        :arg solver: eigensolver, ``'auto'``, ``'dense'``,
+            ``'arpack-shift-invert'`` or ``'lobpcg'``, see :func:`.solveEig`
+            for this and other solver options, e.g. *v0* for a warm start
+        :type solver: str
+
+        The uniform mode is passed to iterative solvers to be deflated
+        analytically.
         """
 
         if self._kirchhoff is None:
@@ -257,8 +337,9 @@ class GNM(GNMBase):
         assert isinstance(turbo, bool), 'turbo must be a boolean'
         self._clear()
         LOGGER.timeit('_gnm_calc_modes')
+        kwargs.setdefault('nullspace', np.ones(self._kirchhoff.shape[0]))
         values, vectors, vars = solveEig(self._kirchhoff, n_modes=n_modes, zeros=zeros, 
-                                         turbo=turbo, expct_n_zeros=1)
+                                         turbo=turbo, expct_n_zeros=1, **kwargs)
 
         self._eigvals = values
         self._array = vectors
@@ -327,18 +408,18 @@ class MaskedGNM(GNM, MaskedNMA):
         GNM.__init__(self, name)
         MaskedNMA.__init__(self, name, mask, masked)
 
-    def calcModes(self, n_modes=20, zeros=False, turbo=True):
+    def calcModes(self, n_modes=20, zeros=False, turbo=True, **kwargs):
         self._maskedarray = None
-        super(MaskedGNM, self).calcModes(n_modes, zeros, turbo)
+        super(MaskedGNM, self).calcModes(n_modes, zeros, turbo, **kwargs)
 
     def _reset(self):
         super(MaskedGNM, self)._reset()
         self._maskedarray = None
 
     def setKirchhoff(self, kirchhoff):
-        """Set Kirchhoff matrix."""
+        """Set Kirchhoff matrix.  Scipy sparse matrices are also accepted."""
 
-        if not isinstance(kirchhoff, np.ndarray):
+        if not isinstance(kirchhoff, np.ndarray) and not issparse(kirchhoff):
             raise TypeError('kirchhoff must be a Numpy array')
         elif (not kirchhoff.ndim == 2 or
               kirchhoff.shape[0] != kirchhoff.shape[1]):
@@ -370,7 +451,16 @@ class MaskedGNM(GNM, MaskedNMA):
         if kirchhoff is None: return None
 
         if not self._isOriginal():
-            kirchhoff = self._extend(kirchhoff, axis=None)
+            if issparse(kirchhoff):
+                from scipy.sparse import coo_matrix
+                indices = np.flatnonzero(self.mask)
+                kirchhoff = kirchhoff.tocoo()
+                kirchhoff = coo_matrix((kirchhoff.data,
+                                        (indices[kirchhoff.row],
+                                         indices[kirchhoff.col])),
+                                       shape=(len(self.mask),) * 2).tocsr()
+            else:
+                kirchhoff = self._extend(kirchhoff, axis=None)
 
         return kirchhoff
 
@@ -10,6 +10,7 @@ from prody import LOGGER, PY2K
 from prody.atomic import Atomic
 from prody.ensemble import Ensemble, PDBEnsemble
 from prody.trajectory import TrajBase
+from prody.measure.transform import getTransformations
 from prody.utilities import importLA, solveEig, ZERO
 
 from .nma import NMA
@@ -28,6 +29,12 @@ class PCA(NMA):
     def __init__(self, name='Unknown'):
 
         NMA.__init__(self, name)
+        self._sketch = None
+
+    def _reset(self):
+
+        NMA._reset(self)
+        self._sketch = None
 
     def setCovariance(self, covariance, is3d=True):
         """Set covariance matrix."""
@@ -73,6 +80,25 @@ class PCA(NMA):
         coordinate set (see :meth:`.Frame.superpose`).  If frames are already
         aligned, use ``aligned=True`` argument to skip this step.
 
+        Coordinate sets are read, aligned and accumulated in chunks, so that
+        memory usage is bounded for long trajectories.
+
+        :arg chunk_size: number of coordinate sets in a chunk, default is
+            determined by *max_memory*
+        :type chunk_size: int
+
+        :arg max_memory: memory in megabytes used for a chunk, default is 256
+        :type max_memory: float
+
+        :arg prefetch: number of trajectory chunks read ahead on a background
+            thread while the current chunk is accumulated, default is 1
+        :type prefetch: int
+
+        :arg sketch: number of random vectors for a randomized low-rank 
+            sketch of the covariance matrix, which is built instead of the 
+            full matrix when given and allows for calculating up to *sketch*
+            modes using :meth:`calcModes`
+        :type sketch: int
 
         .. note::
            If *coordsets* is a :class:`.PDBEnsemble` instance, coordinates are
@@ -85,7 +111,6 @@ class PCA(NMA):
             raise TypeError('coordsets must be an Ensemble, Atomic, Numpy '
                             'array instance')
         LOGGER.timeit('_prody_pca')
-        mean = None
         weights = None
         ensemble = None
         if isinstance(coordsets, np.ndarray):
@@ -101,38 +126,13 @@ class PCA(NMA):
             coordsets = coordsets._getCoordsets()
 
         update_coords = bool(kwargs.get('update_coords', False))
+        sketch = kwargs.get('sketch', None)
 
         if isinstance(coordsets, TrajBase):
-            nfi = coordsets.nextIndex()
-            coordsets.reset()
             n_atoms = coordsets.numSelected()
-            dof = n_atoms * 3
-            cov = np.zeros((dof, dof))
-            #mean = coordsets._getCoords().flatten()
-            n_confs = 0
-            n_frames = len(coordsets)
+            n_confs = len(coordsets)
             LOGGER.info('Covariance will be calculated using {0} frames.'
-                        .format(n_frames))
-            coordsum = np.zeros(dof)
-            LOGGER.progress('Building covariance', n_frames, '_prody_pca')
-            align = not kwargs.get('aligned', False)
-            for frame in coordsets:
-                if align:
-                    frame.superpose()
-                coords = frame._getCoords().flatten()
-                coordsum += coords
-                cov += np.outer(coords, coords)
-                n_confs += 1
-                LOGGER.update(n_confs, label='_prody_pca')
-            LOGGER.finish()
-            cov /= n_confs
-            coordsum /= n_confs
-            mean = coordsum
-            cov -= np.outer(coordsum, coordsum)
-            coordsets.goto(nfi)
-            self._cov = cov
-            if update_coords:
-                coordsets.setCoords(mean.reshape((n_atoms, 3)))
+                        .format(n_confs))
         else:
             n_confs = coordsets.shape[0]
             if n_confs < 3:
@@ -141,43 +141,72 @@ class PCA(NMA):
             n_atoms = coordsets.shape[1]
             if n_atoms < 3:
                 raise ValueError('coordsets must have more than 3 atoms')
-            dof = n_atoms * 3
             LOGGER.info('Covariance is calculated using {0} coordinate sets.'
                         .format(len(coordsets)))
-            s = (n_confs, dof)
-            if weights is None:
-                if coordsets.dtype == float:
-                    self._cov = np.cov(coordsets.reshape((n_confs, dof)).T,
-                                       bias=1)
-                else:
-                    cov = np.zeros((dof, dof))
-                    coordsets = coordsets.reshape((n_confs, dof))
-                    mean = coordsets.mean(0)
-                    LOGGER.progress('Building covariance', n_confs,
-                                    '_prody_pca')
-                    for i, coords in enumerate(coordsets.reshape(s)):
-                        deviations = coords - mean
-                        cov += np.outer(deviations, deviations)
-                        LOGGER.update(n_confs, label='_prody_pca')
-                    LOGGER.finish()
-                    cov /= n_confs
-                    self._cov = cov
-            else:
-                # PDB ensemble case
-                mean = np.zeros((n_atoms, 3))
-                for i, coords in enumerate(coordsets):
-                    mean += coords * weights[i]
-                mean /= weights.sum(0)
-                d_xyz = ((coordsets - mean) * weights).reshape(s)
-                divide_by = weights.astype(float).repeat(3, axis=2).reshape(s)
-                self._cov = np.dot(d_xyz.T, d_xyz) / np.dot(divide_by.T,
-                                                            divide_by)
-            if update_coords and ensemble is not None:
-                if mean is None:
-                    mean = coordsets.mean(0)
+        dof = n_atoms * 3
+
+        omega = None
+        if sketch is not None:
+            if weights is not None:
+                raise ValueError('sketch is not supported for PDBEnsemble')
+            sketch = int(min(sketch, dof))
+            if sketch < 1:
+                raise ValueError('sketch must be a positive integer')
+            omega = np.linalg.qr(np.random.standard_normal((dof, sketch)))[0]
+
+        chunk_size = kwargs.get('chunk_size', None)
+        if chunk_size is None:
+            chunk_size = kwargs.get('max_memory', 256) * 1024 ** 2 // (16 * dof)
+        chunk_size = int(min(max(chunk_size, 1), max(n_confs, 1)))
+
+        LOGGER.progress('Building covariance', n_confs, '_prody_pca')
+        if isinstance(coordsets, TrajBase):
+            chunks = _iterTrajectoryChunks(coordsets, chunk_size,
+                                           not kwargs.get('aligned', False),
+                                           kwargs.get('prefetch', 1))
+        else:
+            chunks = (coordsets[i:i + chunk_size]
+                      for i in range(0, n_confs, chunk_size))
+
+        if weights is None:
+            n_confs, mean, cov, trace = _calcChunkedCovariance(chunks, dof,
+                                                               omega)
+            cov /= n_confs
+            trace /= n_confs
+        else:
+            # PDB ensemble case
+            mean = np.zeros((n_atoms, 3))
+            for i, coords in enumerate(coordsets):
+                mean += coords * weights[i]
+            mean /= weights.sum(0)
+            cov = np.zeros((dof, dof))
+            divide_by = np.zeros((dof, dof))
+            for i in range(0, n_confs, chunk_size):
+                w = weights[i:i + chunk_size]
+                d_xyz = ((coordsets[i:i + chunk_size] - mean) * w
+                         ).reshape((len(w), dof))
+                cov += np.dot(d_xyz.T, d_xyz)
+                w = w.astype(float).repeat(3, axis=2).reshape((len(w), dof))
+                divide_by += np.dot(w.T, w)
+                LOGGER.update(i + len(w), label='_prody_pca')
+            cov /= divide_by
+            trace = cov.trace()
+        LOGGER.finish()
+
+        mean = mean.reshape((n_atoms, 3))
+        if update_coords:
+            if isinstance(coordsets, TrajBase):
+                coordsets.setCoords(mean)
+            elif ensemble is not None:
                 ensemble.setCoords(mean)
 
-        self._trace = self._cov.trace()
+        if omega is None:
+            self._cov = cov
+            self._sketch = None
+        else:
+            self._cov = None
+            self._sketch = (omega, cov)
+        self._trace = trace
         self._dof = dof
         self._n_atoms = n_atoms
         LOGGER.report('Covariance matrix calculated in %2fs.', '_prody_pca')
@@ -194,17 +223,26 @@ class PCA(NMA):
 
         :arg turbo: when available, use a memory intensive but faster way to
             calculate modes, default is **True**
-        :type turbo: bool"""
+        :type turbo: bool
+
+        When a randomized sketch of the covariance matrix is built (see 
+        :meth:`buildCovariance`), at most as many modes as the number of 
+        random vectors are approximated using the Nyström method."""
         
-        if self._cov is None:
+        sketch = getattr(self, '_sketch', None)
+        if self._cov is None and sketch is None:
             raise ValueError('covariance matrix is not built or set')
         start = time.time()
         self._clear()
         if str(n_modes).lower() == 'all':
             n_modes = None
         
-        values, vectors, _ = solveEig(self._cov, n_modes=n_modes, zeros=True, 
-                                      turbo=turbo, reverse=True)
+        if self._cov is None:
+            values, vectors = _calcSketchModes(sketch[0], sketch[1], n_modes)
+        else:
+            values, vectors, _ = solveEig(self._cov, n_modes=n_modes, 
+                                          zeros=True, turbo=turbo, 
+                                          reverse=True)
         which = values > ZERO
         self._eigvals = values[which]
         self._array = vectors[:, which]
@@ -286,6 +324,91 @@ class PCA(NMA):
         self._vars = self._eigvals
 
 
+def _iterTrajectoryChunks(traj, chunk_size, align=True, prefetch=1):
+    """Yield chunks of coordinate sets of selected atoms read from *traj*,
+    after superposing them onto the reference coordinates when *align* is
+    **True**.  Up to *prefetch* chunks are read ahead on a background
+    thread."""
+
+    nfi = traj.nextIndex()
+    traj.reset()
+    reference = traj._getCoords()
+    weights = traj._getWeights()
+    try:
+        for chunk in traj.iterChunks(chunk_size, prefetch=prefetch):
+            chunk = chunk.astype(float)
+            if align:
+                # chunks are superposed without starting a progress bar of
+                # their own inside that of the covariance
+                rotations, translations = getTransformations(chunk, reference,
+                                                             weights)
+                chunk = np.matmul(chunk, rotations.transpose(0, 2, 1))
+                chunk += translations[:, np.newaxis]
+            yield chunk
+    finally:
+        traj.goto(nfi)
+
+
+def _calcChunkedCovariance(chunks, dof, omega=None):
+    """Returns number of coordinate sets, mean, sum of squared deviations 
+    matrix and its trace accumulated over *chunks*, which are merged using
+    the pairwise update of Chan et al.  If *omega* is given, product of the 
+    matrix and *omega* is returned instead of the matrix."""
+
+    n = 0
+    mean = np.zeros(dof)
+    if omega is None:
+        m2 = np.zeros((dof, dof))
+    else:
+        m2 = np.zeros((dof, omega.shape[1]))
+    trace = 0.
+    for chunk in chunks:
+        m = len(chunk)
+        if not m:
+            continue
+        chunk = chunk.reshape((m, dof))
+        chunk_mean = chunk.mean(0, dtype=float)
+        deviations = chunk - chunk_mean
+        if omega is None:
+            m2 += np.dot(deviations.T, deviations)
+        else:
+            m2 += np.dot(deviations.T, np.dot(deviations, omega))
+        trace += np.einsum('ij,ij', deviations, deviations)
+
+        delta = chunk_mean - mean
+        factor = n * m / float(n + m)
+        if omega is None:
+            m2 += factor * np.outer(delta, delta)
+        else:
+            m2 += factor * np.outer(delta, np.dot(delta, omega))
+        trace += factor * np.dot(delta, delta)
+        mean += delta * (m / float(n + m))
+        n += m
+        LOGGER.update(n, label='_prody_pca')
+    return n, mean, m2, trace
+
+
+def _calcSketchModes(omega, sketch, n_modes=None):
+    """Returns eigenvalues and eigenvectors, in descending order, of the
+    Nyström approximation of a positive semi-definite matrix from its
+    product *sketch* with orthonormal random vectors *omega*."""
+
+    k = omega.shape[1]
+    if n_modes is None or n_modes > k:
+        n_modes = k
+    # shift by a small multiple of the norm for numerical stability
+    shift = np.sqrt(len(sketch)) * np.finfo(float).eps * \
+            np.linalg.norm(sketch, 2)
+    sketch = sketch + shift * omega
+    core = np.dot(omega.T, sketch)
+    values, vectors = np.linalg.eigh((core + core.T) / 2.)
+    which = values > values.max() * ZERO ** 2
+    factor = np.dot(sketch, vectors[:, which] / np.sqrt(values[which]))
+    vectors, values, _ = np.linalg.svd(factor, full_matrices=False)
+    values = np.clip(values ** 2 - shift, 0, None)
+    return values[:n_modes], vectors[:, :n_modes]
+
+
 class EDA(PCA):
 
     """A class for Essential Dynamics Analysis (EDA) [AA93]_.
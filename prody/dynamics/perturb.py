@@ -14,10 +14,57 @@ from .nma import NMA
 from .modeset import ModeSet
 from .mode import VectorBase, Mode, Vector
 from .gnm import GNMBase
-from .analysis import calcCovariance
+from .analysis import _getModeProperties, _getTileSize
 
 __all__ = ['calcPerturbResponse']
 
+def _iterPerturbResponse(model, **kwargs):
+    """Yields blocks of rows of the normalized PRS matrix of *model* with the 
+    indices of the first and after the last rows of each block. Blocks are 
+    calculated from the modes, or from the covariance matrix of an 
+    :class:`.NMA` if it has been set."""
+
+    suppress_diag = kwargs.get('suppress_diag', False)
+    no_diag = kwargs.get('no_diag', suppress_diag)
+    max_memory = kwargs.get('max_memory', 256)
+
+    n_atoms = model.numAtoms()
+    dim = 3 if model.is3d() else 1
+
+    cov = None
+    if isinstance(model, NMA) and model._cov is not None:
+        cov = model._cov
+        size = _getTileSize(n_atoms, dim * dim * n_atoms, max_memory=max_memory)
+    else:
+        V, W, _, _ = _getModeProperties(model)
+        # components of each atom, so that each 3x3 block of the covariance 
+        # is summed up from 9 products of N x n_modes arrays
+        V = [np.ascontiguousarray(V[k::dim]) for k in range(dim)]
+        VW = [v * np.diag(W) for v in V]
+        size = _getTileSize(n_atoms, 2 * n_atoms, max_memory=max_memory)
+
+    for start in range(0, n_atoms, size):
+        stop = min(start + size, n_atoms)
+        if cov is None:
+            block = np.zeros((stop - start, n_atoms))
+            for vw in VW:
+                for v in V:
+                    block += np.dot(vw[start:stop], v.T) ** 2
+        else:
+            block = np.array(cov[dim*start:dim*stop]) ** 2
+            if dim > 1:
+                block = block.reshape((stop - start, dim, n_atoms, dim)).sum(3).sum(1)
+
+        rows = np.arange(stop - start)
+        self_dp = block[rows, rows + start].copy()
+        block = div0(block, self_dp.reshape((-1, 1)))
+        if no_diag:
+            # suppress the diagonal (self displacement) to facilitate
+            # visualizing the response profile
+            block[rows, rows + start] = 0.
+        yield start, stop, block
+
+
 def calcPerturbResponse(model, **kwargs):
 
     """This function implements the perturbation response scanning (PRS) method
@@ -38,6 +85,12 @@ def calcPerturbResponse(model, **kwargs):
     *model* and *atoms* must have the same number of atoms. *atoms* must be an
     :class:`.AtomGroup` instance. 
 
+    The matrix is calculated in blocks of rows directly from the modes, without 
+    building the 3Nx3N covariance matrix, unless it has been set explicitly. 
+    It can be written into an array given as *out*, e.g. a 
+    :class:`~numpy.memmap`, and *max_memory* sets the memory in megabytes 
+    used for each block, default is 256.
+
     .. [CA09] Atilgan C, Atilgan AR, Perturbation-Response Scanning
        Reveals Ligand Entry-Exit Mechanisms of Ferric Binding Protein.
        *PLoS Comput Biol* **2009** 5(10):e1000544.
@@ -54,8 +107,6 @@ def calcPerturbResponse(model, **kwargs):
         raise ValueError('model must have normal modes calculated')
 
     atoms = kwargs.get('atoms', None)
-    suppress_diag = kwargs.get('suppress_diag', False)
-    no_diag = kwargs.get('no_diag', suppress_diag)
 
     if atoms is not None:
         if isinstance(atoms, Selection):
@@ -66,59 +117,25 @@ def calcPerturbResponse(model, **kwargs):
             raise ValueError('model and atoms must have the same number atoms')
 
     n_atoms = model.numAtoms()
-    # LOGGER.timeit('_prody_prs_all')
-    # LOGGER.info('Calculating covariance matrix')
-    # LOGGER.timeit('_prody_cov')
-
-    cov = model.getCovariance()
-
-    # LOGGER.clear()
-    # LOGGER.report('Covariance matrix calculated in %.1fs.', '_prody_cov')
-
-    # LOGGER.info('Calculating perturbation response')
-    # LOGGER.timeit('_prody_prs_mat')
-    if not model.is3d():
-        prs_matrix = cov**2
-
-    else:
-        cov_squared = cov**2
-        n_by_3n_cov_squared = np.zeros((n_atoms, 3 * n_atoms))
-        prs_matrix = np.zeros((n_atoms, n_atoms))
-        i3 = -3
-        i3p3 = 0
-        for i in range(n_atoms):
-            i3 += 3
-            i3p3 += 3
-            n_by_3n_cov_squared[i,:] = (cov_squared[i3:i3p3,:]).sum(0)
-
-        j3 = -3
-        j3p3 = 0
-        for j in range(n_atoms):
-            j3 += 3
-            j3p3 += 3                
-            prs_matrix[:,j] = (n_by_3n_cov_squared[:,j3:j3p3]).sum(1)
-
-    # LOGGER.clear()
-    # LOGGER.report('Perturbation response matrix calculated in %.1fs.',
-    #               '_prody_prs_mat')
-
-    norm_prs_matrix = np.zeros((n_atoms, n_atoms))
-    self_dp = np.diag(prs_matrix)  
-    self_dp = self_dp.reshape(n_atoms, 1)
-    re_self_dp = np.repeat(self_dp, n_atoms, axis=1)
-    norm_prs_matrix = div0(prs_matrix, re_self_dp)
-
-    if no_diag:
-       # suppress the diagonal (self displacement) to facilitate
-       # visualizing the response profile
-       norm_prs_matrix = norm_prs_matrix - np.diag(np.diag(norm_prs_matrix))
-    
-    W = 1 - np.eye(n_atoms)
-    effectiveness = np.average(norm_prs_matrix, weights=W, axis=1)
-    sensitivity = np.average(norm_prs_matrix, weights=W, axis=0)
-
-    # LOGGER.report('Perturbation response scanning completed in %.1fs.',
-    #               '_prody_prs_all')
+    out = kwargs.get('out', None)
+    if out is None:
+        out = np.empty((n_atoms, n_atoms))
+    elif out.shape != (n_atoms, n_atoms):
+        raise ValueError('out must be an array of shape ({0}, {0})'
+                         .format(n_atoms))
+
+    effectiveness = np.zeros(n_atoms)
+    sensitivity = np.zeros(n_atoms)
+    for start, stop, block in _iterPerturbResponse(model, **kwargs):
+        rows = np.arange(stop - start)
+        out[start:stop] = block
+        # average over other atoms, i.e. excluding the diagonal
+        block[rows, rows + start] = 0.
+        effectiveness[start:stop] = block.sum(1)
+        sensitivity += block.sum(0)
+    effectiveness = div0(effectiveness, n_atoms - 1)
+    sensitivity = div0(sensitivity, n_atoms - 1)
+    norm_prs_matrix = out
 
     if atoms is not None:
         try:
@@ -136,14 +153,16 @@ def calcPerturbResponse(model, **kwargs):
     return norm_prs_matrix, effectiveness, sensitivity
 
 
-def calcDynamicFlexibilityIndex(prs_matrix, atoms, select):
+def calcDynamicFlexibilityIndex(prs_matrix, atoms, select, **kwargs):
     """
     Calculate the dynamic flexibility index for the selected residue(s).
     This function implements the dynamic flexibility index (Dfi) method
     described in [ZNG13]_.
 
-    :arg prs_matrix: a matrix from PRS
-    :type prs_matrix: list, tuple, :class:`~numpy.ndarray`
+    :arg prs_matrix: a matrix from PRS, or a model that the PRS matrix is 
+        calculated for block by block without storing it, in which case other 
+        keyword arguments are passed as in :func:`.calcPerturbResponse`
+    :type prs_matrix: list, tuple, :class:`~numpy.ndarray`, :class:`.NMA`
 
     :arg atoms: an Atomic object from which residues are selected
     :type atoms: :class:`.Atomic`
@@ -156,5 +175,14 @@ def calcDynamicFlexibilityIndex(prs_matrix, atoms, select):
        *Evol Appl.* **2013** 6(3):423-33.
 
     """
-    profiles = sliceAtomicData(prs_matrix, atoms, select, axis=0)
-    return np.sum(profiles, axis=1)/np.sum(prs_matrix)
+    if isinstance(prs_matrix, (NMA, ModeSet, Mode)):
+        n_atoms = prs_matrix.numAtoms()
+        profiles = np.zeros(n_atoms)
+        for start, stop, block in _iterPerturbResponse(prs_matrix, **kwargs):
+            profiles[start:stop] = block.sum(1)
+        total = profiles.sum()
+    else:
+        profiles = np.sum(prs_matrix, axis=1)
+        total = np.sum(prs_matrix)
+    profiles = sliceAtomicData(profiles, atoms, select, axis=0)
+    return profiles/total
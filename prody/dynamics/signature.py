@@ -2,8 +2,10 @@
 """This module defines functions for analyzing normal modes obtained 
 for conformations in an ensemble."""
 
+import os
 import time
-from numbers import Integral
+import hashlib
+from numbers import Integral, Number
 from numpy import ndarray
 import numpy as np
 import warnings
@@ -23,8 +25,8 @@ from .compare import calcSpectralOverlap, matchModes, calcOverlap
 from .analysis import calcSqFlucts, calcCrossCorr, calcFractVariance, calcCollectivity
 from .plotting import showAtomicLines, showAtomicMatrix, showDomainBar
 from .perturb import calcPerturbResponse
-from .anm import ANM
-from .gnm import GNM
+from .anm import ANM, MaskedANM
+from .gnm import GNM, MaskedGNM
 
 __all__ = ['ModeEnsemble', 'sdarray', 'calcEnsembleENMs', 
            'showSignature1D', 'psplot', 'showSignatureAtomicLines', 
@@ -873,6 +875,114 @@ class sdarray(ndarray):
         return np.transpose(a, axes=axes)
 
 
+def _hashENM(coords, system, mask, model_type, trim, n_modes, kwargs):
+    """Returns a key identifying the ENM calculation for given coordinates and 
+    parameters, or **None** if some parameters, e.g. a custom gamma function, 
+    cannot be hashed reliably."""
+
+    params = []
+    for key in sorted(kwargs):
+        value = kwargs[key]
+        if value is not None and not isinstance(value, (Number, str)):
+            return None
+        params.append((key, value))
+
+    sha = hashlib.sha1()
+    sha.update(np.ascontiguousarray(coords, dtype=float).tobytes())
+    sha.update(np.ascontiguousarray(system, dtype=bool).tobytes())
+    sha.update(np.ascontiguousarray(mask, dtype=bool).tobytes())
+    sha.update(repr((model_type, trim, n_modes, params)).encode())
+    return sha.hexdigest()
+
+def _saveENMCache(filename, title, values, vectors):
+    """Saves title, eigenvalues and eigenvectors into *filename*. The file is 
+    renamed into place after writing so that concurrent readers never see 
+    partial data."""
+
+    temp = '{0}.{1}.tmp'.format(filename, os.getpid())
+    with open(temp, 'wb') as out:
+        np.savez(out, title=title, values=values, vectors=vectors)
+    try:
+        os.rename(temp, filename)
+    except OSError:
+        os.remove(temp)
+
+def _buildENM(model_type, title, values, vectors, mask=None):
+    """Returns an ENM instance with given modes."""
+
+    if model_type == 'ANM':
+        enm = ANM(title)
+        MaskedModel = MaskedANM
+    else:
+        enm = GNM(title)
+        MaskedModel = MaskedGNM
+    enm.setEigens(np.array(vectors), np.array(values))
+    if mask is not None:
+        enm = MaskedModel(enm, mask)
+    return enm
+
+_ENM_BUFFERS = {}
+
+def _initENMWorker(values, vectors, shape):
+    _ENM_BUFFERS['values'] = values
+    _ENM_BUFFERS['vectors'] = vectors
+    _ENM_BUFFERS['shape'] = shape
+
+def _getENMBuffers():
+    n, dof, k = _ENM_BUFFERS['shape']
+    values = np.frombuffer(_ENM_BUFFERS['values'], dtype=float).reshape((n, k))
+    vectors = np.frombuffer(_ENM_BUFFERS['vectors'], 
+                            dtype=float).reshape((n, dof, k))
+    return values, vectors
+
+def _calcENMWorker(args):
+    """Calculates the modes of a conformation and writes them into the shared 
+    buffers. Only the size of the result is returned to the main process."""
+
+    slot, coords, system, mask, kwargs = args
+    enm, _ = calcENM(coords, system, mask=mask, **kwargs)
+    enm_values, enm_vectors = enm._eigvals, enm._array
+    dof, k = enm_vectors.shape
+
+    values, vectors = _getENMBuffers()
+    values[slot, :k] = enm_values
+    vectors[slot, :dof, :k] = enm_vectors
+    return slot, enm.getTitle(), dof, k
+
+def _calcENMsParallel(tasks, model_type, trim, n_modes, labels, n_jobs, **kwargs):
+    """Yields index in *tasks*, title, eigenvalues and eigenvectors of each task 
+    calculated in a pool of *n_jobs* processes."""
+
+    from multiprocessing import Pool, RawArray
+
+    n_tasks = len(tasks)
+    dim = 3 if model_type == 'ANM' else 1
+    dof = dim * max(len(task[2]) for task in tasks)
+    k = dof if n_modes is None else min(n_modes, dof)
+
+    shape = (n_tasks, dof, k)
+    shared_values = RawArray('d', n_tasks * k)
+    shared_vectors = RawArray('d', n_tasks * dof * k)
+    _initENMWorker(shared_values, shared_vectors, shape)
+    values, vectors = _getENMBuffers()
+
+    args = []
+    for slot, (i, coords, system, mask, _) in enumerate(tasks):
+        params = dict(kwargs, model=model_type.lower(), trim=trim, n_modes=n_modes, 
+                      title=labels[i])
+        args.append((slot, coords, system, mask, params))
+
+    pool = Pool(n_jobs, initializer=_initENMWorker, 
+                initargs=(shared_values, shared_vectors, shape))
+    try:
+        for slot, title, dof_, k_ in pool.imap_unordered(_calcENMWorker, args):
+            yield (slot, title, values[slot, :k_].copy(), 
+                   vectors[slot, :dof_, :k_].copy())
+    finally:
+        pool.terminate()
+        pool.join()
+        _ENM_BUFFERS.clear()
+
 def calcEnsembleENMs(ensemble, model='gnm', trim='reduce', n_modes=20, **kwargs):
     """Calculates normal modes for each member of *ensemble*.
     
@@ -912,12 +1022,29 @@ def calcEnsembleENMs(ensemble, model='gnm', trim='reduce', n_modes=20, **kwargs)
                 Default is **False**
     :type turbo: bool
 
+    :arg n_jobs: number of processes used for building and diagonalizing the 
+                 models of the conformations. Eigenvectors are passed back 
+                 to the main process through shared memory. A value smaller 
+                 than 1 means as many processes as CPUs. Default is 1, i.e. 
+                 models are calculated serially
+    :type n_jobs: int
+
+    :arg cache: path to a folder where the modes of each conformation are 
+                stored, keyed by the coordinates and model parameters, so that 
+                repeated calls only calculate the models of new or changed 
+                conformations. Models restored from the cache or calculated 
+                in other processes contain modes only, e.g. no Hessian or 
+                Kirchhoff matrix. Default is **None**, i.e. no caching
+    :type cache: str
+
     :returns: :class:`.ModeEnsemble`
     """
 
     match = kwargs.pop('match', True)
     method = kwargs.pop('method', None)
     turbo = kwargs.pop('turbo', False)
+    n_jobs = kwargs.pop('n_jobs', 1)
+    cache = kwargs.pop('cache', None)
 
     if isinstance(ensemble, Conformation):
         conformation = ensemble
@@ -944,8 +1071,11 @@ def calcEnsembleENMs(ensemble, model='gnm', trim='reduce', n_modes=20, **kwargs)
 
     ### ENMs ###
     ## ENM for every conf
-    enms = []
     n_confs = ensemble.numConfs()
+    enms = [None] * n_confs
+
+    if cache is not None and not os.path.isdir(cache):
+        os.makedirs(cache)
 
     str_modes = 'all' if n_modes is None else str(n_modes)
     LOGGER.progress('Calculating {0} {1} modes for {2} conformations...'
@@ -953,8 +1083,9 @@ def calcEnsembleENMs(ensemble, model='gnm', trim='reduce', n_modes=20, **kwargs)
 
     coordsets = ensemble.getCoordsets(selected=False)
     weights = ensemble.getWeights(selected=False)
+    tasks = []
+    n_cached = 0
     for i in range(n_confs):
-        LOGGER.update(i, label='_prody_calcEnsembleENMs')
         coords = coordsets[i]
 
         if weights.ndim == 3:
@@ -967,10 +1098,50 @@ def calcEnsembleENMs(ensemble, model='gnm', trim='reduce', n_modes=20, **kwargs)
         system = torf_selected[torf_mapped]
         mask = torf_mapped[torf_selected]
 
-        enm, _ = calcENM(coords, system, model=model, mask=mask, trim=trim, 
-                         n_modes=n_modes, title=labels[i], **kwargs)
-        enm.masked = False
-        enms.append(enm)
+        filename = None
+        if cache is not None:
+            key = _hashENM(coords, system, mask, model_type, trim, n_modes, kwargs)
+            if key is not None:
+                filename = os.path.join(cache, key + '.npz')
+        if filename is not None and os.path.isfile(filename):
+            with np.load(filename) as data:
+                enm = _buildENM(model_type, str(data['title']), data['values'], 
+                                data['vectors'], mask)
+            enm.masked = False
+            enms[i] = enm
+            n_cached += 1
+            LOGGER.update(n_cached, label='_prody_calcEnsembleENMs')
+        else:
+            tasks.append((i, coords, system, mask, filename))
+
+    if n_cached:
+        LOGGER.debug('Modes of {0} conformations were loaded from {1}.'
+                     .format(n_cached, cache))
+
+    if n_jobs is None or n_jobs < 1:
+        from multiprocessing import cpu_count
+        n_jobs = cpu_count()
+
+    if n_jobs > 1 and len(tasks) > 1:
+        for n, (slot, title, values, vectors) in enumerate(
+            _calcENMsParallel(tasks, model_type, trim, n_modes, labels, n_jobs, 
+                              **kwargs)):
+            LOGGER.update(n_cached + n + 1, label='_prody_calcEnsembleENMs')
+            i, _, _, mask, filename = tasks[slot]
+            if filename is not None:
+                _saveENMCache(filename, title, values, vectors)
+            enm = _buildENM(model_type, title, values, vectors, mask)
+            enm.masked = False
+            enms[i] = enm
+    else:
+        for n, (i, coords, system, mask, filename) in enumerate(tasks):
+            LOGGER.update(n_cached + n, label='_prody_calcEnsembleENMs')
+            enm, _ = calcENM(coords, system, model=model, mask=mask, trim=trim, 
+                             n_modes=n_modes, title=labels[i], **kwargs)
+            if filename is not None:
+                _saveENMCache(filename, enm.getTitle(), enm._eigvals, enm._array)
+            enm.masked = False
+            enms[i] = enm
 
         #lbl = labels[i] if labels[i] != '' else '%d-th conformation'%(i+1)
     LOGGER.finish()
@@ -1269,7 +1440,7 @@ def showSignatureSqFlucts(mode_ensemble, **kwargs):
     show_zero = kwargs.pop('show_zero', False)
     return showSignature1D(sqf, atoms=atoms, show_zero=show_zero, **kwargs)
 
-def calcSignatureCrossCorr(mode_ensemble, norm=True):
+def calcSignatureCrossCorr(mode_ensemble, norm=True, **kwargs):
     """Calculate the signature cross-correlations based on a :class:`ModeEnsemble` instance.
     
     :arg mode_ensemble: an ensemble of ENMs 
@@ -1277,6 +1448,9 @@ def calcSignatureCrossCorr(mode_ensemble, norm=True):
 
     :keyword norm: whether to normalize the cross-correlations. Default is **True**
     :type norm: bool
+
+    Other keyword arguments, e.g. *n_cpu* and *max_memory*, are passed to 
+    :func:`.calcCrossCorr`.
     """
     
     if not isinstance(mode_ensemble, ModeEnsemble):
@@ -1291,11 +1465,11 @@ def calcSignatureCrossCorr(mode_ensemble, norm=True):
     C = np.zeros((n_sets, n_atoms, n_atoms))
     for i in range(n_sets):
         modes = mode_ensemble[i]
-        c = calcCrossCorr(modes, norm=norm)
-        C[i, :, :] = c
+        calcCrossCorr(modes, norm=norm, out=C[i], **kwargs)
 
     title_str = '%d modes'%mode_ensemble.numModes()
     weights = mode_ensemble.getWeights()
+    W = None
     if weights is not None:
         W = np.zeros((mode_ensemble.numModeSets(), 
                       mode_ensemble.numAtoms(), 
@@ -1316,6 +1490,7 @@ def calcSignaturePerturbResponse(mode_ensemble, **kwargs):
     :arg mode_ensemble: an ensemble of ENMs 
     :type mode_ensemble: :class: `ModeEnsemble`
 
+    Other keyword arguments are passed to :func:`.calcPerturbResponse`.
     """
     
     if not isinstance(mode_ensemble, ModeEnsemble):
@@ -1332,13 +1507,13 @@ def calcSignaturePerturbResponse(mode_ensemble, **kwargs):
     S = np.zeros((n_sets, n_atoms))
     for i in range(n_sets):
         modes = mode_ensemble[i]
-        prs_mat, eff, sen = calcPerturbResponse(modes, **kwargs)
-        P[i, :, :] = prs_mat
+        _, eff, sen = calcPerturbResponse(modes, out=P[i], **kwargs)
         E[i, :] = eff
         S[i, :] = sen
 
     title_str = '%d modes'%mode_ensemble.numModes()
     weights = mode_ensemble.getWeights()
+    W = W2 = None
     if weights is not None:
         W2 = np.zeros((mode_ensemble.numModeSets(), 
                        mode_ensemble.numAtoms(), 
@@ -37,7 +37,10 @@ Save/load ensembles
 -------------------
 
     * :func:`.saveEnsemble`
-    * :func:`.loadEnsemble`"""
+    * :func:`.loadEnsemble`
+
+Ensembles that do not fit in memory can be stored in chunks, appended to
+and read by index using :class:`.EnsembleFile`."""
 
 __all__ = []
 
@@ -57,3 +60,7 @@ from . import conformation
 from .conformation import *
 __all__.extend(conformation.__all__)
 
+from . import ensfile
+from .ensfile import *
+__all__.extend(ensfile.__all__)
+
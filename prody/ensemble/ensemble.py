@@ -3,15 +3,16 @@
 
 from numbers import Integral
 
-from numpy import dot, add, subtract, array, ndarray, sign, concatenate
+from numpy import array, ndarray, concatenate
 from numpy import zeros, ones, arange, isscalar, max, asarray
 from numpy import newaxis, unique, repeat, sum, empty
 
 from prody import LOGGER
 from prody.atomic import Atomic, sliceAtoms
 from prody.atomic.atomgroup import checkLabel
-from prody.measure import getRMSD, calcDeformVector
-from prody.utilities import importLA, checkCoords, checkWeights, copy, isListLike
+from prody.measure import getRMSD, calcDeformVector, superposeCoordsets
+from prody.measure import calcPairwiseRMSDMatrix
+from prody.utilities import checkCoords, checkWeights, copy, isListLike
 
 from .conformation import *
 
@@ -593,66 +594,20 @@ class Ensemble(object):
 
         indices = self._indices
         weights = self._weights
-        mobs = self._confs
-        if indices is None:
-            idx = False
-            tar = self._coords
-            movs = None
-        else:
-            idx = True
-            if self._weights is not None:
+        tar = self._coords
+        if indices is not None:
+            tar = tar[indices]
+            if weights is not None:
                 weights = weights[indices]
-            tar = self._coords[indices]
-            movs = self._confs
-
-        linalg = importLA()
-        svd = linalg.svd
-        det = linalg.det
 
-        if weights is None:
-            if ref is None:
-                tar_com = tar.mean(0)
-            else:
+        tar_com = None
+        if ref is not None:
+            if weights is None:
                 tar_com = tar[ref]
-
-            tar_org = (tar - tar_com)
-            mob_org = zeros(tar_org.shape, dtype=mobs.dtype)
-            tar_org = tar_org.T
-        else:
-            weights_sum = weights.sum()
-            weights_dot = dot(weights.T, weights)
-            if ref is None:
-                tar_com = (tar * weights).sum(axis=0) / weights_sum
             else:
                 tar_com = (tar[ref] * weights[ref]).sum(axis=0) / sum(weights[ref])
-            tar_org = (tar - tar_com)
-            mob_org = zeros(tar_org.shape, dtype=mobs.dtype)
 
-        LOGGER.progress('Superposing ', len(mobs), '_prody_ensemble')
-        for i, mob in enumerate(mobs):
-            if idx:
-                mob = mob[indices]
-            if weights is None:
-                mob_com = mob.mean(0)
-                matrix = dot(tar_org, subtract(mob, mob_com, mob_org))
-            else:
-                mob_com = (mob * weights).sum(axis=0) / weights_sum
-                subtract(mob, mob_com, mob_org)
-                matrix = dot((tar_org * weights).T,
-                             (mob_org * weights)) / weights_dot
-
-            U, s, Vh = svd(matrix)
-            Id = array([[1, 0, 0], [0, 1, 0], [0, 0, sign(det(matrix))]])
-            rotation = dot(Vh.T, dot(Id, U.T))
-
-            if movs is None:
-                mobs[i] = dot(mob_org, rotation)
-                add(mobs[i], tar_com, mobs[i])
-            else:
-                add(dot(movs[i], rotation),
-                    (tar_com - dot(mob_com, rotation)), movs[i])
-            LOGGER.update(i + 1, label='_prody_ensemble')
-        LOGGER.finish()
+        superposeCoordsets(self._confs, tar, weights, indices, tar_com=tar_com)
 
     def iterpose(self, rmsd=0.0001):
         """Iteratively superpose the ensemble until convergence.  Initially,
@@ -741,7 +696,7 @@ class Ensemble(object):
 
         return self._getCoordsets() - self._getCoords()
 
-    def getRMSDs(self, pairwise=False):
+    def getRMSDs(self, pairwise=False, **kwargs):
         """Returns root mean square deviations (RMSDs) for selected atoms.
         Conformations can be aligned using one of :meth:`superpose` or
         :meth:`iterpose` methods prior to RMSD calculation.
@@ -749,6 +704,10 @@ class Ensemble(object):
         :arg pairwise: if **True** then it will return pairwise RMSDs 
             as an n-by-n matrix. n is the number of conformations.
         :type pairwise: bool
+
+        Pairwise RMSDs are calculated using :func:`.calcPairwiseRMSDMatrix`
+        without superposing conformations, and *n_cpu*, *max_memory* and *out* 
+        arguments are passed to it.
         """
 
         if self._confs is None or self._coords is None:
@@ -761,11 +720,8 @@ class Ensemble(object):
         weights = self._weights[indices] if self._weights is not None else None
 
         if pairwise:
-            n_confs = self.numConfs()
-            RMSDs = zeros((n_confs, n_confs))
-            for i in range(n_confs):
-                for j in range(i+1, n_confs):
-                    RMSDs[i, j] = RMSDs[j, i] = getRMSD(self._confs[i, indices], self._confs[j, indices], weights)
+            RMSDs = calcPairwiseRMSDMatrix(self._confs[:, indices], weights,
+                                           superpose=False, **kwargs)
         else:
             RMSDs = getRMSD(self._coords[indices], self._confs[:, indices], weights)
 
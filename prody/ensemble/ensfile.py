@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+"""This module defines a class for storing ensembles in chunks on disk."""
+
+import os
+from os.path import isfile, join
+
+import numpy as np
+
+from prody import LOGGER
+from prody.atomic import saveAtoms, loadAtoms
+from prody.sequence import MSA
+from prody.utilities import openFile, makePath
+
+from .ensemble import Ensemble
+from .pdbensemble import PDBEnsemble
+
+__all__ = ['EnsembleFile']
+
+HEADER = 'header.npz'
+ATOMS = 'atoms.ag.npz'
+
+
+class EnsembleFile(object):
+
+    """A class for storing :class:`.Ensemble` and :class:`.PDBEnsemble`
+    instances in a directory of chunk files.  Conformations can be appended
+    incrementally and read by index without loading the whole ensemble into
+    memory.  The directory contains:
+
+      * :file:`header.npz`, reference coordinates, atom weights, selected
+        atom indices and ensemble attributes
+      * :file:`atoms.ag.npz`, atoms of the ensemble (see :func:`.saveAtoms`)
+      * :file:`{field}.{i}.npy`, *i*-th chunk of a per-conformation field,
+        i.e. ``confs``, ``weights``, ``labels``, ``selstrs``, ``trans``,
+        ``msa``, and ``data.{label}``
+
+    All fields are stored as typed arrays, so no pickling is involved.
+    Uncompressed chunks are memory mapped when read.  Chunks compressed with
+    ``compress=True`` have :file:`.npy.gz` extension and are decompressed
+    one at a time."""
+
+    def __init__(self, filename, mode='r', **kwargs):
+        """Open directory *filename* for reading (default, ``mode="r"``),
+        writing (``mode="w"``), or appending (``mode="a"``).
+
+        :arg chunk_size: number of conformations in a chunk, used when a new
+            file is written, default is 1000
+        :type chunk_size: int
+
+        :arg compress: compress chunks of a new file with gzip, **True** or
+            a compression level from 1 to 9, default is **False**
+        :type compress: bool, int"""
+
+        if not isinstance(filename, str):
+            raise TypeError('filename argument must be a string')
+        if mode not in ('r', 'w', 'a'):
+            raise ValueError("mode string must be one of 'r', 'w', or 'a'")
+        exists = isfile(join(filename, HEADER))
+        if mode == 'r' and not exists:
+            raise IOError('{0} is not an ensemble file'.format(filename))
+
+        self._filename = filename
+        self._mode = mode
+        self._closed = False
+        self._cache = {}
+        self._pending = {}
+        self._n_pending = 0
+        self._atoms = None
+
+        if mode == 'w' or not exists:
+            if exists:
+                self._remove()
+            makePath(filename)
+            self._type = None
+            self._title = 'Unknown'
+            self._n_atoms = 0
+            self._n_stored = 0
+            self._chunk_size = int(kwargs.get('chunk_size', 1000))
+            if self._chunk_size < 1:
+                raise ValueError('chunk_size must be a positive integer')
+            compress = kwargs.get('compress', False)
+            self._level = 6 if compress is True else int(compress)
+            self._compress = bool(compress)
+            self._fields = []
+            self._coords = None
+            self._weights = None
+            self._indices = None
+            return
+
+        header = np.load(join(filename, HEADER), allow_pickle=False)
+        self._type = str(header['type'])
+        self._title = str(header['title'])
+        self._n_atoms = int(header['n_atoms'])
+        self._n_stored = int(header['n_confs'])
+        self._chunk_size = int(header['chunk_size'])
+        self._compress = bool(header['compress'])
+        self._level = 6
+        self._fields = [str(field) for field in header['fields']]
+        for attr in ('coords', 'weights', 'indices'):
+            setattr(self, '_' + attr,
+                    header[attr] if attr in header.files else None)
+        header.close()
+
+        if mode == 'a':
+            # rows of a partial last chunk are rewritten with the next chunk
+            partial = self._n_stored % self._chunk_size
+            if partial:
+                chunk = self._n_stored // self._chunk_size
+                for field in self._fields:
+                    self._pending[field] = [np.array(self._getChunk(field,
+                                                                   chunk))]
+                self._cache = {}
+                self._n_stored -= partial
+                self._n_pending = partial
+
+    def __repr__(self):
+
+        if self._closed:
+            return '<EnsembleFile: {0} (closed)>'.format(self._title)
+        return ('<EnsembleFile: {0} ({1} conformations; {2} atoms)>'
+                ).format(self._title, len(self), self._n_atoms)
+
+    def __len__(self):
+
+        return self._n_stored + self._n_pending
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, type, value, tb):
+
+        self.close()
+
+    def getTitle(self):
+        """Returns title of the ensemble."""
+
+        return self._title
+
+    def numAtoms(self):
+        """Returns number of atoms."""
+
+        return self._n_atoms
+
+    def numConfs(self):
+        """Returns number of conformations."""
+
+        return len(self)
+
+    numCoordsets = numConfs
+
+    def getFilename(self):
+        """Returns path to the ensemble directory."""
+
+        return self._filename
+
+    def getFields(self):
+        """Returns names of per-conformation fields that are stored."""
+
+        return list(self._fields)
+
+    def getCoords(self):
+        """Returns a copy of reference coordinates."""
+
+        if self._coords is not None:
+            return self._coords.copy()
+
+    def getAtoms(self):
+        """Returns atoms of the ensemble, which are loaded from the file when
+        first requested."""
+
+        if self._atoms is None and isfile(join(self._filename, ATOMS)):
+            self._atoms = loadAtoms(join(self._filename, ATOMS))
+        return self._atoms
+
+    def getCoordsets(self, indices=None):
+        """Returns coordinate sets at given *indices* for all atoms.
+        *indices* may be an integer, a slice, a list of integers or **None**,
+        which returns all coordinate sets."""
+
+        return self._gather('confs', indices)
+
+    def getWeights(self, indices=None):
+        """Returns weights of conformations at given *indices* for a
+        :class:`.PDBEnsemble`, or atom weights of an :class:`.Ensemble`."""
+
+        if 'weights' in self._fields:
+            return self._gather('weights', indices)
+        if self._weights is not None:
+            return self._weights.copy()
+
+    def getLabels(self, indices=None):
+        """Returns labels of conformations at given *indices*."""
+
+        if 'labels' in self._fields:
+            return self._gather('labels', indices).tolist()
+
+    def getData(self, label, indices=None):
+        """Returns data associated with *label* for conformations at given
+        *indices*."""
+
+        field = 'data.' + label
+        if field in self._fields:
+            return self._gather(field, indices)
+
+    def getEnsemble(self, indices=None):
+        """Returns an :class:`.Ensemble` or :class:`.PDBEnsemble` instance
+        containing conformations at given *indices*, or all conformations
+        when *indices* is **None**."""
+
+        if self._type is None:
+            raise ValueError('ensemble file does not contain any data')
+        fields = self._fields
+        confs = self._gather('confs', indices)
+        if self._type == 'PDBEnsemble':
+            ensemble = PDBEnsemble(self._title)
+            if self._coords is not None:
+                ensemble.setCoords(self._coords)
+            labels = self._gather('labels', indices).tolist()
+            ensemble.addCoordset(confs, self._gather('weights', indices),
+                                 label=labels)
+            ensemble._selstrs = self._gather('selstrs', indices).tolist()
+            if 'trans' in fields:
+                ensemble._trans = self._gather('trans', indices)
+            if 'msa' in fields:
+                ensemble._msa = MSA(self._gather('msa', indices),
+                                    title=self._title, labels=labels)
+        else:
+            ensemble = Ensemble(self._title)
+            if self._coords is not None:
+                ensemble.setCoords(self._coords)
+            ensemble.addCoordset(confs)
+            if self._weights is not None:
+                ensemble.setWeights(self._weights)
+        for field in fields:
+            if field.startswith('data.'):
+                ensemble._data[field[5:]] = self._gather(field, indices)
+        ensemble.setAtoms(self.getAtoms())
+        ensemble._indices = self._indices
+        return ensemble
+
+    def write(self, ensemble):
+        """Append conformations in *ensemble* to the file.  Title, reference
+        coordinates, atoms and stored fields are determined by the first
+        ensemble that is written.  Fields that are missing from later
+        ensembles are filled with identity transformations, ``'X'`` for
+        sequences and zeros for data."""
+
+        if self._closed:
+            raise ValueError('I/O operation on closed file')
+        if self._mode == 'r':
+            raise IOError('file not open for writing')
+        if not isinstance(ensemble, Ensemble):
+            raise TypeError('ensemble must be an Ensemble instance')
+        n_confs = ensemble.numConfs()
+        if not n_confs:
+            return
+
+        if self._type == 'PDBEnsemble' and not isinstance(ensemble,
+                                                         PDBEnsemble):
+            raise TypeError('ensemble must be a PDBEnsemble instance')
+        rows = {'confs': ensemble._confs}
+        if isinstance(ensemble, PDBEnsemble):
+            rows['weights'] = ensemble._weights
+            rows['labels'] = np.array(ensemble._labels, str)
+            rows['selstrs'] = np.array(ensemble._selstrs, str)
+            if ensemble._trans is not None:
+                rows['trans'] = np.asarray(ensemble._trans)
+            if ensemble._msa is not None:
+                rows['msa'] = ensemble._msa._msa
+        for label, data in ensemble._data.items():
+            rows['data.' + label] = np.asarray(data)
+
+        if self._type is None:
+            self._type = ensemble.__class__.__name__
+            self._title = ensemble.getTitle()
+            self._n_atoms = ensemble.numAtoms(selected=False)
+            self._coords = ensemble._coords
+            if self._type == 'Ensemble':
+                self._weights = ensemble._weights
+            self._indices = ensemble._indices
+            self._fields = sorted(rows)
+            if ensemble._atoms is not None:
+                saveAtoms(ensemble._atoms, join(self._filename, ATOMS))
+        elif ensemble.numAtoms(selected=False) != self._n_atoms:
+            raise ValueError('ensemble must have {0} atoms'
+                             .format(self._n_atoms))
+
+        extra = set(rows).difference(self._fields)
+        if extra:
+            LOGGER.warn('{0} are not stored in {1}.'
+                        .format(', '.join(sorted(extra)), self._filename))
+        for field in self._fields:
+            array = rows.get(field)
+            if array is None:
+                array = self._getDefault(field, n_confs)
+            self._pending.setdefault(field, []).append(array)
+        self._n_pending += n_confs
+
+        chunk_size = self._chunk_size
+        while self._n_pending >= chunk_size:
+            chunk = self._n_stored // chunk_size
+            for field in self._fields:
+                array = self._getPending(field)
+                self._saveChunk(field, chunk, array[:chunk_size])
+                self._pending[field] = [array[chunk_size:]]
+            self._n_stored += chunk_size
+            self._n_pending -= chunk_size
+
+    def flush(self):
+        """Write pending conformations and the header to the file."""
+
+        if self._closed or self._mode == 'r' or self._type is None:
+            return
+        if self._n_pending:
+            chunk = self._n_stored // self._chunk_size
+            for field in self._fields:
+                self._saveChunk(field, chunk, self._getPending(field))
+
+        header = {'type': self._type, 'title': self._title,
+                  'n_atoms': self._n_atoms, 'n_confs': len(self),
+                  'chunk_size': self._chunk_size, 'compress': self._compress,
+                  'fields': np.array(self._fields, str)}
+        for attr in ('coords', 'weights', 'indices'):
+            value = getattr(self, '_' + attr)
+            if value is not None:
+                header[attr] = value
+        np.savez(join(self._filename, HEADER), **header)
+
+    def close(self):
+        """Flush and close the file."""
+
+        if not self._closed:
+            self.flush()
+            self._cache = {}
+            self._pending = {}
+            self._closed = True
+
+    def _remove(self):
+        """Remove files of an existing ensemble in the directory."""
+
+        header = np.load(join(self._filename, HEADER), allow_pickle=False)
+        fields = [str(field) for field in header['fields']]
+        header.close()
+        for name in os.listdir(self._filename):
+            if (name in (HEADER, ATOMS) or
+                    name.rsplit('.', 3 if name.endswith('.gz') else 2)[0]
+                    in fields):
+                os.remove(join(self._filename, name))
+
+    def _getPath(self, field, chunk):
+
+        path = join(self._filename, '{0}.{1}.npy'.format(field, chunk))
+        return path + '.gz' if self._compress else path
+
+    def _saveChunk(self, field, chunk, array):
+
+        self._cache.pop(field, None)
+        if self._compress:
+            stream = openFile(self._getPath(field, chunk), 'wb',
+                              compresslevel=self._level)
+        else:
+            stream = openFile(self._getPath(field, chunk), 'wb')
+        np.save(stream, np.ascontiguousarray(array), allow_pickle=False)
+        stream.close()
+
+    def _getChunk(self, field, chunk):
+        """Returns *chunk* of *field*, which is memory mapped unless chunks
+        are compressed.  The last chunk read for each field is cached."""
+
+        if chunk * self._chunk_size >= self._n_stored:
+            return self._getPending(field)
+        cached = self._cache.get(field)
+        if cached is not None and cached[0] == chunk:
+            return cached[1]
+        path = self._getPath(field, chunk)
+        if self._compress:
+            stream = openFile(path, 'rb')
+            array = np.load(stream, allow_pickle=False)
+            stream.close()
+        else:
+            array = np.load(path, mmap_mode='r', allow_pickle=False)
+        self._cache[field] = (chunk, array)
+        return array
+
+    def _getPending(self, field):
+
+        arrays = self._pending[field]
+        if len(arrays) > 1:
+            arrays[:] = [np.concatenate(arrays)]
+        return arrays[0]
+
+    def _getDefault(self, field, n_confs):
+
+        if field == 'trans':
+            return np.tile(np.identity(4), (n_confs, 1, 1))
+        template = self._getChunk(field, 0)
+        array = np.zeros((n_confs,) + template.shape[1:], template.dtype)
+        if field == 'msa':
+            array[:] = b'X'
+        return array
+
+    def _gather(self, field, indices=None):
+        """Returns rows of *field* at *indices*, reading only the chunks that
+        contain them."""
+
+        if self._closed:
+            raise ValueError('I/O operation on closed file')
+        n_confs = len(self)
+        if indices is None:
+            indices = slice(None)
+        indices = np.arange(n_confs)[indices].reshape(-1)
+
+        chunk_size = self._chunk_size
+        chunks = indices // chunk_size
+        order = np.argsort(chunks, kind='mergesort')
+        split = np.flatnonzero(np.diff(chunks[order])) + 1
+        arrays = []
+        for which in np.split(order, split):
+            if not len(which):
+                continue
+            chunk = chunks[which[0]]
+            array = self._getChunk(field, chunk)
+            arrays.append(array[indices[which] - chunk * chunk_size])
+        if not arrays:
+            return np.array(self._getChunk(field, 0)[:0])
+        arrays = np.concatenate(arrays)
+        result = np.empty_like(arrays)
+        result[order] = arrays
+        return result
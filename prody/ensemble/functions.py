@@ -14,6 +14,7 @@ from prody.atomic import Atomic, AtomMap, Chain, AtomGroup, Selection, Segment,
 from .ensemble import *
 from .pdbensemble import *
 from .conformation import *
+from .ensfile import EnsembleFile
 
 __all__ = ['saveEnsemble', 'loadEnsemble', 'trimPDBEnsemble',
            'calcOccupancies', 'showOccupancies',
@@ -26,7 +27,19 @@ def saveEnsemble(ensemble, filename=None, **kwargs):
     is **None**, title of the *ensemble* will be used as the filename, after
     white spaces in the title are replaced with underscores.  Extension is
     :file:`.ens.npz`. Upon successful completion of saving, filename is
-    returned. This function makes use of :func:`~numpy.savez` function."""
+    returned. This function makes use of :func:`~numpy.savez` function.
+
+    When *chunk_size* is given, *ensemble* is saved in chunks of as many
+    conformations into directory :file:`filename.ens` instead, using
+    :class:`.EnsembleFile`, and *compress* argument may be used to compress
+    the chunks.
+
+    :arg chunk_size: number of conformations in a chunk
+    :type chunk_size: int
+
+    :arg compress: compress chunks with gzip, **True** or a compression
+        level from 1 to 9, default is **False**
+    :type compress: bool, int"""
 
     if not isinstance(ensemble, Ensemble):
         raise TypeError('invalid type for ensemble, {0}'
@@ -34,6 +47,18 @@ def saveEnsemble(ensemble, filename=None, **kwargs):
     if len(ensemble) == 0:
         raise ValueError('ensemble instance does not contain data')
 
+    chunk_size = kwargs.pop('chunk_size', None)
+    if chunk_size is not None:
+        if filename is None:
+            filename = ensemble.getTitle().replace(' ', '_')
+        if not filename.endswith('.ens'):
+            filename += '.ens'
+        ensfile = EnsembleFile(filename, 'w', chunk_size=chunk_size,
+                               compress=kwargs.pop('compress', False))
+        ensfile.write(ensemble)
+        ensfile.close()
+        return filename
+
     dict_ = ensemble.__dict__
     attr_list = ['_title', '_confs', '_weights', '_coords', '_indices']
     if isinstance(ensemble, PDBEnsemble):
@@ -53,7 +78,7 @@ def saveEnsemble(ensemble, filename=None, **kwargs):
         attr_dict['_atoms'] = np.array([atoms, None], 
                                         dtype=object)
 
-    selstrs = dict_['_selstrs']
+    selstrs = dict_.get('_selstrs')
     if selstrs is not None:
         attr_dict['_selstrs'] = np.array([selstrs, None], 
                                           dtype=object)
@@ -83,7 +108,14 @@ def saveEnsemble(ensemble, filename=None, **kwargs):
 
 def loadEnsemble(filename, **kwargs):
     """Returns ensemble instance loaded from *filename*.  This function makes
-    use of :func:`~numpy.load` function.  See also :func:`saveEnsemble`"""
+    use of :func:`~numpy.load` function.  See also :func:`saveEnsemble`.
+    Ensembles saved in chunks are loaded using :class:`.EnsembleFile`."""
+
+    if os.path.isdir(filename):
+        ensfile = EnsembleFile(filename)
+        ensemble = ensfile.getEnsemble()
+        ensfile.close()
+        return ensemble
 
     if not 'encoding' in kwargs:
         kwargs['encoding'] = 'latin1'
@@ -5,7 +5,8 @@ import numpy as np
 
 from prody.sequence import MSA, Sequence
 from prody.atomic import Atomic, AtomGroup
-from prody.measure import getRMSD, getTransformation, Transformation
+from prody.measure import getRMSD, superposeCoordsets, Transformation
+from prody.measure import calcPairwiseRMSDMatrix
 from prody.utilities import checkCoords, checkWeights, copy
 from prody import LOGGER
 
@@ -171,32 +172,18 @@ class PDBEnsemble(Ensemble):
     def _superpose(self, **kwargs):
         """Superpose conformations and update coordinates."""
 
-        calcT = getTransformation
-        if kwargs.get('trans', False):
-            if self._trans is not None:
-                LOGGER.info('Existing transformations will be overwritten.')
-            trans = np.zeros((self._n_csets, 4, 4))
-        else:
-            trans = None
+        trans = kwargs.get('trans', False)
+        if trans and self._trans is not None:
+            LOGGER.info('Existing transformations will be overwritten.')
+
         indices = self._indices
-        if indices is None:
-            weights = self._weights
-            coords = self._coords
-            confs = self._confs
-            confs_selected = self._confs
-        else:
-            weights = self._weights[:, indices]
-            coords = self._coords[indices]
-            confs = self._confs
-            confs_selected = self._confs[:, indices]
+        coords = self._coords
+        if indices is not None:
+            coords = coords[indices]
 
-        for i, conf in enumerate(confs_selected):
-            rmat, tvec = calcT(conf, coords, weights[i])
-            if trans is not None:
-                trans[i][:3, :3] = rmat
-                trans[i][:3, 3] = tvec
-            confs[i] = tvec + np.dot(confs[i], rmat.T)
-        self._trans = trans
+        transformations = superposeCoordsets(self._confs, coords, 
+                                             self._weights, indices)
+        self._trans = transformations if trans else None
 
     def iterpose(self, rmsd=0.0001):
         confs = copy(self._confs)
@@ -542,7 +529,7 @@ class PDBEnsemble(Ensemble):
             ssqf += ((conf - mean) * weights[i]) ** 2
         return ssqf.sum(1) / weightsum.flatten()
 
-    def getRMSDs(self, pairwise=False):
+    def getRMSDs(self, pairwise=False, **kwargs):
         """Calculate and return root mean square deviations (RMSDs). Note that
         you might need to align the conformations using :meth:`superpose` or
         :meth:`iterpose` before calculating RMSDs.
@@ -550,6 +537,11 @@ class PDBEnsemble(Ensemble):
         :arg pairwise: if **True** then it will return pairwise RMSDs 
             as an n-by-n matrix. n is the number of conformations.
         :type pairwise: bool
+
+        Pairwise RMSDs are calculated using :func:`.calcPairwiseRMSDMatrix`
+        without superposing conformations, weighting each pair by products 
+        of their weights, and *n_cpu*, *max_memory* and *out* arguments are 
+        passed to it.
         """
 
         if self._confs is None or self._coords is None:
@@ -561,16 +553,8 @@ class PDBEnsemble(Ensemble):
 
         weights = self._weights[:, indices] if self._weights is not None else None
         if pairwise:
-            n_confs = self.numConfs()
-            RMSDs = np.zeros((n_confs, n_confs))
-            for i in range(n_confs):
-                for j in range(i+1, n_confs):
-                    if weights is None:
-                        w = None
-                    else:
-                        wi = weights[i]; wj = weights[j]
-                        w = wi * wj
-                    RMSDs[i, j] = RMSDs[j, i] = getRMSD(self._confs[i, indices], self._confs[j, indices], w)
+            RMSDs = calcPairwiseRMSDMatrix(self._confs[:, indices], weights,
+                                           superpose=False, **kwargs)
         else:
             RMSDs = getRMSD(self._coords[indices], self._confs[:, indices], weights)
 
@@ -17,6 +17,7 @@ struct KDTree
     struct DataPoint* _data_point_list;
     int _data_point_list_size;
     struct Radius* _radius_list;
+    long int _radius_list_size;
     struct Neighbor* _neighbor_list;
     struct Node *_root;
     struct Region *_query_region;
@@ -290,6 +291,7 @@ struct KDTree* KDTree_init(int dim, int bucket_size)
     tree->_root=NULL;
     tree->_coords=NULL;
     tree->_radius_list = NULL;
+    tree->_radius_list_size = 0;
     tree->_count=0;
     tree->_neighbor_count=0;
     tree->_neighbor_list = NULL;
@@ -310,6 +312,7 @@ void KDTree_destroy(struct KDTree* tree)
     if (tree->_coords) free(tree->_coords);
     if (tree->_data_point_list) free(tree->_data_point_list);
     if (tree->_neighbor_list) free(tree->_neighbor_list);
+    if (tree->_radius_list) free(tree->_radius_list);
     free(tree);
 }
 
@@ -420,18 +423,24 @@ static int KDTree_report_point(struct KDTree* tree, long int index, float *coord
 
     if (r<=tree->_radius_sq)
     {
-        int n = tree->_count;
-        struct Radius* p;
+        long int n = tree->_count;
+        struct Radius* p = tree->_radius_list;
 
-    p  = realloc(tree->_radius_list, (n+1)*sizeof(struct Radius));
-        if (p==NULL)
+        if (n==tree->_radius_list_size)
         {
-            return 0;
+            /* grow geometrically, batched searches report many points */
+            long int size = 2*n+16;
+            p = realloc(tree->_radius_list, size*sizeof(struct Radius));
+            if (p==NULL)
+            {
+                return 0;
+            }
+            tree->_radius_list = p;
+            tree->_radius_list_size = size;
         }
         /* note use of sqrt - only calculated if necessary */
         p[n].index = index;
         p[n].value = sqrt(r);
-        tree->_radius_list = p;
         tree->_count++;
     }
     return 1;
@@ -622,6 +631,7 @@ int KDTree_set_data(struct KDTree* tree, float *coords, long int nr_points)
         free(tree->_radius_list);
         tree->_radius_list = NULL;
     }
+    tree->_radius_list_size = 0;
     tree->_count=0;
     /* keep pointer to coords to delete it */
     tree->_coords=coords;
@@ -644,7 +654,7 @@ int KDTree_set_data(struct KDTree* tree, float *coords, long int nr_points)
     return 1;
 }
 
-int KDTree_search_center_radius(struct KDTree* tree, float *coord, float radius)
+static int KDTree_set_query(struct KDTree* tree, float *coord, float radius)
 {
     int i;
     int dim = tree->dim;
@@ -657,6 +667,27 @@ int KDTree_search_center_radius(struct KDTree* tree, float *coord, float radius)
         return 0;
     }
 
+    for (i=0; i<dim; i++)
+    {
+        left[i]=coord[i]-radius;
+        right[i]=coord[i]+radius;
+        tree->_center_coord[i]=coord[i];
+    }
+
+    Region_destroy(tree->_query_region);
+    tree->_query_region= Region_create(left, right);
+
+    free(left);
+    free(right);
+
+    if (!tree->_query_region) return 0;
+    return 1;
+}
+
+int KDTree_search_center_radius(struct KDTree* tree, float *coord, float radius)
+{
+    int ok;
+
     Region_dim=tree->dim;
 
     if (tree->_radius_list)
@@ -664,32 +695,47 @@ int KDTree_search_center_radius(struct KDTree* tree, float *coord, float radius)
         free(tree->_radius_list);
         tree->_radius_list = NULL;
     }
+    tree->_radius_list_size = 0;
     tree->_count=0;
 
     tree->_radius=radius;
     /* use of r^2 to avoid sqrt use */
     tree->_radius_sq=radius*radius;
 
-    for (i=0; i<tree->dim; i++)
-    {
-        left[i]=coord[i]-radius;
-        right[i]=coord[i]+radius;
-        /* set center of query */
-        tree->_center_coord[i]=coord[i];
-    }
+    /* set center of query */
+    ok = KDTree_set_query(tree, coord, radius);
 
     /* clean up! */
     if (coord) free(coord);
 
-    Region_destroy(tree->_query_region);
-    tree->_query_region= Region_create(left, right);
+    if (!ok) return 0;
 
-    free(left);
-    free(right);
+    return KDTree_search(tree, NULL, NULL, 0);
+}
 
-    if (!tree->_query_region) return 0;
+int KDTree_search_centers_radius(struct KDTree* tree, float *coords, long int n, float radius, long int *offsets)
+{
+    /* search points within radius of each of the n centers in coords,
+     * points found for center i are stored in the radius list between
+     * offsets[i] and offsets[i+1] */
+    long int i;
 
-    return KDTree_search(tree, NULL, NULL, 0);
+    Region_dim=tree->dim;
+
+    /* keep the radius list allocated from an earlier batch */
+    tree->_count=0;
+
+    tree->_radius=radius;
+    tree->_radius_sq=radius*radius;
+
+    offsets[0]=0;
+    for (i=0; i<n; i++)
+    {
+        if (!KDTree_set_query(tree, coords+i*tree->dim, radius)) return 0;
+        if (!KDTree_search(tree, NULL, NULL, 0)) return 0;
+        offsets[i+1]=tree->_count;
+    }
+    return 1;
 }
 
 void KDTree_copy_indices(struct KDTree* tree, long *indices)
@@ -390,6 +390,111 @@ exit:
     return NULL;
 }
 
+static char PyTree_search_centers_radius__doc__[] =
+"searches points within radius of each row of a coordinate array, counts of\n"
+"points found so far are written to offsets after each center is searched\n";
+
+static PyObject*
+PyTree_search_centers_radius(PyTree* self, PyObject* args)
+{
+    PyObject *obj, *object;
+    double radius;
+    Py_ssize_t n, m, i, j;
+    float *coords = NULL;
+    struct KDTree* tree = self->tree;
+    int ok;
+    const int flags = PyBUF_FORMAT | PyBUF_STRIDES;
+    Py_ssize_t rowstride, colstride;
+    Py_buffer view, oview;
+    char datatype;
+    const char* p;
+
+    if(!PyArg_ParseTuple(args, "OdO:KDTree_search_centers_radius",
+                         &obj, &radius, &object))
+        return NULL;
+
+    if(radius <= 0)
+    {
+        PyErr_SetString(PyExc_ValueError, "Radius must be positive.");
+        return NULL;
+    }
+
+    if (PyObject_GetBuffer(obj, &view, flags) == -1) return NULL;
+    if (view.ndim != 2) {
+        PyErr_SetString(PyExc_RuntimeError, "Array must be two-dimensional");
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+    if (PyObject_GetBuffer(object, &oview,
+                           PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) == -1) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+    n = view.shape[0];
+    m = view.shape[1];
+    datatype = oview.format[0];
+    switch (datatype) {
+        case '@':
+        case '=':
+        case '<':
+        case '>':
+        case '!': datatype = oview.format[1]; break;
+        default: break;
+    }
+    if (datatype != 'l' || oview.ndim != 1 || oview.shape[0] != n + 1) {
+        PyErr_SetString(PyExc_ValueError,
+            "offsets must be a one-dimensional 'l' array of length n + 1");
+        goto exit;
+    }
+    rowstride = view.strides[0];
+    colstride = view.strides[1];
+    coords = malloc((m*n+1)*sizeof(float));
+    if (!coords) {
+        PyErr_NoMemory();
+        goto exit;
+    }
+    p = view.buf;
+    datatype = view.format[0];
+    switch (datatype) {
+        case '@':
+        case '=':
+        case '<':
+        case '>':
+        case '!': datatype = view.format[1]; break;
+        default: break;
+    }
+    switch (datatype) {
+        case 'd': COPY2DARRAY(double); break;
+        case 'f': COPY2DARRAY(float); break;
+        case 'i': COPY2DARRAY(int); break;
+        case 'I': COPY2DARRAY(unsigned int); break;
+        case 'l': COPY2DARRAY(long); break;
+        case 'L': COPY2DARRAY(unsigned long); break;
+        default:
+            PyErr_Format(PyExc_RuntimeError,
+                "array should contain numerical data (format character was %c).",
+                datatype);
+            goto exit;
+    }
+    ok = KDTree_search_centers_radius(tree, coords, n, radius,
+                                      (long int *) oview.buf);
+    if (!ok) {
+        PyErr_NoMemory();
+        goto exit;
+    }
+    free(coords);
+    PyBuffer_Release(&view);
+    PyBuffer_Release(&oview);
+    Py_INCREF(Py_None);
+    return Py_None;
+
+exit:
+    PyBuffer_Release(&view);
+    PyBuffer_Release(&oview);
+    if (coords) free(coords);
+    return NULL;
+}
+
 static PyObject*
 PyTree_neighbor_search(PyTree* self, PyObject* args)
 {
@@ -604,6 +709,7 @@ static PyMethodDef PyTree_methods[] = {
     {"get_count", (PyCFunction)PyTree_get_count, METH_NOARGS, NULL},
     {"set_data", (PyCFunction)PyTree_set_data, METH_VARARGS, NULL},
     {"search_center_radius", (PyCFunction)PyTree_search_center_radius, METH_VARARGS, NULL},
+    {"search_centers_radius", (PyCFunction)PyTree_search_centers_radius, METH_VARARGS, PyTree_search_centers_radius__doc__},
     {"neighbor_get_count", (PyCFunction)PyTree_neighbor_get_count, METH_NOARGS, NULL},
     {"neighbor_search", (PyCFunction)PyTree_neighbor_search, METH_VARARGS, NULL},
     {"neighbor_simple_search", (PyCFunction)PyTree_neighbor_simple_search, METH_VARARGS, NULL},
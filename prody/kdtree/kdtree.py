@@ -2,7 +2,8 @@
 """This module defines :class:`KDTree` class for dealing with atomic coordinate
 sets and handling periodic boundary conditions."""
 
-from numpy import array, ndarray, concatenate, empty
+from numpy import array, ndarray, concatenate, empty, zeros, arange
+from numpy import repeat, lexsort, ones, cumsum, bincount
 
 from prody import LOGGER
 
@@ -41,7 +42,8 @@ class KDTree(object):
     """An interface to Thomas Hamelryck's C KDTree module that can handle
     periodic boundary conditions.  Both point and pair search are performed
     using the single :meth:`search` method and results are retrieved using
-    :meth:`getIndices` and :meth:`getDistances`.
+    :meth:`getIndices` and :meth:`getDistances`.  Points around many centers
+    can be searched at once using :meth:`searchCenters`.
 
     **Periodic Boundary Conditions**
 
@@ -252,6 +254,83 @@ class KDTree(object):
                 self._pdbkeys = list(_dict)
 
 
+    def searchCenters(self, radius, centers):
+        """Search points within *radius* of each of *centers* at once, and
+        return neighbor lists in compressed sparse row form as a tuple of
+        ``(offsets, indices, distances)`` arrays.  Indices of points within
+        *radius* of ``centers[i]`` are ``indices[offsets[i]:offsets[i+1]]``
+        and their distances are the same slice of *distances*.  When the tree
+        has a unitcell, the closest periodic image of each point is reported
+        once, as in :meth:`search`.  Results of this method are not retrieved
+        using :meth:`getIndices` or :meth:`getDistances`.
+
+        :arg radius: distance (Å)
+        :type radius: float
+
+        :arg centers: coordinate array with shape ``(M, 3)``
+        :type centers: :class:`numpy.ndarray`"""
+
+        if not isinstance(radius, (float, int)):
+            raise TypeError('radius must be a number')
+        if radius <= 0:
+            raise TypeError('radius must be a positive number')
+        if not isinstance(centers, ndarray):
+            raise TypeError('centers must be a Numpy array instance')
+        if centers.ndim == 1:
+            centers = centers.reshape((1, -1))
+        if centers.ndim != 2 or centers.shape[1] != 3:
+            raise ValueError('centers.shape must be (M, 3)')
+
+        self._neighbors = None
+        n_centers = len(centers)
+        if self._unitcell is None:
+            return self._searchCenters(radius, centers)
+
+        # search all 27 images of centers, then keep the closest image of
+        # each point around each center
+        images = (centers + self._replicate[:, None]).reshape((-1, 3))
+        offsets, indices, distances = self._searchCenters(radius, images)
+        rows = repeat(arange(len(images)) % n_centers,
+                      offsets[1:] - offsets[:-1])
+        order = lexsort((distances, indices, rows))
+        rows, indices, distances = rows[order], indices[order], distances[order]
+        first = ones(len(rows), bool)
+        first[1:] = (rows[1:] != rows[:-1]) | (indices[1:] != indices[:-1])
+        rows, indices, distances = rows[first], indices[first], distances[first]
+        offsets = zeros(n_centers + 1, int)
+        cumsum(bincount(rows, minlength=n_centers), out=offsets[1:])
+        return offsets, indices, distances
+
+    def _searchCenters(self, radius, centers):
+        """Returns CSR form neighbor lists for *centers* from the C tree."""
+
+        kdtree = self._kdtree
+        n_centers = len(centers)
+        offsets = zeros(n_centers + 1, int)
+        try:
+            kdtree.search_centers_radius(centers, float(radius), offsets)
+        except AttributeError:
+            indices, distances = [], []
+            for i, center in enumerate(centers):
+                kdtree.search_center_radius(center, radius)
+                if kdtree.get_count():
+                    indices.append(get_KDTree_indices(kdtree))
+                    distances.append(get_KDTree_radii(kdtree))
+                    offsets[i+1] = len(indices[-1])
+            cumsum(offsets, out=offsets)
+            if indices:
+                return (offsets, concatenate(indices),
+                        concatenate(distances))
+            return offsets, zeros(0, int), zeros(0, 'f')
+        else:
+            count = offsets[-1]
+            indices = empty(count, int)
+            distances = empty(count, 'f')
+            if count:
+                kdtree.get_indices(indices)
+                kdtree.get_radii(distances)
+            return offsets, indices, distances
+
     def getIndices(self):
         """Returns array of indices for points or pairs, depending on the type
         of the most recent search."""
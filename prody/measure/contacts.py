@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 """ This module defines a class and function for identifying contacts."""
 
-from numpy import array, ndarray
+from numpy import array, ndarray, arange, repeat, diff, unique
 
 from prody.atomic import Atomic, Atom, AtomGroup, AtomSubset, Selection
 from prody.kdtree import KDTree
@@ -88,29 +88,19 @@ class Contacts(object):
                                 'coordinate array')
             else:
                 if shape == (3,):
-                    center = [center]
-                elif not ndim == 2 and shape[1] == 3:
+                    center = center.reshape((1, 3))
+                elif not (ndim == 2 and shape[1] == 3):
                     raise ValueError('center.shape must be (n_atoms, 3) or'
                                      '(3,)')
         else:
             if center is None:
                 raise ValueError('center does not have coordinate data')
 
-        search = self._kdtree.search
-        get_indices = self._kdtree.getIndices
-        get_count = self._kdtree.getCount
-        indices = set()
-        update = indices.update
-        radius = float(radius)
-        for xyz in center:
-            search(radius, xyz)
-            if get_count():
-                update(get_indices())
-        indices = list(indices)
-        if indices:
-            indices.sort()
+        indices = self._kdtree.searchCenters(float(radius), center)[1]
+        indices = unique(indices)
+        if len(indices):
             if self._ag is None:
-                return array(indices)
+                return indices
             else:
                 if self._indices is not None:
                     indices = self._indices[indices]
@@ -247,14 +237,16 @@ def iterNeighbors(atoms, radius, atoms2=None, unitcell=None):
             coords2 = array([coords2])
         if len(coords) >= len(coords2):
             kdtree = KDTree(coords, unitcell=unitcell, none=list)
+            offsets, found, dists = kdtree.searchCenters(radius, coords2)
             _dict = {}
             if ag is None or ag2 is None:
-                for j, xyz in enumerate(coords2):
-                    for i, r in zip(*kdtree(radius, xyz)):
-                        yield (i, j, r)
+                rows = repeat(arange(len(coords2)), diff(offsets))
+                for i, j, r in zip(found, rows, dists):
+                    yield (i, j, r)
             else:
-                for a2 in atoms2.iterAtoms():
-                    for i, r in zip(*kdtree(radius, a2._getCoords())):
+                for a2, start, stop in zip(atoms2.iterAtoms(), offsets[:-1],
+                                           offsets[1:]):
+                    for i, r in zip(found[start:stop], dists[start:stop]):
                         a1 = _dict.get(i)
                         if a1 is None:
                             a1 = Atom(ag, index(i), acsi)
@@ -262,14 +254,16 @@ def iterNeighbors(atoms, radius, atoms2=None, unitcell=None):
                         yield (a1, a2, r)
         else:
             kdtree = KDTree(coords2, unitcell=unitcell, none=list)
+            offsets, found, dists = kdtree.searchCenters(radius, coords)
             _dict = {}
             if ag is None or ag2 is None:
-                for i, xyz in enumerate(coords):
-                    for j, r in zip(*kdtree(radius, xyz)):
-                        yield (i, j, r)
+                rows = repeat(arange(len(coords)), diff(offsets))
+                for i, j, r in zip(rows, found, dists):
+                    yield (i, j, r)
             else:
-                for a1 in atoms.iterAtoms():
-                    for i, r in zip(*kdtree(radius, a1._getCoords())):
+                for a1, start, stop in zip(atoms.iterAtoms(), offsets[:-1],
+                                           offsets[1:]):
+                    for i, r in zip(found[start:stop], dists[start:stop]):
                         a2 = _dict.get(i)
                         if a2 is None:
                             a2 = Atom(ag2, index2(i), acsi2)
@@ -13,6 +13,7 @@ linalg = importLA()
 
 __all__ = ['Transformation', 'applyTransformation', 'alignCoordsets',
            'calcRMSD', 'calcTransformation', 'superpose',
+           'calcPairwiseRMSDMatrix',
            'moveAtoms', 'wrapAtoms',
            'printRMSD']
 
@@ -162,6 +163,112 @@ def getTransformation(mob, tar, weights=None):
     return rotation, tar_com - np.dot(mob_com, rotation.T)
 
 
+def getTransformations(mobs, tar, weights=None, tar_com=None):
+    """Returns rotation matrices and translation vectors that superpose each 
+    coordinate set in *mobs* onto *tar*, with the same conventions as 
+    :func:`getTransformation`.  Covariance matrices of all coordinate sets 
+    are stacked and decomposed by a single batched SVD.  *weights* may be 
+    given for all coordinate sets, with shape (n_atoms, 1), or for each one, 
+    with shape (n_csets, n_atoms, 1).  *tar_com* overrides the (weighted) 
+    center of *tar*."""
+
+    mobs = np.asarray(mobs)
+    if mobs.ndim == 2:
+        mobs = mobs[np.newaxis]
+
+    if weights is None:
+        mob_com = mobs.mean(1)
+        mob_org = mobs - mob_com[:, np.newaxis]
+        if tar_com is None:
+            tar_com = tar.mean(0)
+        tar_org = tar - tar_com
+        matrix = np.matmul(mob_org.transpose(0, 2, 1), tar_org)
+    else:
+        weights_sum = weights.sum(-2)
+        weights_dot = (weights * weights).sum(-2)[..., np.newaxis]
+        mob_com = (mobs * weights).sum(1) / weights_sum
+        mob_org = (mobs - mob_com[:, np.newaxis]) * weights
+        if tar_com is None:
+            tar_com = (tar * weights).sum(-2) / weights_sum
+        tar_org = (tar - np.expand_dims(tar_com, -2)) * weights
+        matrix = np.matmul(mob_org.transpose(0, 2, 1), tar_org) / weights_dot
+
+    U, _, Vh = np.linalg.svd(matrix)
+    # correct for reflections by flipping the last singular vector
+    d = np.sign(np.linalg.det(U) * np.linalg.det(Vh))
+    U[:, :, 2] *= d[:, np.newaxis]
+    rotations = np.matmul(Vh.transpose(0, 2, 1), U.transpose(0, 2, 1))
+    translations = tar_com - np.matmul(mob_com[:, np.newaxis],
+                                       rotations.transpose(0, 2, 1))[:, 0]
+    return rotations, translations
+
+
+def _getChunkSize(n_atoms, n_csets, max_memory=64):
+    """Returns the number of coordinate sets that are superposed at once, so 
+    that temporary arrays take about *max_memory* megabytes."""
+
+    size = max_memory * 1024 ** 2 // (3 * 8 * 4 * max(n_atoms, 1))
+    return int(min(max(size, 1), max(n_csets, 1)))
+
+
+def superposeCoordsets(coordsets, tar, weights=None, indices=None, **kwargs):
+    """Superposes *coordsets* onto *tar* in place and returns transformation 
+    matrices with shape (n_csets, 4, 4).  Coordinate sets are processed in 
+    chunks to bound memory usage.
+
+    :arg coordsets: coordinate sets, with shape (n_csets, n_atoms, 3)
+    :type coordsets: :class:`~numpy.ndarray`
+
+    :arg tar: target coordinates of atoms used for superposition
+    :type tar: :class:`~numpy.ndarray`
+
+    :arg weights: atomic weights, with shape (n_atoms, 1) for all coordinate 
+        sets or (n_csets, n_atoms, 1) for each coordinate set, given either
+        for all atoms or only for atoms in *indices*
+    :type weights: :class:`~numpy.ndarray`
+
+    :arg indices: indices of atoms used for superposition, default is all 
+        atoms
+    :type indices: :class:`~numpy.ndarray`
+
+    :arg tar_com: center of target, default is (weighted) center of *tar*
+    :type tar_com: :class:`~numpy.ndarray`
+
+    :arg max_memory: memory in megabytes used for each chunk, default is 64
+    :type max_memory: float
+    """
+
+    tar_com = kwargs.get('tar_com', None)
+    n_csets = len(coordsets)
+    n_atoms = coordsets.shape[1] if indices is None else len(indices)
+    size = _getChunkSize(n_atoms, n_csets, kwargs.get('max_memory', 64))
+    per_cset = weights is not None and weights.ndim == 3
+
+    trans = np.zeros((n_csets, 4, 4))
+    trans[:, 3, 3] = 1.
+    LOGGER.progress('Superposing ', n_csets, '_prody_superpose')
+    for start in range(0, n_csets, size):
+        stop = min(start + size, n_csets)
+        mobs = coordsets[start:stop]
+        if indices is not None:
+            mobs = mobs[:, indices]
+        w = weights
+        if per_cset:
+            w = weights[start:stop]
+        if indices is not None and w is not None and w.shape[-2] != n_atoms:
+            w = w[..., indices, :]
+        rotations, translations = getTransformations(mobs, tar, w, tar_com)
+
+        coordsets[start:stop] = np.matmul(coordsets[start:stop],
+                                          rotations.transpose(0, 2, 1)) + \
+                                translations[:, np.newaxis]
+        trans[start:stop, :3, :3] = rotations
+        trans[start:stop, :3, 3] = translations
+        LOGGER.update(stop, label='_prody_superpose')
+    LOGGER.finish()
+    return trans
+
+
 def applyTransformation(transformation, atoms):
     """Returns *atoms* after applying *transformation*.  If *atoms*
     is a :class:`.Atomic` instance, it will be returned after
@@ -434,6 +541,279 @@ def getRMSD(ref, tar, weights=None):
                 return np.sqrt(rmsd / weights.sum(1).flatten())
 
 
+def calcPairwiseRMSDMatrix(ensemble, weights=None, superpose=True,
+                           format='mat', **kwargs):
+    """Returns RMSDs between all pairs of conformations in *ensemble*.  When 
+    *superpose* is **True**, RMSDs after optimal superposition of each pair 
+    are calculated using the quaternion characteristic polynomial (QCP) 
+    method [DLT05]_, otherwise RMSDs between coordinates as they are.  The 
+    upper triangle of the matrix is calculated in tiles, each of which is 
+    handled with a few matrix products and a vectorized Newton solver.
+
+    .. [DLT05] Theobald DL. Rapid calculation of RMSDs using a quaternion-based 
+       characteristic polynomial. *Acta Crystallogr A* **2005** 61:478-480.
+
+    :arg ensemble: conformations, with shape (n_confs, n_atoms, 3), or an 
+        object with :meth:`getCoordsets` method, e.g. :class:`.Ensemble`, 
+        :class:`.PDBEnsemble`, or a trajectory
+    :type ensemble: :class:`~numpy.ndarray`, :class:`.Ensemble`, 
+        :class:`.TrajBase`
+
+    :arg weights: atomic weights with shape (n_atoms[, 1]), or 
+        (n_confs, n_atoms[, 1]) for weights of each conformation, e.g. of a 
+        :class:`.PDBEnsemble`, in which case each pair is weighted by the 
+        product of their weights.  Default is weights of *ensemble*, if any
+    :type weights: :class:`~numpy.ndarray`
+
+    :arg format: format of the resulting array, ``'mat'`` (matrix, default) 
+        or ``'arr'`` (condensed array of the upper triangle, as returned by 
+        :func:`.buildDistMatrix`)
+    :type format: str
+
+    :arg out: array that RMSDs are written into, e.g. a :class:`~numpy.memmap`
+    :type out: :class:`~numpy.ndarray`
+
+    :arg n_cpu: number of processes that tiles are distributed over, 
+        default is 1
+    :type n_cpu: int
+
+    :arg max_memory: memory in megabytes used for each tile, default is 64
+    :type max_memory: float
+    """
+
+    if isinstance(ensemble, np.ndarray):
+        coordsets = ensemble
+    else:
+        try:
+            coordsets = ensemble.getCoordsets()
+        except AttributeError:
+            raise TypeError('ensemble must be a numpy array or an object '
+                            'with getCoordsets method')
+        if weights is None:
+            try:
+                weights = ensemble.getWeights()
+            except AttributeError:
+                pass
+    if coordsets is None or coordsets.ndim != 3 or coordsets.shape[-1] != 3:
+        raise ValueError('coordinate sets must have shape '
+                         '(n_confs, n_atoms, 3)')
+    n_confs, n_atoms = coordsets.shape[:2]
+
+    if format not in ('mat', 'arr'):
+        raise ValueError('format must be either mat or arr')
+    n_cpu = kwargs.get('n_cpu', 1)
+    if not isinstance(n_cpu, int):
+        raise TypeError('n_cpu must be an integer')
+    elif n_cpu < 1:
+        raise ValueError('n_cpu must be equal to or greater than 1')
+
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)
+        if weights.ndim == 2 and weights.shape[-1] != 1:
+            weights = weights.reshape(weights.shape + (1,))
+        if weights.ndim == 3:
+            weights = checkWeights(weights, n_atoms, n_confs)
+        else:
+            weights = checkWeights(weights, n_atoms)
+        weights = weights[..., 0]
+
+    data = _prepareRMSDTiles(coordsets, weights, superpose)
+
+    size = kwargs.get('max_memory', 64) * 1024. ** 2 / (8 * 48)
+    size = int(min(max(size ** 0.5, 1), n_confs))
+    starts = list(range(0, n_confs, size))
+    tiles = [(i, j, size) for i in starts for j in starts if j >= i]
+
+    out = kwargs.get('out', None)
+    if format == 'mat':
+        shape = (n_confs, n_confs)
+    else:
+        shape = (n_confs * (n_confs - 1) // 2,)
+    if out is None:
+        out = np.zeros(shape)
+    elif out.shape != shape:
+        raise ValueError('out must be an array of shape {0}'.format(shape))
+
+    LOGGER.progress('Calculating pairwise RMSDs of {0} conformations...'
+                    .format(n_confs), len(tiles), '_prody_pairwise_rmsd')
+    if n_cpu > 1 and len(tiles) > 1:
+        from multiprocessing import Pool
+        pool = Pool(n_cpu, initializer=_initRMSDWorker, initargs=(data,))
+        try:
+            results = pool.imap_unordered(_calcRMSDWorker, tiles)
+            for k, (i, j, tile) in enumerate(results):
+                _setRMSDTile(out, i, j, tile, format)
+                LOGGER.update(k + 1, label='_prody_pairwise_rmsd')
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        for k, (i, j, size) in enumerate(tiles):
+            tile = _calcRMSDTile(data, slice(i, i + size), slice(j, j + size))
+            _setRMSDTile(out, i, j, tile, format)
+            LOGGER.update(k + 1, label='_prody_pairwise_rmsd')
+    LOGGER.finish()
+    return out
+
+
+def _prepareRMSDTiles(coordsets, weights, superpose):
+    """Returns arrays used for calculating tiles of pairwise RMSDs."""
+
+    coordsets = np.asarray(coordsets, dtype=float)
+    n_confs, n_atoms = coordsets.shape[:2]
+    if weights is None:
+        weights = np.ones(n_atoms)
+    if superpose:
+        # center each conformation on its own (weighted) center, which does 
+        # not change pairwise results but keeps numbers small
+        if weights.ndim == 1:
+            centers = np.dot(weights, coordsets) / weights.sum()
+        else:
+            centers = (np.einsum('ij,ijk->ik', weights, coordsets) / 
+                       weights.sum(1)[:, np.newaxis])
+        coordsets = coordsets - centers[:, np.newaxis]
+    else:
+        coordsets = coordsets - coordsets.mean(axis=(0, 1))
+
+    per_conf = weights.ndim == 2
+    if per_conf:
+        # pairs are weighted by products of weights of both conformations
+        wxyz = coordsets * weights[:, :, np.newaxis]
+        squares = (wxyz * coordsets).sum(2)
+    else:
+        # common weights are split between both conformations of a pair
+        wxyz = coordsets * np.sqrt(weights)[:, np.newaxis]
+        squares = (wxyz * wxyz).sum(2).sum(1)
+    return {'superpose': superpose, 'per_conf': per_conf,
+            'weights': weights, 'wxyz': wxyz, 'squares': squares}
+
+
+def _calcRMSDTile(data, rows, cols):
+    """Returns RMSDs between conformations in *rows* and *cols*."""
+
+    wxyz = data['wxyz']
+    A = wxyz[rows]
+    B = wxyz[cols]
+    m, n = len(A), len(B)
+    if data['per_conf']:
+        W = data['weights']
+        Q = data['squares']
+        total = np.dot(W[rows], W[cols].T)
+        Ga = np.dot(Q[rows], W[cols].T)
+        Gb = np.dot(W[rows], Q[cols].T)
+    else:
+        total = data['weights'].sum()
+        Ga = data['squares'][rows][:, np.newaxis]
+        Gb = data['squares'][cols][np.newaxis, :]
+
+    if not data['superpose']:
+        cross = np.dot(A.reshape((m, -1)), B.reshape((n, -1)).T)
+        msd = (Ga + Gb - 2 * cross) / total
+        return np.sqrt(np.clip(msd, 0, None))
+
+    # inner product matrices of all pairs, with shape (m, n, 3, 3)
+    M = np.dot(A.transpose(0, 2, 1).reshape((m * 3, -1)),
+               B.transpose(0, 2, 1).reshape((n * 3, -1)).T)
+    M = M.reshape((m, 3, n, 3)).transpose(0, 2, 1, 3)
+    if data['per_conf']:
+        # correct for weighted centers of each pair
+        Sa = np.dot(A.transpose(0, 2, 1).reshape((m * 3, -1)),
+                    W[cols].T).reshape((m, 3, n)).transpose(0, 2, 1)
+        Sb = np.dot(W[rows], 
+                    B.transpose(0, 2, 1).reshape((n * 3, -1)).T
+                    ).reshape((m, n, 3))
+        M -= Sa[..., np.newaxis] * Sb[..., np.newaxis, :] / \
+             total[..., np.newaxis, np.newaxis]
+        Ga = Ga - (Sa ** 2).sum(2) / total
+        Gb = Gb - (Sb ** 2).sum(2) / total
+
+    E0 = (Ga + Gb) / 2.
+    eigval = _getQCPEigenvalue(M, E0)
+    msd = 2. * (E0 - eigval) / total
+    return np.sqrt(np.clip(msd, 0, None))
+
+
+def _getQCPEigenvalue(M, E0, n_iter=50, tol=1e-11):
+    """Returns the largest eigenvalue of the key matrices of the inner product 
+    matrices *M*, with shape (..., 3, 3), by Newton iterations on the 
+    characteristic polynomial started from *E0*."""
+
+    Sxx, Sxy, Sxz = M[..., 0, 0], M[..., 0, 1], M[..., 0, 2]
+    Syx, Syy, Syz = M[..., 1, 0], M[..., 1, 1], M[..., 1, 2]
+    Szx, Szy, Szz = M[..., 2, 0], M[..., 2, 1], M[..., 2, 2]
+
+    Sxx2, Syy2, Szz2 = Sxx * Sxx, Syy * Syy, Szz * Szz
+    Sxy2, Syz2, Sxz2 = Sxy * Sxy, Syz * Syz, Sxz * Sxz
+    Syx2, Szy2, Szx2 = Syx * Syx, Szy * Szy, Szx * Szx
+
+    SyzSzymSyySzz2 = 2. * (Syz * Szy - Syy * Szz)
+    Sxx2Syy2Szz2Syz2Szy2 = Syy2 + Szz2 - Sxx2 + Syz2 + Szy2
+    c2 = -2. * (Sxx2 + Syy2 + Szz2 + Sxy2 + Syx2 + Sxz2 + Szx2 + Syz2 + Szy2)
+    c1 = 8. * (Sxx * Syz * Szy + Syy * Szx * Sxz + Szz * Sxy * Syx -
+               Sxx * Syy * Szz - Syz * Szx * Sxy - Szy * Syx * Sxz)
+
+    SxzpSzx, SyzpSzy, SxypSyx = Sxz + Szx, Syz + Szy, Sxy + Syx
+    SyzmSzy, SxzmSzx, SxymSyx = Syz - Szy, Sxz - Szx, Sxy - Syx
+    SxxpSyy, SxxmSyy = Sxx + Syy, Sxx - Syy
+    Sxy2Sxz2Syx2Szx2 = Sxy2 + Sxz2 - Syx2 - Szx2
+
+    c0 = (Sxy2Sxz2Syx2Szx2 * Sxy2Sxz2Syx2Szx2 +
+          (Sxx2Syy2Szz2Syz2Szy2 + SyzSzymSyySzz2) *
+          (Sxx2Syy2Szz2Syz2Szy2 - SyzSzymSyySzz2) +
+          (-SxzpSzx * SyzmSzy + SxymSyx * (SxxmSyy - Szz)) *
+          (-SxzmSzx * SyzpSzy + SxymSyx * (SxxmSyy + Szz)) +
+          (-SxzpSzx * SyzpSzy - SxypSyx * (SxxpSyy - Szz)) *
+          (-SxzmSzx * SyzmSzy - SxypSyx * (SxxpSyy + Szz)) +
+          (SxypSyx * SyzpSzy + SxzpSzx * (SxxmSyy + Szz)) *
+          (-SxymSyx * SyzmSzy + SxzpSzx * (SxxpSyy + Szz)) +
+          (SxypSyx * SyzmSzy + SxzmSzx * (SxxmSyy - Szz)) *
+          (-SxymSyx * SyzpSzy + SxzmSzx * (SxxpSyy - Szz)))
+
+    eigval = np.array(E0, dtype=float, copy=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for _ in range(n_iter):
+            x2 = eigval * eigval
+            b = (x2 + c2) * eigval
+            a = b + c1
+            delta = (a * eigval + c0) / (2. * x2 * eigval + b + a)
+            delta[~np.isfinite(delta)] = 0.
+            eigval -= delta
+            if (np.abs(delta) <= tol * np.abs(eigval)).all():
+                break
+    return eigval
+
+
+def _setRMSDTile(out, i, j, tile, format):
+    """Writes *tile* starting at row *i* and column *j* into *out*."""
+
+    m, n = tile.shape
+    if format == 'mat':
+        out[i:i+m, j:j+n] = tile
+        out[j:j+n, i:i+m] = tile.T
+        if i == j:
+            out[range(i, i + m), range(i, i + m)] = 0.
+    else:
+        n_confs = int((1 + (1 + 8 * len(out)) ** 0.5) / 2)
+        for k in range(m):
+            row = i + k
+            first = max(j, row + 1)
+            if first >= j + n:
+                continue
+            start = row * n_confs - row * (row + 1) // 2 + first - row - 1
+            out[start:start + j + n - first] = tile[k, first - j:]
+
+
+_RMSD_DATA = {}
+
+def _initRMSDWorker(data):
+    _RMSD_DATA.update(data)
+
+def _calcRMSDWorker(args):
+    i, j, size = args
+    return i, j, _calcRMSDTile(_RMSD_DATA, slice(i, i + size),
+                               slice(j, j + size))
+
+
 def printRMSD(reference, target=None, weights=None, log=True, msg=None):
     """Print RMSD to the screen.  If *target* has multiple coordinate sets,
     minimum, maximum and mean RMSD values are printed.  If *log* is **True**
@@ -481,13 +861,25 @@ def alignCoordsets(atoms, weights=None):
         ag = atoms
     agacsi = ag.getACSIndex()
 
-    tar = atoms._getCoords()
-    for i in range(n_csets):
-        if i == acsi:
-            continue
-        atoms.setACSIndex(i)
-        ag.setACSIndex(i)
-        calcTransformation(atoms, tar, weights).apply(ag)
+    if weights is not None:
+        weights = checkWeights(weights, atoms.numAtoms())
+
+    tar = atoms.getCoords()
+    indices = None
+    if isinstance(atoms, AtomMap):
+        # dummy atoms are not used for superposition
+        mapping = atoms._getMapping()
+        indices = atoms._getIndices()[mapping]
+        tar = tar[mapping]
+        if weights is not None:
+            weights = weights[mapping]
+    elif ag is not atoms:
+        indices = atoms._getIndices()
+
+    coordsets = ag._getCoordsets()
+    reference = coordsets[acsi].copy()
+    superposeCoordsets(coordsets, tar, weights, indices)
+    coordsets[acsi] = reference
     atoms.setACSIndex(acsi)
     ag.setACSIndex(agacsi)
     return atoms
@@ -5,7 +5,10 @@
 
 
 from collections import defaultdict
+from itertools import chain as chain_iterables
+from operator import itemgetter
 import os.path
+import re
 import numpy as np
 
 from prody.atomic import AtomGroup
@@ -152,15 +155,17 @@ def parseMMCIFStream(stream, **kwargs):
 
     if model != 0:
         LOGGER.timeit()
-        try:
-            lines = stream.readlines()
-        except AttributeError as err:
+        if hasattr(stream, 'readline'):
+            # files are iterated over, so lines are not kept in memory
+            lines = stream
+        else:
             try:
-                lines = stream.read().split('\n')
-            except AttributeError:
-                raise err
-        if not len(lines):
-            raise ValueError('empty PDB file or stream')
+                lines = stream.readlines()
+            except AttributeError as err:
+                try:
+                    lines = stream.read().split('\n')
+                except AttributeError:
+                    raise err
 
         if header:
             ag, header = _parseMMCIFLines(ag, lines, model, chain, subset,
@@ -185,11 +190,45 @@ def parseMMCIFStream(stream, **kwargs):
 parseMMCIFStream.__doc__ += _parseMMCIFdoc
 
 
+_MMCIF_COLUMNS = {
+    'group_PDB': ('hetero', False),
+    'id': ('serial', 0),
+    'type_symbol': ('element', ''),
+    'auth_atom_id': ('name', ''),
+    'label_alt_id': ('altloc', '.'),
+    'auth_comp_id': ('resname', ''),
+    'auth_asym_id': ('chain', ''),
+    'label_asym_id': ('segment', ''),
+    'auth_seq_id': ('resnum', 0),
+    'pdbx_PDB_ins_code': ('icode', ''),
+    'occupancy': ('occupancy', 0),
+    'B_iso_or_equiv': ('beta', 0),
+}
+
+_CIF_TOKEN = re.compile(r"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(\S+)""")
+
+_CHUNK_SIZE = 4096
+
+
+def _splitCIFLine(line):
+    """Returns tokens in *line*, with quotes around quoted values removed."""
+
+    if "'" in line or '"' in line:
+        return [a or b or c for a, b, c in _CIF_TOKEN.findall(line)]
+    return line.split()
+
+
 def _parseMMCIFLines(atomgroup, lines, model, chain, subset,
                      altloc_torf, header):
     """Returns an AtomGroup. See also :func:`.parsePDBStream()`.
 
-    :arg lines: mmCIF lines
+    :arg lines: mmCIF lines or an iterable of lines, e.g. a file, which is 
+        read once without keeping atom lines in memory
+
+    Rows of the ``_atom_site`` loop are tokenized once, and rows of atoms 
+    that are not in *model*, *chain*, *subset* or alternate locations are 
+    skipped before their values are converted.  Only columns used by the 
+    atomgroup are kept and they are converted to arrays in chunks of rows.
     """
 
     if subset is not None:
@@ -199,49 +238,8 @@ def _parseMMCIFLines(atomgroup, lines, model, chain, subset,
             subset = flags.BACKBONE
         protein_resnames = flags.AMINOACIDS
 
-    asize = 0
-    i = 0
-    models = []
-    nModels = 0
-    fields = {}
-    fieldCounter = -1
-    foundAtomBlock = False
-    doneAtomBlock = False
-    while not doneAtomBlock:
-        line = lines[i]
-        if line[:11] == '_atom_site.':
-            fieldCounter += 1
-            fields[line.split('.')[1].strip()] = fieldCounter
-
-        if line.startswith('ATOM') or line.startswith('HETATM'):
-            if not foundAtomBlock:
-                foundAtomBlock = True
-                start = i
-            models.append(line.split()[fields['pdbx_PDB_model_num']])
-            if models[asize] != models[asize-1]:
-                nModels += 1
-            asize += 1
-        else:
-            if foundAtomBlock:
-                doneAtomBlock = True
-                stop = i
-        i += 1
-    if nModels == 0:
-        nModels = 1
-
-    if model is not None and model != 1:
-        for i in range(start, stop):
-            if str(models[i]) != model and str(models[i+1]) == model:
-                start = i+1
-            if str(models[i]) == model and str(models[i+1]) != model:
-                stop = i+1
-                break
-        if not str(model) in models:
-            raise mmCIFParseError('model {0} is not found'.format(model))
-
-    addcoords = False
-    if atomgroup.numCoordsets() > 0:
-        addcoords = True
+    if chain is not None and isinstance(chain, str):
+        chain = chain.split(',')
 
     if isinstance(altloc_torf, str):
         if altloc_torf.strip() != 'A':
@@ -250,119 +248,175 @@ def _parseMMCIFLines(atomgroup, lines, model, chain, subset,
             which_altlocs = '.' + ''.join(altloc_torf.split())
         else:
             which_altlocs = '.A'
-        altloc_torf = False
     else:
         which_altlocs = '.A'
-        altloc_torf = True
-
-    coordinates = np.zeros((asize, 3), dtype=float)
-    atomnames = np.zeros(asize, dtype=ATOMIC_FIELDS['name'].dtype)
-    resnames = np.zeros(asize, dtype=ATOMIC_FIELDS['resname'].dtype)
-    resnums = np.zeros(asize, dtype=ATOMIC_FIELDS['resnum'].dtype)
-    chainids = np.zeros(asize, dtype=ATOMIC_FIELDS['chain'].dtype)
-    segnames = np.zeros(asize, dtype=ATOMIC_FIELDS['segment'].dtype)
-    hetero = np.zeros(asize, dtype=bool)
-    termini = np.zeros(asize, dtype=bool)
-    altlocs = np.zeros(asize, dtype=ATOMIC_FIELDS['altloc'].dtype)
-    icodes = np.zeros(asize, dtype=ATOMIC_FIELDS['icode'].dtype)
-    serials = np.zeros(asize, dtype=ATOMIC_FIELDS['serial'].dtype)
-    elements = np.zeros(asize, dtype=ATOMIC_FIELDS['element'].dtype)
-    bfactors = np.zeros(asize, dtype=ATOMIC_FIELDS['beta'].dtype)
-    occupancies = np.zeros(asize, dtype=ATOMIC_FIELDS['occupancy'].dtype)
-
-    n_atoms = atomgroup.numAtoms()
-    if n_atoms > 0:
-        asize = n_atoms
-
-    acount = 0
-    for line in lines[start:stop]:
-        startswith = line.split()[fields['group_PDB']]
-
-        atomname = line.split()[fields['auth_atom_id']]
-        resname = line.split()[fields['auth_comp_id']]
-
-        if subset is not None:
-            if not (atomname in subset and resname in protein_resnames):
-                continue
 
-        chID = line.split()[fields['auth_asym_id']]
-        if chain is not None:
-            if isinstance(chain, str):
-                chain = chain.split(',')
-            if not chID in chain:
+    header_lines = [] if header else None
+    fields = []
+    n_lines = 0
+    found = False
+    done = False
+    target = None if model is None else str(model)
+    first_model = None
+    in_model = False
+    columns = defaultdict(list)
+    rows = []
+    coords = []
+    counts = []
+
+    def flush(rows, coords):
+        """Converts tokens of *rows* and coordinates of *coords* to arrays."""
+
+        if rows:
+            for key, values in zip(keys, zip(*rows)):
+                label = _MMCIF_COLUMNS[key][0]
+                if label == 'hetero':
+                    columns[key].append(np.array(values) == 'HETATM')
+                    continue
+                dtype = np.dtype(ATOMIC_FIELDS[label].dtype)
+                if dtype.kind in 'iuf':
+                    values = list(map(float if dtype.kind == 'f' else int,
+                                      values))
+                columns[key].append(np.array(values, dtype))
+            del rows[:]
+        if coords:
+            columns['coords'].append(np.array(list(map(float,
+                chain_iterables.from_iterable(coords)))).reshape((-1, 3)))
+            del coords[:]
+
+    for line in lines:
+        n_lines += 1
+        if line.startswith('ATOM') or line.startswith('HETATM'):
+            if done:
+                continue
+            if not found:
+                found = True
+                try:
+                    xyz = [fields.index(key)
+                           for key in ('Cartn_x', 'Cartn_y', 'Cartn_z')]
+                except ValueError:
+                    raise mmCIFParseError('_atom_site loop does not contain '
+                                          'Cartesian coordinates')
+                keys = [key for key in _MMCIF_COLUMNS if key in fields]
+                getdata = itemgetter(*[fields.index(key) for key in keys])
+                getxyz = itemgetter(*xyz)
+                getmodel = (itemgetter(fields.index('pdbx_PDB_model_num'))
+                            if 'pdbx_PDB_model_num' in fields else
+                            lambda tokens: '1')
+                getname = itemgetter(fields.index('auth_atom_id'))
+                getresname = itemgetter(fields.index('auth_comp_id'))
+                getchain = itemgetter(fields.index('auth_asym_id'))
+                getalt = (itemgetter(fields.index('label_alt_id'))
+                          if 'label_alt_id' in fields else
+                          lambda tokens: '.')
+
+            tokens = _splitCIFLine(line)
+            current = getmodel(tokens)
+            if target is not None:
+                if current != target:
+                    if not in_model:
+                        continue
+                    # atoms of the requested model were parsed
+                    done = True
+                    if header_lines is None:
+                        break
+                    continue
+                in_model = True
+            if subset is not None:
+                if not (getname(tokens) in subset and
+                        getresname(tokens) in protein_resnames):
+                    continue
+            if chain is not None and getchain(tokens) not in chain:
+                continue
+            if getalt(tokens) not in which_altlocs:
                 continue
 
-        segID = line.split()[fields['label_asym_id']]
-
-        alt = line.split()[fields['label_alt_id']]
-        if alt not in which_altlocs:
+            if first_model is None:
+                first_model = current
+            if counts and counts[-1][0] == current:
+                counts[-1][1] += 1
+            else:
+                counts.append([current, 1])
+            coords.append(getxyz(tokens))
+            if current == first_model:
+                rows.append(getdata(tokens))
+            if len(coords) == _CHUNK_SIZE:
+                flush(rows, coords)
             continue
 
-        if model is not None:
-            if int(models[acount]) < model:
-                continue
-            elif int(models[acount]) > model:
+        if found and not done:
+            done = True
+            if header_lines is None:
                 break
+        if found is False and line[:11] == '_atom_site.':
+            fields.append(line.split('.')[1].strip())
+            if header_lines and header_lines[-1].startswith('loop_'):
+                header_lines.pop()
+            continue
+        if header_lines is not None:
+            header_lines.append(line)
+
+    if not n_lines:
+        raise ValueError('empty PDB file or stream')
+    if target is not None and not in_model and found is not False:
+        raise mmCIFParseError('model {0} is not found'.format(model))
+
+    flush(rows, coords)
+    if counts:
+        n_atoms = counts[0][1]
+        data = {}
+        for key, (label, default) in _MMCIF_COLUMNS.items():
+            dtype = bool if label == 'hetero' else ATOMIC_FIELDS[label].dtype
+            if key in columns:
+                data[label] = np.concatenate(columns.pop(key))
+            else:
+                data[label] = np.full(n_atoms, default, dtype)
+        data['icode'][data['icode'] == '?'] = ''
+
+        # keep models with as many atoms as the first one
+        coordinates = np.concatenate(columns.pop('coords'))
+        index = [0]
+        start = n_atoms
+        for i, (_, count) in enumerate(counts[1:]):
+            if count == n_atoms:
+                index.append(start)
+            else:
+                LOGGER.warn('Discarding model {0}, which contains {1} atoms '
+                            'instead of {2}.'.format(i + 2, count, n_atoms))
+            start += count
+        coordinates = coordinates[np.add.outer(index, np.arange(n_atoms))]
 
-        coordinates[acount] = [line.split()[fields['Cartn_x']],
-                               line.split()[fields['Cartn_y']],
-                               line.split()[fields['Cartn_z']]]
-        atomnames[acount] = atomname
-        resnames[acount] = resname
-        resnums[acount] = line.split()[fields['auth_seq_id']]
-        chainids[acount] = chID
-        segnames[acount] = segID
-        hetero[acount] = startswith == 'HETATM' # True or False
-
-        if chainids[acount] != chainids[acount-1]: 
-            termini[acount-1] = True
-
-        altlocs[acount] = alt
-        icodes[acount] = line.split()[fields['pdbx_PDB_ins_code']]
-
-        if icodes[acount] == '?': 
-            icodes[acount] = ''
-
-        serials[acount] = line.split()[fields['id']]
-        elements[acount] = line.split()[fields['type_symbol']]
-        bfactors[acount] = line.split()[fields['B_iso_or_equiv']]
-        occupancies[acount] = line.split()[fields['occupancy']]
-
-        acount += 1
-
-    if model is not None:
-        nModels = 1
-
-    modelSize = acount//nModels
-
-    if addcoords:
-        atomgroup.addCoordset(coordinates[:modelSize])
-    else:
-        atomgroup._setCoords(coordinates[:modelSize])
-
-    atomgroup.setNames(atomnames[:modelSize])
-    atomgroup.setResnames(resnames[:modelSize])
-    atomgroup.setResnums(resnums[:modelSize])
-    atomgroup.setSegnames(segnames[:modelSize])
-    atomgroup.setChids(chainids[:modelSize])
-    atomgroup.setFlags('hetatm', hetero[:modelSize])
-    atomgroup.setFlags('pdbter', termini[:modelSize])
-    atomgroup.setAltlocs(altlocs[:modelSize])
-    atomgroup.setIcodes(icodes[:modelSize])
-    atomgroup.setSerials(serials[:modelSize])
-
-    atomgroup.setElements(elements[:modelSize])
-    from prody.utilities.misctools import getMasses
-    atomgroup.setMasses(getMasses(elements[:modelSize]))
-    atomgroup.setBetas(bfactors[:modelSize])
-    atomgroup.setOccupancies(occupancies[:modelSize])
-
-    for n in range(1, nModels):
-        atomgroup.addCoordset(coordinates[n*modelSize:(n+1)*modelSize])
+        if atomgroup.numCoordsets() > 0:
+            atomgroup.addCoordset(coordinates[0])
+        else:
+            atomgroup._setCoords(coordinates[0])
+
+        termini = np.ones(n_atoms, bool)
+        termini[:-1] = data['chain'][1:] != data['chain'][:-1]
+
+        atomgroup.setNames(data['name'])
+        atomgroup.setResnames(data['resname'])
+        atomgroup.setResnums(data['resnum'])
+        atomgroup.setSegnames(data['segment'])
+        atomgroup.setChids(data['chain'])
+        atomgroup.setFlags('hetatm', data['hetero'])
+        atomgroup.setFlags('pdbter', termini)
+        atomgroup.setAltlocs(data['altloc'])
+        atomgroup.setIcodes(data['icode'])
+        atomgroup.setSerials(data['serial'])
+
+        atomgroup.setElements(data['element'])
+        from prody.utilities.misctools import getMasses
+        elements, inverse = np.unique(data['element'], return_inverse=True)
+        atomgroup.setMasses(getMasses(elements)[inverse])
+        atomgroup.setBetas(data['beta'])
+        atomgroup.setOccupancies(data['occupancy'])
+
+        for coords in coordinates[1:]:
+            atomgroup.addCoordset(coords)
 
     if header:
-        header = parseSTARLines(lines[:start-fieldCounter-2] + lines[stop:],
-                                shlex=True)
+        header = parseSTARLines(header_lines, shlex=True)
         return atomgroup, header
 
     return atomgroup
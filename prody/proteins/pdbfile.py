@@ -441,30 +441,6 @@ def _parsePDBLines(atomgroup, lines, split, model, chain, subset,
     addcoords = False
     if atomgroup.numCoordsets() > 0:
         addcoords = True
-    alength = asize
-    coordinates = np.zeros((asize, 3), dtype=float)
-    atomnames = np.zeros(asize, dtype=ATOMIC_FIELDS['name'].dtype)
-    resnames = np.zeros(asize, dtype=ATOMIC_FIELDS['resname'].dtype)
-    resnums = np.zeros(asize, dtype=ATOMIC_FIELDS['resnum'].dtype)
-    chainids = np.zeros(asize, dtype=ATOMIC_FIELDS['chain'].dtype)
-    hetero = np.zeros(asize, dtype=bool)
-    termini = np.zeros(asize, dtype=bool)
-    altlocs = np.zeros(asize, dtype=ATOMIC_FIELDS['altloc'].dtype)
-    icodes = np.zeros(asize, dtype=ATOMIC_FIELDS['icode'].dtype)
-    serials = np.zeros(asize, dtype=ATOMIC_FIELDS['serial'].dtype)
-    charges = np.zeros(asize, dtype=ATOMIC_FIELDS['charge'].dtype)
-    if isPDB:
-        segnames = np.zeros(asize, dtype=ATOMIC_FIELDS['segment'].dtype)
-        elements = np.zeros(asize, dtype=ATOMIC_FIELDS['element'].dtype)
-        bfactors = np.zeros(asize, dtype=ATOMIC_FIELDS['beta'].dtype)
-        occupancies = np.zeros(asize, dtype=ATOMIC_FIELDS['occupancy'].dtype)
-        anisou = None
-        siguij = None
-    else:
-        radii = np.zeros(asize, dtype=ATOMIC_FIELDS['radius'].dtype)
-
-    asize = 2000 # increase array length by this much when needed
-
     start = split
     stop = len(lines)
     nmodel = 0
@@ -491,6 +467,36 @@ def _parsePDBLines(atomgroup, lines, split, model, chain, subset,
         which_altlocs = ' A'
         altloc_torf = True
 
+    if isPDB and bonds is None and not n_atoms and not addcoords:
+        result = _parsePDBColumns(atomgroup, lines[start:stop], start, model,
+                                  chain, subset, which_altlocs, altloc_torf)
+        if result is not None:
+            return result
+
+    alength = asize
+    coordinates = np.zeros((asize, 3), dtype=float)
+    atomnames = np.zeros(asize, dtype=ATOMIC_FIELDS['name'].dtype)
+    resnames = np.zeros(asize, dtype=ATOMIC_FIELDS['resname'].dtype)
+    resnums = np.zeros(asize, dtype=ATOMIC_FIELDS['resnum'].dtype)
+    chainids = np.zeros(asize, dtype=ATOMIC_FIELDS['chain'].dtype)
+    hetero = np.zeros(asize, dtype=bool)
+    termini = np.zeros(asize, dtype=bool)
+    altlocs = np.zeros(asize, dtype=ATOMIC_FIELDS['altloc'].dtype)
+    icodes = np.zeros(asize, dtype=ATOMIC_FIELDS['icode'].dtype)
+    serials = np.zeros(asize, dtype=ATOMIC_FIELDS['serial'].dtype)
+    charges = np.zeros(asize, dtype=ATOMIC_FIELDS['charge'].dtype)
+    if isPDB:
+        segnames = np.zeros(asize, dtype=ATOMIC_FIELDS['segment'].dtype)
+        elements = np.zeros(asize, dtype=ATOMIC_FIELDS['element'].dtype)
+        bfactors = np.zeros(asize, dtype=ATOMIC_FIELDS['beta'].dtype)
+        occupancies = np.zeros(asize, dtype=ATOMIC_FIELDS['occupancy'].dtype)
+        anisou = None
+        siguij = None
+    else:
+        radii = np.zeros(asize, dtype=ATOMIC_FIELDS['radius'].dtype)
+
+    asize = 2000 # increase array length by this much when needed
+
     acount = 0
     coordsets = None
     altloc = defaultdict(list)
@@ -891,6 +897,359 @@ def _parsePDBLines(atomgroup, lines, split, model, chain, subset,
 
     return atomgroup
 
+def _getColumns(buf, starts, lengths, first, last):
+    """Returns characters in columns from *first* up to *last* of lines that
+    start at *starts* in *buf*, as an array of bytes with shape 
+    (n_lines, last - first).  Columns past the end of a line are spaces."""
+
+    columns = np.arange(first, last)
+    chars = buf.take(starts[:, np.newaxis] + columns, mode='clip')
+    chars[lengths[:, np.newaxis] <= columns] = 32
+    return chars
+
+
+def _getStrings(chars, dtype, strip=True):
+    """Returns strings in rows of *chars* as an array of *dtype*.  Strings are
+    decoded and stripped once for each unique value."""
+
+    if not len(chars):
+        return np.zeros(0, dtype)
+    values, inverse = np.unique(chars.view('S{0}'.format(chars.shape[1]))
+                                .ravel(), return_inverse=True)
+    values = [value.decode() for value in values]
+    if strip:
+        values = [value.strip() for value in values]
+    return np.array(values, dtype)[inverse]
+
+
+def _parseNumbers(chars, dtype=float):
+    """Returns numbers in fixed-width fields that are rows of *chars* and a 
+    boolean array that is **False** for fields that cannot be converted, 
+    e.g. empty fields, whose values are set to 0.  Fields are converted as 
+    by :func:`float` or :func:`int`, for *dtype* :class:`float` or 
+    :class:`int`, respectively."""
+
+    fields = (np.ascontiguousarray(chars).view('S{0}'.format(chars.shape[1]))
+              .ravel())
+    values = np.zeros(len(fields), dtype)
+    valid = (chars != 32).any(1)
+    try:
+        values[valid] = fields[valid].astype(dtype)
+    except ValueError:
+        convert = float if dtype is float else int
+        for i in valid.nonzero()[0]:
+            try:
+                values[i] = convert(fields[i])
+            except ValueError:
+                valid[i] = False
+    return values, valid
+
+
+def _parsePDBColumns(atomgroup, lines, offset, model, chain, subset,
+                     which_altlocs, altloc_torf):
+    """Returns *atomgroup* after parsing ATOM and HETATM records in *lines*, 
+    which start at line *offset* of the file, by slicing columns of a 
+    fixed-width character array.  **None** is returned when *lines* contain 
+    data that needs to be handled line by line by :func:`_parsePDBLines`, 
+    e.g. invalid coordinates or non-ASCII characters.  Resulting atomgroup,
+    including coordinate sets of multiple models and alternate locations, is 
+    identical to the one built by :func:`_parsePDBLines`."""
+
+    n_lines = len(lines)
+    if not n_lines:
+        return None
+    newline = lines[0].endswith('\n')
+    text = ('' if newline else '\n').join(lines)
+    if not text.endswith('\n'):
+        text += '\n'
+    try:
+        buf = np.frombuffer(text.encode('ascii'), np.uint8)
+    except UnicodeEncodeError:
+        return None
+    if (buf == 0).any():
+        return None
+    ends = np.flatnonzero(buf == 10)
+    if len(ends) != n_lines:
+        return None
+    starts = np.zeros(n_lines, ends.dtype)
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts
+
+    # line[0:6].strip() is compared to record names
+    records = _getColumns(buf, starts, lengths, 0, 6)
+    for char in (9, 11, 12, 13, 28, 29, 30, 31):
+        records[records == char] = 32
+    indented = (records[:, 0] == 32) & (records != 32).any(1)
+    for i in indented.nonzero()[0]:
+        record = lines[i][0:6].strip()
+        if (record in ('ATOM', 'HETATM', 'TER', 'ANISOU', 'SIGUIJ') or
+                record[:3] == 'END'):
+            return None
+    names = records.view('S6').ravel()
+    is_atom = (names == b'ATOM  ') | (names == b'HETATM')
+    is_end = ((records[:, 0] == 69) & (records[:, 1] == 78) &
+              (records[:, 2] == 68))
+
+    # atoms that pass subset, chain and altloc filters
+    atom_lines = is_atom.nonzero()[0]
+    base = starts[atom_lines]
+    length = lengths[atom_lines]
+    keep = np.ones(len(atom_lines), bool)
+    if subset:
+        atomnames = _getStrings(_getColumns(buf, base, length, 12, 16),
+                                ATOMIC_FIELDS['name'].dtype)
+        resnames = _getStrings(_getColumns(buf, base, length, 17, 21),
+                               ATOMIC_FIELDS['resname'].dtype)
+        keep &= (np.in1d(atomnames, list(subset)) &
+                 np.in1d(resnames, list(flags.AMINOACIDS)))
+    chars = _getColumns(buf, base, length, 16, 22)
+    if chain is not None:
+        keep &= np.in1d(chars[:, 5], [ord(char) for char in chain
+                                      if len(char) == 1])
+    accept = keep & np.in1d(chars[:, 0], [ord(char) for char in which_altlocs])
+    altloc_lines = atom_lines[keep & ~accept]
+    atom_lines = atom_lines[accept]
+    # number of accepted atoms preceding each line
+    n_accepted = np.zeros(n_lines + 1, int)
+    n_accepted[atom_lines + 1] = 1
+    n_accepted = n_accepted.cumsum()
+
+    # models end at END or ENDMDL records following atoms
+    end_lines = is_end.nonzero()[0]
+    ends = n_accepted[end_lines]
+    which = ends > np.concatenate(([0], ends[:-1]))
+    end_lines = end_lines[which]
+    ends = ends[which]
+
+    END = False
+    if len(end_lines):
+        first = end_lines[0]
+        n_atoms = ends[0]
+        if model is None:
+            END = n_lines - first - 1 < n_atoms
+    else:
+        first = n_lines
+        n_atoms = len(atom_lines)
+    if not n_atoms:
+        return None
+    multi = model is None and not END and len(end_lines) > 0
+
+    # coordinates of all models are parsed at once
+    n_total = n_accepted[n_lines if multi else first]
+    base = starts[atom_lines[:n_total]]
+    length = lengths[atom_lines[:n_total]]
+    chars = _getColumns(buf, base, length, 30, 54)
+    coordinates = np.zeros((n_total, 3))
+    for k in range(3):
+        coordinates[:, k], valid = _parseNumbers(chars[:, k * 8:k * 8 + 8])
+        if not valid.all():
+            return None
+
+    coordsets = None
+    messages = []
+    if multi:
+        # append models with same number of atoms as coordinate sets, as
+        # _parsePDBLines does
+        n_models = (n_lines - first - 1) // n_atoms + 1
+        models = [0]
+        stop = n_atoms
+        for k in range(1, len(end_lines)):
+            count = ends[k] - stop
+            END = n_lines - end_lines[k] - 1 < count
+            if len(models) >= n_models:
+                if count == n_atoms:
+                    return None
+                END = True
+            if count > n_atoms:
+                return None
+            elif count < n_atoms:
+                messages.append('Discarding model {0}, which contains {1} '
+                                'fewer atoms than the first model does.'
+                                .format(len(models) + 1, n_atoms - count))
+            else:
+                models.append(stop)
+            stop = ends[k]
+            if END:
+                # _parsePDBLines would overwrite the last model with atoms 
+                # that follow
+                if stop < n_total:
+                    return None
+                break
+        count = n_total - stop
+        if count > n_atoms:
+            return None
+        elif count == n_atoms:
+            models.append(stop)
+        index = (np.array(models)[:, np.newaxis] + np.arange(n_atoms))
+        coordsets = coordinates[index]
+    coordinates = coordinates[:n_atoms]
+
+    # data of atoms in the first model
+    atom_lines = atom_lines[:n_atoms]
+    base = starts[atom_lines]
+    length = lengths[atom_lines]
+    atomnames = _getStrings(_getColumns(buf, base, length, 12, 16),
+                            ATOMIC_FIELDS['name'].dtype)
+    resnames = _getStrings(_getColumns(buf, base, length, 17, 21),
+                           ATOMIC_FIELDS['resname'].dtype)
+    chainids = _getStrings(_getColumns(buf, base, length, 21, 22),
+                           ATOMIC_FIELDS['chain'].dtype, False)
+    altlocs = _getStrings(_getColumns(buf, base, length, 16, 17),
+                          ATOMIC_FIELDS['altloc'].dtype, False)
+    warnings = []
+
+    chars = _getColumns(buf, base, length, 6, 11)
+    serials, valid = _parseNumbers(chars, ATOMIC_FIELDS['serial'].dtype)
+    for i in (~valid).nonzero()[0]:
+        try:
+            serials[i] = int(chars[i].tobytes().decode(), 16)
+        except ValueError:
+            warnings.append((atom_lines[i], 0, 'failed to parse serial '
+                             'number in line {0}'
+                             .format(atom_lines[i] + offset)))
+            serials[i] = serials[i-1] + 1 if i else 1
+
+    chars = _getColumns(buf, base, length, 22, 26)
+    values, inverse = np.unique(chars.view('S4').ravel(), return_inverse=True)
+    resnums = np.zeros(len(values), ATOMIC_FIELDS['resnum'].dtype)
+    for i, value in enumerate(values):
+        try:
+            resnums[i] = value.decode()
+        except ValueError:
+            return None
+    resnums = resnums[inverse]
+    icodes = _getStrings(_getColumns(buf, base, length, 26, 27),
+                         ATOMIC_FIELDS['icode'].dtype)
+
+    columns = {'occupancy': (54, 60, 1, 'occupancy'),
+               'beta': (60, 66, 2, 'beta-factor')}
+    for key, (first_col, last_col, order, label) in columns.items():
+        chars = _getColumns(buf, base, length, first_col, last_col)
+        values, valid = _parseNumbers(chars)
+        for i in (~valid).nonzero()[0]:
+            warnings.append((atom_lines[i], order, 'failed to parse {0} at '
+                             'line {1}'.format(label, atom_lines[i] + offset)))
+        columns[key] = values.astype(ATOMIC_FIELDS[key].dtype)
+
+    hetero = _getColumns(buf, base, length, 0, 1)[:, 0] == 72
+    segnames = _getStrings(_getColumns(buf, base, length, 72, 76),
+                           ATOMIC_FIELDS['segment'].dtype)
+    chars = _getColumns(buf, base, length, 76, 78)
+    values, inverse = np.unique(chars.view('S2').ravel(), return_inverse=True)
+    values = [value.decode().strip() for value in values]
+    elements = np.array(values, ATOMIC_FIELDS['element'].dtype)[inverse]
+    from prody.utilities.misctools import getMasses
+    masses = getMasses(values)[inverse]
+
+    # charges are read from line[79] + line[78] if the line is long enough
+    chars = _getColumns(buf, base, length, 78, 80)[:, ::-1].copy()
+    values, inverse = np.unique(chars.view('S2').ravel(), return_inverse=True)
+    charges = np.zeros(len(values), ATOMIC_FIELDS['charge'].dtype)
+    for i, value in enumerate(values):
+        try:
+            charges[i] = int(value.decode())
+        except ValueError:
+            pass
+    charges = charges[inverse]
+    charges[length + (newline and 1) < 80] = 0
+    if newline and not lines[-1].endswith('\n') and \
+            len(atom_lines) and atom_lines[-1] == n_lines - 1 and \
+            length[-1] < 80:
+        charges[-1] = 0
+
+    termini = np.zeros(n_atoms, bool)
+    ter_lines = (names[:first] == b'TER   ').nonzero()[0]
+    index = n_accepted[ter_lines] - 1
+    termini[index[index >= 0]] = True
+
+    # ANISOU and SIGUIJ records are assigned to the preceding atom
+    anisous = {}
+    for key, record in (('anisou', b'ANISOU'), ('siguij', b'SIGUIJ')):
+        aniso_lines = (names[:first] == record).nonzero()[0]
+        if not len(aniso_lines):
+            continue
+        index = n_accepted[aniso_lines] - 1
+        chars = _getColumns(buf, starts[aniso_lines], lengths[aniso_lines],
+                            28, 70)
+        fields = [chars[:, a:b] for a, b in ((0, 7), (7, 14), (15, 21),
+                                             (21, 28), (28, 35), (35, 42))]
+        values = np.zeros((len(index), 6))
+        valid = np.ones(len(index), bool)
+        for k, field in enumerate(fields):
+            values[:, k], ok = _parseNumbers(field)
+            valid &= ok
+        # later records overwrite earlier ones for the same atom, e.g. those 
+        # of alternate locations that are not parsed
+        last = len(index) - 1 - np.unique(index[::-1], return_index=True)[1]
+        last = last[index[last] >= 0]
+        if len(last) != (index >= 0).sum() and not valid.all():
+            return None
+        values[~valid] = 0
+        array = np.zeros((n_atoms, 6), ATOMIC_FIELDS[key].dtype)
+        array[index[last]] = values[last]
+        label = ('anisotropic temperature factors' if key == 'anisou' else
+                 'standard deviations of anisotropic temperature factors')
+        for i in (~valid).nonzero()[0]:
+            row = array[index[i]] if index[i] >= 0 else np.zeros(6)
+            try:
+                for k, field in enumerate(fields):
+                    row[k] = field[i].tobytes().decode()
+            except ValueError:
+                warnings.append((aniso_lines[i], 0, 'failed to parse {0} at '
+                                 'line {1}'.format(label,
+                                                   aniso_lines[i] + offset)))
+        anisous[key] = array
+
+    # decorate atomgroup in the same order as _parsePDBLines
+    warnings.sort(key=lambda item: item[:2])
+    for _, _, message in warnings:
+        LOGGER.warn(message)
+    if not multi:
+        atomgroup._setCoords(coordinates)
+    atomgroup.setNames(atomnames)
+    atomgroup.setResnames(resnames)
+    atomgroup.setResnums(resnums)
+    atomgroup.setChids(chainids)
+    atomgroup.setFlags('hetatm', hetero)
+    atomgroup.setFlags('pdbter', termini)
+    atomgroup.setAltlocs(altlocs)
+    atomgroup.setIcodes(icodes)
+    atomgroup.setSerials(serials)
+    atomgroup.setBetas(columns['beta'])
+    atomgroup.setOccupancies(columns['occupancy'])
+    atomgroup.setSegnames(segnames)
+    atomgroup.setElements(elements)
+    atomgroup.setMasses(masses)
+    if 'anisou' in anisous:
+        atomgroup.setAnisous(anisous['anisou'] / 10000)
+    if 'siguij' in anisous:
+        atomgroup.setAnistds(anisous['siguij'] / 10000)
+
+    first_altloc = defaultdict(list)
+    later_altloc = defaultdict(list)
+    if altloc_torf:
+        for i in altloc_lines:
+            if i < first:
+                first_altloc[lines[i][16]].append((lines[i], i + offset))
+            elif multi:
+                later_altloc[lines[i][16]].append((lines[i], i + offset))
+
+    if multi:
+        if first_altloc:
+            _evalAltlocs(atomgroup, first_altloc, chainids, resnums,
+                         resnames, atomnames)
+        for message in messages:
+            LOGGER.warn(message)
+        atomgroup._setCoords(coordsets)
+        if later_altloc:
+            _evalAltlocs(atomgroup, later_altloc, chainids, resnums,
+                         resnames, atomnames)
+    elif first_altloc:
+        _evalAltlocs(atomgroup, first_altloc, chainids, resnums, resnames,
+                     atomnames)
+    return atomgroup
+
+
 def _evalAltlocs(atomgroup, altloc, chainids, resnums, resnames, atomnames):
     altloc_keys = list(altloc)
     altloc_keys.sort()
@@ -965,17 +1324,16 @@ SHEETLINE = ('SHEET  {strand:3d} {sheetID:>3s}{numStrands:2d} '
              '{initResName:3s} {initChainID:1s}{initSeqNum:4d}{initICode:1s} '
              '{endResName:3s} {endChainID:1s}{endSeqNum:4d}{endICode:1s}{sense:2d} \n')
 
-PDBLINE_LT100K = ('%-6s%5d %-4s%1s%-4s%1s%4d%1s   '
-                  '%8.3f%8.3f%8.3f%6.2f%6.2f      '
-                  '%4s%2s\n')
-
-PDBLINE_GE100K = ('%-6s%5x %-4s%1s%-4s%1s%4d%1s   '
-                  '%8.3f%8.3f%8.3f%6.2f%6.2f      '
-                  '%4s%2s\n')
+PDBLINE_PREFIX_LT100K = '%-6s%5d %-4s%1s%-4s%1s%4d%1s   '
+PDBLINE_PREFIX_GE100K = '%-6s%5x %-4s%1s%-4s%1s%4d%1s   '
+PDBLINE_PREFIX_GE100K_H36 = '%-6s%5s %-4s%1s%-4s%1s%4d%1s   '
+PDBLINE_COORDS = '%8.3f%8.3f%8.3f'
+PDBLINE_SUFFIX = '%6.2f%6.2f      %4s%2s\n'
 
-PDBLINE_GE100K_H36 = ('%-6s%5s %-4s%1s%-4s%1s%4d%1s   '
-                      '%8.3f%8.3f%8.3f%6.2f%6.2f      '
-                      '%4s%2s\n')
+PDBLINE_LT100K = PDBLINE_PREFIX_LT100K + PDBLINE_COORDS + PDBLINE_SUFFIX
+PDBLINE_GE100K = PDBLINE_PREFIX_GE100K + PDBLINE_COORDS + PDBLINE_SUFFIX
+PDBLINE_GE100K_H36 = (PDBLINE_PREFIX_GE100K_H36 + PDBLINE_COORDS +
+                      PDBLINE_SUFFIX)
 
 _writePDBdoc = """
 
@@ -1190,92 +1548,224 @@ def writePDBStream(stream, atoms, csets=None, **kwargs):
         secindices = atoms._getSecindices()
         secclasses = atoms._getSecclasses()
         secids = atoms._getSecids()
-
-        # write helices
-        for i in range(1,max(secindices)+1):
-            torf = np.logical_and(isHelix(secstrs), secindices==i)
-            if torf.any():
-                helix_resnums = resnums[torf]
-                helix_chainids = chainids[torf]
-                helix_resnames = resnames[torf]
-                helix_secclasses = secclasses[torf]
-                helix_secids = secids[torf]
-                helix_icodes = icodes[torf]
-                L = helix_resnums[-1] - helix_resnums[0] + 1
-
-                stream.write(HELIXLINE.format(serNum=i, helixID=helix_secids[0], 
-                            initResName=helix_resnames[0], initChainID=helix_chainids[0], 
-                            initSeqNum=helix_resnums[0], initICode=helix_icodes[0],
-                            endResName=helix_resnames[-1], endChainID=helix_chainids[-1], 
-                            endSeqNum=helix_resnums[-1], endICode=helix_icodes[-1],
-                            helixClass=helix_secclasses[0], length=L))
-        
-        # write strands
-        torf_all_sheets = isSheet(secstrs)
-        sheet_secids = secids[torf_all_sheets]
-
-        for sheet_id in np.unique(sheet_secids):
-            torf_strands_in_sheet = np.logical_and(torf_all_sheets, secids==sheet_id)
-            strand_indices = secindices[torf_strands_in_sheet]
-            numStrands = len(np.unique(strand_indices))
-
-            for i in np.unique(strand_indices):
-                torf_strand = np.logical_and(torf_strands_in_sheet, secindices==i)
-                strand_resnums = resnums[torf_strand]
-                strand_chainids = chainids[torf_strand]
-                strand_resnames = resnames[torf_strand]
-                strand_secclasses = secclasses[torf_strand]
-                strand_icodes = icodes[torf_strand]
-
-                stream.write(SHEETLINE.format(strand=i, sheetID=sheet_id, numStrands=numStrands,
-                            initResName=strand_resnames[0], initChainID=strand_chainids[0], 
-                            initSeqNum=strand_resnums[0], initICode=strand_icodes[0],
-                            endResName=strand_resnames[-1], endChainID=strand_chainids[-1], 
-                            endSeqNum=strand_resnums[-1], endICode=strand_icodes[-1],
-                            sense=strand_secclasses[0]))
-        pass
+        stream.write(''.join(_formatSecstrLines(secstrs, secindices,
+                                                secclasses, secids, resnums,
+                                                chainids, resnames, icodes)))
+
+    # format columns that do not change between models once
+    switch = np.flatnonzero(serials > MAX_N_ATOM)
+    switch = min(switch[0] if len(switch) else n_atoms, MAX_N_ATOM)
+    if switch < n_atoms:
+        if hybrid36:
+            LOGGER.warn('Indices are exceeding 99999 and hybrid36 format is '
+                        'being used')
+        else:
+            LOGGER.warn('Indices are exceeding 99999 and hexadecimal format '
+                        'is being used')
+
+    def formatPrefixes(altlocs):
+
+        prefixes = [PDBLINE_PREFIX_LT100K % (hetero[i], serials[i],
+                                             atomnames[i], altlocs[i],
+                                             resnames[i], chainids[i],
+                                             resnums[i], icodes[i])
+                    for i in range(switch)]
+        if hybrid36:
+            prefixes.extend(PDBLINE_PREFIX_GE100K_H36 % (
+                hetero[i], decToHybrid36(serials[i]), atomnames[i],
+                altlocs[i], resnames[i], chainids[i], resnums[i], icodes[i])
+                for i in range(switch, n_atoms))
+        else:
+            prefixes.extend(PDBLINE_PREFIX_GE100K % (
+                hetero[i], serials[i], atomnames[i], altlocs[i],
+                resnames[i], chainids[i], resnums[i], icodes[i])
+                for i in range(switch, n_atoms))
+        return prefixes
+
+    prefixes = formatPrefixes(altlocs)
+    suffixes = [PDBLINE_SUFFIX % (occupancies[i], bfactors[i],
+                                  segments[i], elements[i])
+                for i in range(n_atoms)]
+    pdbter = atoms.getFlags('pdbter')
+    if pdbter is not None:
+        for i in np.flatnonzero(pdbter):
+            suffixes[i] += 'TER\n'
 
     # write atoms
     multi = len(coordsets) > 1
     write = stream.write
+    lines = _makeLineBuffer(prefixes, 24, suffixes)
     for m, coords in enumerate(coordsets):
-        using_hybrid36 = False
-        reached_max_n_atom = False
-        pdbline = PDBLINE_LT100K
         if multi:
             write('MODEL{0:9d}\n'.format(m+1))
-        for i, xyz in enumerate(coords):
-            if not reached_max_n_atom and (i == MAX_N_ATOM or serials[i] > MAX_N_ATOM):
-                reached_max_n_atom = True
-                if not hybrid36:
-                    pdbline = PDBLINE_GE100K
-                    LOGGER.warn('Indices are exceeding 99999 and hexadecimal format is being used')
-                else:
-                    pdbline = PDBLINE_GE100K_H36
-                    LOGGER.warn('Indices are exceeding 99999 and hybrid36 format is being used')
-                    using_hybrid36 = True
+        write(_formatLines(lines, prefixes, coords, suffixes))
+        if multi:
+            write('ENDMDL\n')
+            # altlocs are written for the first model only
+            if m == 0 and ((altlocs != '') & (altlocs != ' ')).any():
+                prefixes = formatPrefixes(np.zeros(n_atoms, s_or_u + '1'))
+                lines = _makeLineBuffer(prefixes, 24, suffixes)
 
-            if using_hybrid36:
-                serial = decToHybrid36(serials[i])
-            else:
-                serial = serials[i]
+writePDBStream.__doc__ += _writePDBdoc
 
-            write(pdbline % (hetero[i], serial,
-                             atomnames[i], altlocs[i],
-                             resnames[i], chainids[i], resnums[i],
-                             icodes[i],
-                             xyz[0], xyz[1], xyz[2],
-                             occupancies[i], bfactors[i],
-                             segments[i], elements[i]))
 
-            if atoms.getFlags('pdbter') is not None and atoms.getFlags('pdbter')[i]:
-                write('TER\n')
+def _formatSecstrLines(secstrs, secindices, secclasses, secids, resnums,
+                       chainids, resnames, icodes):
+    """Returns HELIX and SHEET lines for secondary structure elements."""
+
+    lines = []
+
+    # helices are written in the order of their indices
+    which = np.flatnonzero(isHelix(secstrs) & (secindices > 0))
+    for first, last in zip(*_findGroupEnds(secindices[which])):
+        first, last = which[first], which[last]
+        lines.append(HELIXLINE.format(serNum=secindices[first],
+                        helixID=secids[first], initResName=resnames[first],
+                        initChainID=chainids[first],
+                        initSeqNum=resnums[first], initICode=icodes[first],
+                        endResName=resnames[last], endChainID=chainids[last],
+                        endSeqNum=resnums[last], endICode=icodes[last],
+                        helixClass=secclasses[first],
+                        length=resnums[last] - resnums[first] + 1))
+
+    # strands are written sheet by sheet, in the order of their indices
+    which = np.flatnonzero(isSheet(secstrs))
+    sheetids, sheets = np.unique(secids[which], return_inverse=True)
+    firsts, lasts = _findGroupEnds(sheets, secindices[which])
+    numstrands = np.bincount(sheets[firsts])
+    for first, last in zip(firsts, lasts):
+        sheet = sheets[first]
+        first, last = which[first], which[last]
+        lines.append(SHEETLINE.format(strand=secindices[first],
+                        sheetID=secids[first], numStrands=numstrands[sheet],
+                        initResName=resnames[first],
+                        initChainID=chainids[first],
+                        initSeqNum=resnums[first], initICode=icodes[first],
+                        endResName=resnames[last], endChainID=chainids[last],
+                        endSeqNum=resnums[last], endICode=icodes[last],
+                        sense=secclasses[first]))
+    return lines
+
+
+def _findGroupEnds(*keys):
+    """Returns positions of the first and last items of groups of equal
+    *keys*, with groups sorted by keys in the given order."""
+
+    if not len(keys[0]):
+        return np.zeros(0, int), np.zeros(0, int)
+    order = np.lexsort((np.arange(len(keys[0])),) + keys[::-1])
+    change = np.zeros(len(order) - 1, bool)
+    for key in keys:
+        key = key[order]
+        change |= key[1:] != key[:-1]
+    change = np.flatnonzero(change)
+    return order[np.append(0, change + 1)], order[np.append(change, -1)]
+
+
+def _makeLineBuffer(prefixes, width, suffixes):
+    """Returns an array of ASCII codes for lines made up of *prefixes*,
+    *width* blank columns for numbers, and *suffixes*, and offsets of the
+    blank columns in it.  **None** is returned when lines are not ASCII."""
+
+    blank = ' ' * width
+    try:
+        chars = ''.join([prefix + blank + suffix for prefix, suffix
+                         in zip(prefixes, suffixes)]).encode('ascii')
+    except UnicodeEncodeError:
+        return None
+    starts = np.array([len(prefix) for prefix in prefixes], int)
+    lengths = starts + width
+    lengths += np.array([len(suffix) for suffix in suffixes], int)
+    offsets = np.cumsum(lengths) - lengths + starts
+    return np.frombuffer(chars, 'u1').copy(), offsets
+
+
+def _formatFixed(values, width, precision):
+    """Returns an array of ASCII codes for *values* formatted as
+    ``'%{width}.{precision}f'``, with shape ``values.shape + (width,)``, or
+    **None** if any value does not fit in *width* columns."""
+
+    values = np.asarray(values, float)
+    shape = values.shape + (width,)
+    values = values.ravel()
+    scale = 10 ** precision
+    scaled = values * scale
+    if not (np.abs(scaled) < 10 ** (width - 1)).all():
+        return None
+    integers = np.rint(scaled)
+    negative = np.signbit(values)
+    integers = np.abs(integers).astype(np.int64)
+
+    n_digits = np.zeros(len(values), int)
+    n_digits.fill(precision + 1)
+    limit = 10 ** (precision + 1)
+    while limit < 10 ** (width - 1):
+        n_digits += integers >= limit
+        limit *= 10
+    if (n_digits + 1 + negative > width).any():
+        return None
 
-        if multi:
-            write('ENDMDL\n')
-            altlocs = np.zeros(n_atoms, s_or_u + '1')
+    chars = np.zeros((len(values), width), 'u1')
+    chars.fill(ord(' '))
+    dot = width - 1 - precision
+    chars[:, dot] = ord('.')
+    column = width - 1
+    for digit in range(width - 1):
+        if column == dot:
+            column -= 1
+        which = digit < n_digits
+        chars[which, column] = ord('0') + integers[which] % 10
+        integers //= 10
+        column -= 1
+    rows = np.flatnonzero(negative)
+    chars[rows, width - 2 - n_digits[rows]] = ord('-')
+
+    # printf rounds halves using the exact binary value, so format values
+    # that are too close to a half to decide here the same way
+    fraction = np.abs(scaled - np.trunc(scaled))
+    fmt = '%{0}.{1}f'.format(width, precision)
+    for i in np.flatnonzero(np.abs(fraction - 0.5) < 1e-6):
+        string = fmt % values[i]
+        if len(string) != width:
+            return None
+        chars[i] = np.frombuffer(string.encode('ascii'), 'u1')
+    return chars.reshape(shape)
+
+
+def _formatLines(lines, prefixes, coords, suffixes, sep=''):
+    """Returns lines made up of *prefixes*, *coords* formatted as
+    ``'%8.3f'`` and separated by *sep*, and *suffixes*.  *lines* is a buffer
+    from :func:`_makeLineBuffer` whose number columns are filled in when
+    coordinates fit in them, or **None**."""
+
+    xyz = None if lines is None else _formatFixed(coords, 8, 3)
+    if xyz is None:
+        fmt = sep.join(['%8.3f'] * 3)
+        return ''.join([prefixes[i] + fmt % tuple(coords[i]) + suffixes[i]
+                        for i in range(len(prefixes))])
+
+    chars, offsets = lines
+    n_lines = len(offsets)
+    if not n_lines:
+        return ''
+    if sep:
+        step = 8 + len(sep)
+        columns = np.zeros((n_lines, 3, step), 'u1')
+        columns[:, :, :8] = xyz
+        columns[:, :, 8:] = np.frombuffer(sep.encode('ascii'), 'u1')
+        columns = columns.reshape((n_lines, 3 * step))[:, :-len(sep)]
+    else:
+        columns = xyz.reshape((n_lines, 24))
+    width = columns.shape[1]
+
+    length = len(chars) // n_lines
+    if n_lines * length == len(chars) and (np.diff(offsets) == length).all():
+        chars.reshape((n_lines, length))[:, offsets[0]:offsets[0] + width] = \
+            columns
+    else:
+        chars[offsets[:, None] + np.arange(width)] = columns
+    return chars.tobytes().decode('ascii')
 
-writePDBStream.__doc__ += _writePDBdoc
 
 def writePDB(filename, atoms, csets=None, autoext=True, **kwargs):
     """Write *atoms* in PDB format to a file with name *filename* and return
@@ -1346,16 +1836,15 @@ def writePQRStream(stream, atoms, **kwargs):
     if altlocs is None:
         altlocs = np.zeros(n_atoms, s_or_u + '1')
 
-    format = ('{0:6s} {1:5d} {2:4s} {3:1s}' +
-              '{4:4s} {5:1s} {6:4d} {7:1s}   ' +
-              '{8:8.3f} {9:8.3f} {10:8.3f}' +
-              '{11:8.4f} {12:7.4f}\n').format
-    coords = atoms._getCoords()
-    write = stream.write
-    for i, xyz in enumerate(coords):
-        write(format(hetero[i], i+1, atomnames[i], altlocs[i],
-                     resnames[i], chainids[i], int(resnums[i]),
-                     icodes[i], xyz[0], xyz[1], xyz[2], charges[i], radii[i]))
+    prefix = '{0:6s} {1:5d} {2:4s} {3:1s}{4:4s} {5:1s} {6:4d} {7:1s}   '.format
+    suffix = '{0:8.4f} {1:7.4f}\n'.format
+    prefixes = [prefix(hetero[i], i+1, atomnames[i], altlocs[i], resnames[i],
+                       chainids[i], int(resnums[i]), icodes[i])
+                for i in range(n_atoms)]
+    suffixes = [suffix(charges[i], radii[i]) for i in range(n_atoms)]
+    lines = _makeLineBuffer(prefixes, 26, suffixes)
+    stream.write(_formatLines(lines, prefixes, atoms._getCoords(), suffixes,
+                              sep=' '))
 
 def writePQR(filename, atoms, **kwargs):
     """Write *atoms* in PQR format to a file with name *filename*.  Only
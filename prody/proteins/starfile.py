@@ -109,8 +109,11 @@ class StarDataBlock:
         if list(keys) == ['fields', 'data']:
             self.loops = []
             self.numLoops = 0
-            self.data = np.array(list(self._dict['data'].values()))[indices[:,1]]
-            self.fields = np.array(list(self._dict['fields'].values()))[indices[:,1]]
+            self.data = list(self._dict['data'].values())
+            self.fields = list(self._dict['fields'].values())
+            if indices is not None:
+                self.data = np.array(self.data)[indices[:,1]]
+                self.fields = np.array(self.fields)[indices[:,1]]
             self.numEntries = len(self.data)
             self.numFields = len(self.fields)
 
@@ -120,10 +123,19 @@ class StarDataBlock:
             self.numEntries = len(self.data)
             self.numFields = len(self.fields)
 
-            self.loops = [StarLoop(self, key, indices)
-                          for (key, indices) in keys[2:]]
+            if indices is None:
+                self.loops = [StarLoop(self, key) for key in keys[2:]]
+            else:
+                self.loops = [StarLoop(self, key, indices)
+                              for (key, indices) in keys[2:]]
             self.numLoops = len(self.loops)
 
+        elif indices is None:
+            self.loops = [StarLoop(self, key) for key in keys]
+            self.numLoops = len(self.loops)
+            self.numEntries = 0
+            self.numFields = 0
+
         else:
             self.loops = [StarLoop(self, key, indices)
                           for (key, indices) in keys]
@@ -249,7 +261,7 @@ class StarDataBlock:
                 sys.stdout.write('\n')  
 
 
-class StarLoop:
+class StarLoop(object):
     def __init__(self, dataBlock, key, indices=None):
         self._key = key
         self._dataBlock = dataBlock
@@ -265,17 +277,42 @@ class StarLoop:
 
         self._prog = dataBlock._prog
         self.fields = list(self._dict['fields'].values())
-        self.data = list(self._dict['data'].values())
         self.numFields = len(self.fields)
-        self.numRows = len(self.data)
         self._title = dataBlock._title + ' loop ' + str(key)
+        self._data = None
+        self._columns = {}
+
+    @property
+    def numRows(self):
+        """Number of rows."""
+
+        return len(self._dict['data'])
+
+    @property
+    def data(self):
+        """List of rows, each a dictionary of fields and values.  Rows of
+        loops indexed by :func:`.parseSTAR` are read when first accessed."""
+
+        if self._data is None:
+            self._data = list(self._dict['data'].values())
+        return self._data
 
     def getData(self, key):
-        if key in self.fields:
-            return [row[key] for row in self.data]
-        else:
+        """Returns values of field *key* in an array, which is an integer or
+        a float array for numeric fields.  Values are parsed when the field
+        is first accessed and cached."""
+
+        if key not in self.fields:
             raise ValueError('That field is not present in this loop')
 
+        data = self._dict['data']
+        if isinstance(data, _StarLoopData):
+            return data.getColumn(key)
+        if key not in self._columns:
+            self._columns[key] = _convertColumn([row[key]
+                                                 for row in self.data])
+        return self._columns[key]
+
     def getTitle(self):
         return self._title
 
@@ -339,6 +376,248 @@ class StarLoop:
             sys.stdout.write('\n')
 
 
+_BLOCK_SIZE = 2 ** 22
+
+
+def _convertColumn(values):
+    """Returns *values* in an integer or a float array, if they are all
+    numbers, or in a string array otherwise."""
+
+    values = np.array(values, str)
+    for dtype in (int, float):
+        try:
+            return values.astype(dtype)
+        except (ValueError, OverflowError):
+            pass
+    return values
+
+
+class _StarLoopData(object):
+    """Rows of a loop in a STAR file, which are read from the file only when
+    they are accessed.  Instances behave like the dictionary of rows built by
+    :func:`.parseSTARLines`, mapping row numbers to dictionaries of fields
+    and values, and provide columns as typed arrays via :meth:`getColumn`."""
+
+    def __init__(self, filename, offset, end, fields, n_lines, shlex=False):
+
+        self._filename = filename
+        self._offset = offset
+        self._end = end
+        self._fields = list(fields)
+        # rows are counted when first needed, as they may span lines
+        self._n_lines = n_lines
+        self._n_rows = None
+        self._shlex = shlex
+        self._raw = {}
+        self._columns = {}
+
+    def __len__(self):
+
+        return self._numRows()
+
+    def __iter__(self):
+
+        return iter(range(self._numRows()))
+
+    def __contains__(self, index):
+
+        return isinstance(index, Integral) and 0 <= index < self._numRows()
+
+    def __getitem__(self, index):
+
+        if index not in self:
+            raise KeyError(index)
+        raw = self._getRaw(self._fields)
+        return dict((field, str(raw[field][index])) for field in self._fields)
+
+    def keys(self):
+
+        return list(range(self._numRows()))
+
+    def values(self):
+
+        return [self[index] for index in range(self._numRows())]
+
+    def items(self):
+
+        return [(index, self[index]) for index in range(self._numRows())]
+
+    def _numRows(self):
+        """Returns number of rows, which are counted by reading the first
+        column when they are not known yet."""
+
+        if self._n_rows is None:
+            self._getRaw(self._fields[:1])
+        return self._n_rows
+
+    def getColumn(self, field):
+        """Returns values of *field* in a typed array, see
+        :meth:`.StarLoop.getData`."""
+
+        if field not in self._columns:
+            if field in self._raw:
+                raw = self._raw[field]
+            else:
+                raw = self._readColumns([field])[field]
+            self._columns[field] = _convertColumn(raw)
+        return self._columns[field]
+
+    def _getRaw(self, fields):
+        """Returns a dictionary of string arrays for *fields*, which are
+        cached."""
+
+        missing = [field for field in fields if field not in self._raw]
+        if missing:
+            self._raw.update(self._readColumns(missing))
+        return self._raw
+
+    def _iterText(self):
+        """Yields text of rows in blocks of whole lines."""
+
+        with open(self._filename, 'rb') as stream:
+            stream.seek(self._offset)
+            remaining = self._end - self._offset
+            rest = b''
+            while remaining > 0:
+                block = stream.read(min(remaining, _BLOCK_SIZE))
+                if not block:
+                    break
+                remaining -= len(block)
+                block = rest + block
+                cut = block.rfind(b'\n') + 1
+                if remaining > 0:
+                    rest = block[cut:]
+                    block = block[:cut]
+                    if not block:
+                        continue
+                else:
+                    rest = b''
+                yield pystr(block)
+            if rest:
+                yield pystr(rest)
+
+    def _readColumns(self, fields):
+        """Returns a dictionary of string arrays for *fields*, which are read
+        from the file in one pass."""
+
+        n_fields = len(self._fields)
+        indices = [self._fields.index(field) for field in fields]
+        columns = dict((field, []) for field in fields)
+        n_rows = 0
+        for text in self._iterText():
+            if self._shlex and ("'" in text or '"' in text):
+                tokens = []
+                for line in text.splitlines():
+                    tokens.extend(split(line, shlex=True))
+            else:
+                tokens = text.split()
+            if len(tokens) % n_fields:
+                break
+            n_rows += len(tokens) // n_fields
+            for field, index in zip(fields, indices):
+                columns[field].append(np.array(tokens[index::n_fields], str))
+        else:
+            if n_rows == self._n_lines:
+                self._n_rows = n_rows
+                return dict((field, np.concatenate(arrays) if arrays else
+                             np.zeros(0, str))
+                            for field, arrays in columns.items())
+
+        # rows that span multiple lines are parsed by parseSTARLines
+        lines = ['data_loop\n', 'loop_\n']
+        lines.extend(field + '\n' for field in self._fields)
+        lines.extend(''.join(self._iterText()).splitlines(True))
+        rows = parseSTARLines(lines, shlex=self._shlex)[0]['loop'][0]['data']
+        self._n_rows = len(rows)
+        return dict((field, np.array([row.get(field, '')
+                                      for row in rows.values()], str))
+                    for field in fields)
+
+    def write(self, stream):
+        """Writes rows to *stream* as they are in the file."""
+
+        for text in self._iterText():
+            stream.write(text)
+
+
+def _indexSTAR(filename, shlex=False):
+    """Returns lines of *filename* other than rows of loops and a list of
+    :class:`_StarLoopData` instances with keys of their data block and loop.
+    Loops with rows containing multi-line values or comments are returned
+    in lines."""
+
+    lines = []
+    loops = []
+    block = None
+    n_loops = -1
+    state = None
+    offset = 0
+
+    def finish(end):
+        if irregular:
+            with open(filename, 'rb') as stream:
+                stream.seek(start)
+                lines.extend(pystr(line) for line in
+                             stream.read(end - start).splitlines(True))
+        else:
+            loops.append((block, n_loops, _StarLoopData(filename, start, end,
+                                                        fields, n_rows,
+                                                        shlex)))
+
+    with open(filename, 'rb') as stream:
+        for line in stream:
+            line_start = offset
+            offset += len(line)
+            if state == 'rows':
+                if (line.startswith((b'data_', b'loop_', b'_', b' _')) or
+                        line.strip() == b'#'):
+                    finish(line_start)
+                    state = None
+                else:
+                    if line.strip():
+                        n_rows += 1
+                        irregular = (irregular or
+                                     line.startswith((b';', b'#')))
+                    continue
+
+            elif state == 'fields':
+                if line.startswith((b'_', b' _')):
+                    words = pystr(line).split()
+                    if len(words) > 1 and words[1].startswith('#'):
+                        # drop column numbers, e.g. _rlnImageName #1
+                        line = words[0] + '\n'
+                    if len(split(pystr(line).strip(), shlex=shlex)) == 1:
+                        fields.append(split(pystr(line).strip(),
+                                            shlex=shlex)[0])
+                    else:
+                        state = None
+                    lines.append(pystr(line))
+                    continue
+                elif not line.strip():
+                    continue
+                elif not (line.startswith((b'data_', b'loop_')) or
+                          line.strip() == b'#'):
+                    state = 'rows'
+                    start = line_start
+                    n_rows = 1
+                    irregular = line.startswith((b';', b'#'))
+                    continue
+                state = None
+
+            if line.startswith(b'data_'):
+                block = pystr(line)[5:].strip()
+                n_loops = -1
+            elif line.startswith(b'loop_'):
+                n_loops += 1
+                state = 'fields'
+                fields = []
+            lines.append(pystr(line))
+
+    if state == 'rows':
+        finish(offset)
+    return lines, loops
+
+
 def parseSTAR(filename, **kwargs):
     """Returns a dictionary containing data parsed from a STAR file.
 
@@ -357,6 +636,11 @@ def parseSTAR(filename, **kwargs):
     :arg shlex: whether to use shlex for splitting lines so as to preserve quoted substrings
         Default is **False**
     :type shlex: bool
+
+    Uncompressed files are indexed in one pass, in which positions of loop
+    rows in the file are recorded.  Rows are read only when they are accessed
+    and fields accessed with :meth:`.StarLoop.getData` are parsed into arrays
+    and cached.
     """
     if not os.path.isfile(filename) and not os.path.isfile(filename + '.star'):
         raise IOError('There is no file called {0}.'.format(filename))
@@ -373,11 +657,20 @@ def parseSTAR(filename, **kwargs):
     if not isinstance(shlex, bool):
         raise TypeError('shlex should be a boolean')
 
-    starfile = openFile(filename, 'r')
-    lines = [pystr(line) for line in starfile.readlines()]
-    starfile.close()
+    if not os.path.isfile(filename):
+        filename += '.star'
 
-    parsingDict, prog = parseSTARLines(lines, **kwargs)
+    if start is not None or stop is not None or filename.endswith('.gz'):
+        starfile = openFile(filename, 'r')
+        lines = [pystr(line) for line in starfile.readlines()]
+        starfile.close()
+
+        parsingDict, prog = parseSTARLines(lines, **kwargs)
+    else:
+        lines, loops = _indexSTAR(filename, shlex)
+        parsingDict, prog = parseSTARLines(lines, shlex=shlex)
+        for block, index, data in loops:
+            parsingDict[block][index]['data'] = data
 
     return StarDict(parsingDict, prog, filename)
 
@@ -564,6 +857,17 @@ def parseSTARLines(lines, **kwargs):
     return finalDictionary, prog
 
 
+def _formatSTARValue(value):
+    """Returns *value* quoted if it contains white space."""
+
+    value = str(value)
+    if '\n' in value:
+        return '\n;' + value + '\n;'
+    if not value or (len(value.split()) > 1 and value[0] not in '\'"'):
+        return "'" + value + "'"
+    return value
+
+
 def writeSTAR(filename, starDict):
     """Writes a STAR file from a dictionary containing data
     such as that parsed from a Relion STAR file.
@@ -571,26 +875,42 @@ def writeSTAR(filename, starDict):
     :arg filename: a filename
         The .star extension can be omitted.
 
-    :arg dictionary: a dictionary in STAR format
+    :arg dictionary: a dictionary in STAR format or a :class:`.StarDict`
         This should have nested entries starting with data blocks then loops/tables then
-        field names and finally data.
+        field names and finally data.  Rows of loops that are indexed by
+        :func:`.parseSTAR` are copied from the original file without being
+        parsed.
     """
 
+    if isinstance(starDict, StarDict):
+        starDict = starDict.getDict()
+
     star = open(filename, 'w')
 
     for dataBlockKey in starDict:
         star.write('\ndata_' + dataBlockKey + '\n')
-        for loopNumber in starDict[dataBlockKey]:
+        dataBlock = starDict[dataBlockKey]
+        if 'fields' in dataBlock:
+            star.write('\n')
+            for field in dataBlock['fields'].values():
+                star.write('{0} {1}\n'.format(field, _formatSTARValue(
+                    dataBlock['data'][field])))
+        for loopNumber in dataBlock:
+            if loopNumber in ('fields', 'data'):
+                continue
+            loop = dataBlock[loopNumber]
             star.write('\nloop_\n')
-            for fieldNumber in starDict[dataBlockKey][loopNumber]['fields']:
-                star.write('_' + starDict[dataBlockKey]
-                           [loopNumber]['fields'][fieldNumber] + '\n')
-            for dataItemNumber in starDict[dataBlockKey][loopNumber]['data']:
-                for fieldNumber in starDict[dataBlockKey][loopNumber]['fields']:
-                    currentField = starDict[dataBlockKey][loopNumber]['fields'][fieldNumber]
-                    star.write(starDict[dataBlockKey][loopNumber]
-                               ['data'][dataItemNumber][currentField] + ' ')
-                star.write('\n')
+            fields = list(loop['fields'].values())
+            for field in fields:
+                if not field.startswith('_'):
+                    field = '_' + field
+                star.write(field + '\n')
+            if isinstance(loop['data'], _StarLoopData):
+                loop['data'].write(star)
+                continue
+            for row in loop['data'].values():
+                star.write(' '.join(_formatSTARValue(row[field])
+                                    for field in fields) + '\n')
 
     star.close()
     return
@@ -688,11 +1008,9 @@ def parseImagesFromSTAR(particlesSTAR, **kwargs):
         if dataBlock_goodness[n]:
             i += 1
             for j, loop in enumerate(dataBlock):
-                for k in range(maxRows):
-                    if k < loop.numRows:
-                        indices[i, j, k] = np.array([n, j, k])
-                    else:
-                        indices[i, j, k] = np.array([0, 0, 0])
+                indices[i, j, :loop.numRows] = np.column_stack(
+                    (np.full(loop.numRows, n), np.full(loop.numRows, j),
+                     np.arange(loop.numRows)))
 
     dataBlocks = np.array(dataBlocks)
     loops = np.array(loops)
@@ -824,16 +1142,17 @@ def parseImagesFromSTAR(particlesSTAR, **kwargs):
         raise ValueError(
             'selection does not contain any rows with image fields')
 
-    # Use indices to collect particle data dictionaries
+    # Use indices to collect loops and rows of particles, whose fields are
+    # accessed as columns
+    indices = np.asarray(indices).reshape((-1, 3))
+    keep = indices.any(1)
+    keep[:1] = True
     particles = []
-
-    for i, index_i in enumerate(indices):
-        for j, index_j in enumerate(index_i):
-            for k, index_k in enumerate(index_j):
-                if not (np.array_equal(index_k, np.array([0, 0, 0]))
-                        and not (i == 0 and j == 0 and k == 0)):
-                    particles.append(
-                        particlesSTAR[index_k[0]][index_k[1]][index_k[2]])
+    loops = {}
+    for n, j, k in indices[keep]:
+        if (n, j) not in loops:
+            loops[(n, j)] = particlesSTAR[n][j]
+        particles.append((loops[(n, j)], k))
 
     if particle_indices is None:
         particle_indices = list(range(len(particles)))
@@ -849,10 +1168,10 @@ def parseImagesFromSTAR(particlesSTAR, **kwargs):
         imageFieldKey = '_rlnImageName'
 
     for i in particle_indices:
-        particle = particles[i]
+        loop, row = particles[i]
 
         try:
-            image_field = particle[imageFieldKey]
+            image_field = str(loop.getData(imageFieldKey)[row])
             image_index = int(image_field.split('@')[0])-1
             filename = image_field.split('@')[1]
         except:
@@ -877,13 +1196,13 @@ def parseImagesFromSTAR(particlesSTAR, **kwargs):
 
         if rotateImages:
             if particlesSTAR._prog == 'RELION':
-                anglePsi = float(particle['_rlnAnglePsi'])
-                originX = float(particle['_rlnOriginX'])
-                originY = float(particle['_rlnOriginY'])
+                anglePsi = float(loop.getData('_rlnAnglePsi')[row])
+                originX = float(loop.getData('_rlnOriginX')[row])
+                originY = float(loop.getData('_rlnOriginY')[row])
             elif particlesSTAR._prog == 'XMIPP':
-                anglePsi = float(particle['_anglePsi'])
-                originX = float(particle['_shiftX'])
-                originY = float(particle['_shiftY'])
+                anglePsi = float(loop.getData('_anglePsi')[row])
+                originX = float(loop.getData('_shiftX')[row])
+                originY = float(loop.getData('_shiftY')[row])
             images.append(rotate(image, anglePsi,
                                  center=(float(image.shape[0])-originX,
                                          float(image.shape[1])-originY)))
@@ -8,6 +8,8 @@ import os
 
 from numpy import dtype, zeros, empty, ones, where, ceil, shape, eye
 from numpy import indices, tril_indices, array, ndarray, isscalar, unique
+from numpy import arange, concatenate, divide, fill_diagonal, rint, bincount
+from numpy import float32, intp, uint8
 
 from prody import LOGGER
 from prody.utilities import which, MATCH_SCORE, MISMATCH_SCORE
@@ -360,40 +362,304 @@ def filterRankedPairs(pdb, indices, msa_indices, rank_row, rank_col, zscore_sort
     
     return pairList
 
-def buildSeqidMatrix(msa, turbo=True):
-    """Returns sequence identity matrix for *msa*."""
+SEQID_TILE_SIZE = 512
+
+# residue codes used by buildSeqidMatrix, letters of either case are residues
+_SEQID_CODES = zeros(256, uint8)
+_SEQID_CODES[65:91] = _SEQID_CODES[97:123] = arange(1, 27)
+
+# residue codes used by calcMeff, only upper case letters of the 20 amino
+# acids are residues
+_MEFF_CODES = zeros(256, uint8)
+_MEFF_CODES[65:91] = [1, 0, 2, 3, 4, 5, 6, 7, 8, 0, 9, 10, 11, 12, 0, 13, 14,
+                      15, 16, 17, 0, 18, 19, 0, 20, 0]
+
+def _encodeMSA(msa, omitgaps=True):
+    """Returns *msa* as an array of residue codes, where zero stands for a
+    gap or a character that is not counted as a residue."""
+
+    codes = _SEQID_CODES if omitgaps else _MEFF_CODES
+    return codes[msa.view(uint8)]
+
+def _getOneHotSlots(codes, omitgaps=True):
+    """Returns an array of shape (number of columns, 27) that maps residue
+    codes present in each column to columns of a one-hot encoding, and the
+    width of the encoding.  Gaps have no slot, unless *omitgaps* is
+    **False**."""
+
+    length = codes.shape[1]
+    present = zeros((length, 27), bool)
+    for start in range(0, codes.shape[0], 4096):
+        present[arange(length), codes[start:start + 4096]] = True
+    if omitgaps:
+        present[:, 0] = False
+    slots = empty((length, 27), intp)
+    slots.fill(-1)
+    width = present.sum()
+    slots[present] = arange(width)
+    return slots, width
+
+def _encodeBlock(codes, slots, width, omitgaps=True):
+    """Returns one-hot encoding of a block of sequences *codes*, and if
+    *omitgaps* is **True**, also their residue masks and residue counts."""
+
+    number, length = codes.shape
+    onehot = zeros((number, width), float32)
+    cols = slots[arange(length), codes]
+    which = cols >= 0
+    rows = arange(number).repeat(length).reshape(codes.shape)
+    onehot[rows[which], cols[which]] = 1
+    if not omitgaps:
+        return onehot, None, None
+    residues = (codes != 0).astype(float32)
+    return onehot, residues, residues.sum(1)
+
+def _takeBlock(block, which):
+    """Returns rows of an encoded *block* of sequences."""
+
+    return tuple(None if item is None else item[which] for item in block)
+
+def _calcSeqid(iblock, jblock, length):
+    """Returns identities between two encoded blocks of sequences of
+    *length* columns.  Numbers of identical residues are calculated as
+    products of one-hot encodings, which are exact in single precision."""
+
+    ionehot, iresidues, icounts = iblock
+    jonehot, jresidues, jcounts = jblock
+    score = ionehot.dot(jonehot.T).astype(float)
+    if iresidues is None:
+        ncols = empty(score.shape)
+        ncols.fill(length)
+    else:
+        both = iresidues.dot(jresidues.T)
+        ncols = icounts[:, None] + jcounts - both
+    seqid = zeros(score.shape)
+    divide(score, ncols, out=seqid, where=ncols > 0)
+    return seqid
+
+def _calcSeqidTiles(codes, func, omitgaps=True, n_cpu=1,
+                    tile_size=SEQID_TILE_SIZE):
+    """Calls ``func(rows, cols, seqid)`` for tiles of sequence identity
+    matrix of encoded MSA *codes* that are on or above the diagonal, and
+    returns their results.  Tiles of a row are calculated together and rows
+    are distributed over *n_cpu* threads.
+
+    If *omitgaps* is **True**, identity is calculated over columns where at
+    least one of the sequences has a residue, otherwise over all columns."""
+
+    number, length = codes.shape
+    slots, width = _getOneHotSlots(codes, omitgaps)
+    starts = range(0, number, tile_size)
+
+    def calcRow(i):
+        rows = slice(i, min(i + tile_size, number))
+        iblock = _encodeBlock(codes[rows], slots, width, omitgaps)
+        results = []
+        for j in range(i, number, tile_size):
+            cols = slice(j, min(j + tile_size, number))
+            if i == j:
+                jblock = iblock
+            else:
+                jblock = _encodeBlock(codes[cols], slots, width, omitgaps)
+            seqid = _calcSeqid(iblock, jblock, length)
+            results.append(func(rows, cols, seqid))
+        return results
+
+    if n_cpu > 1 and len(starts) > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(n_cpu)
+        try:
+            rows = pool.map(calcRow, starts, 1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        rows = [calcRow(i) for i in starts]
+    return [result for row in rows for result in row]
+
+def _findUniqueSequences(codes, seqid, n_cpu=1, tile_size=SEQID_TILE_SIZE):
+    """Returns unique sequences of encoded MSA *codes*.  Sequences are
+    compared only to unique sequences coming before them, in tiles that are
+    distributed over *n_cpu* threads."""
+
+    number, length = codes.shape
+    slots, width = _getOneHotSlots(codes)
+    unique = ones(number, bool)
+    found = []
+
+    pool = None
+    if n_cpu > 1:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(n_cpu)
+
+    def isSimilar(args):
+        block, start = args
+        stop = min(start + tile_size, len(found))
+        other = _encodeBlock(codes[found[start:stop]], slots, width)
+        return (_calcSeqid(block, other, length) >= seqid).any(1)
+
+    try:
+        for start in range(0, number, tile_size):
+            rows = arange(start, min(start + tile_size, number))
+            block = _encodeBlock(codes[rows], slots, width)
+            if found:
+                args = [(block, i) for i in range(0, len(found), tile_size)]
+                if pool is None:
+                    similar = [isSimilar(arg) for arg in args]
+                else:
+                    similar = pool.map(isSimilar, args)
+                which = ~array(similar).any(0)
+                rows = rows[which]
+                block = _takeBlock(block, which)
+
+            # sequences in the tile are compared in order
+            similar = _calcSeqid(block, block, length) >= seqid
+            which = ones(len(rows), bool)
+            for i in range(len(rows)):
+                if which[i]:
+                    which[i + 1:] &= ~similar[i, i + 1:]
+            unique[start:start + tile_size] = False
+            unique[rows[which]] = True
+            found.extend(rows[which])
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return unique
+
+def _getNCPU(**kwargs):
+    """Returns number of threads given as *n_cpu* in *kwargs*."""
+
+    n_cpu = kwargs.get('n_cpu', 1)
+    if not isinstance(n_cpu, Integral):
+        raise TypeError('n_cpu must be an integer')
+    elif n_cpu < 1:
+        raise ValueError('n_cpu must be equal to or greater than 1')
+    return n_cpu
+
+def _isMeffSimilar(seqid, length, theta):
+    """Returns mask of identities *seqid* of sequences of *length* columns
+    which are within distance *theta* of each other, as in :func:`.calcMeff`.
+    """
+
+    if not length:
+        return zeros(shape(seqid), bool)
+    mismatch = length - rint(seqid * length)
+    return mismatch / length < theta
+
+def buildSeqidMatrix(msa, turbo=True, **kwargs):
+    """Returns sequence identity matrix for *msa*.  Identity of a pair of
+    sequences is the fraction of identical residues among columns where at
+    least one of them has a residue.  Identities are calculated in tiles
+    of *tile_size* sequences, and *turbo* is kept for backward compatibility.
+
+    :arg seqid: if given, a :class:`~scipy.sparse.csr_matrix` that contains
+        only identities of pairs of sequences sharing *seqid* or more
+        identity is returned, which can be passed to :func:`.uniqueSequences`
+        and :func:`.calcMeff` as *neighbors* and does not need memory for all
+        pairs
+    :type seqid: float
+
+    :arg omitgaps: when **False**, columns where neither of the sequences
+        has a residue count as identical and pairs need to share more than
+        *seqid* identity, as in :func:`.calcMeff`, default is **True**
+    :type omitgaps: bool
+
+    :arg n_cpu: number of threads calculating tiles, default is 1
+    :type n_cpu: int
+    """
 
     msa = getMSA(msa)
+    seqid = kwargs.get('seqid', None)
+    omitgaps = kwargs.get('omitgaps', True)
+    n_cpu = _getNCPU(**kwargs)
+    tile_size = kwargs.get('tile_size', SEQID_TILE_SIZE)
+
+    if seqid is not None and not (0 < seqid <= 1):
+        raise ValueError('seqid must satisfy 0 < seqid <= 1')
 
     LOGGER.timeit('_seqid')
-    from .seqtools import msaeye
+    codes = _encodeMSA(msa, omitgaps)
+    number, length = codes.shape
 
-    dim = msa.shape[0]
-    seqid = msaeye(msa, ones((dim, dim), float), turbo=bool(turbo))
+    if seqid is None:
+        matrix = empty((number, number))
 
-    LOGGER.report('Sequence identity matrix was calculated in %.2fs.',
-                  '_seqid')
-    return seqid
+        def fillTile(rows, cols, tile):
+            matrix[rows, cols] = tile
+            matrix[cols, rows] = tile.T
+
+        _calcSeqidTiles(codes, fillTile, omitgaps, n_cpu, tile_size)
+        fill_diagonal(matrix, 1)
+        LOGGER.report('Sequence identity matrix was calculated in %.2fs.',
+                      '_seqid')
+        return matrix
 
-buildSeqidMatrix.__doc__ += doc_turbo
+    from scipy.sparse import coo_matrix
 
+    def findPairs(rows, cols, tile):
+        if omitgaps:
+            which = tile >= seqid
+        else:
+            which = _isMeffSimilar(tile, length, 1. - seqid)
+        if rows.start == cols.start:
+            which[tril_indices(tile.shape[0])] = False
+        i, j = which.nonzero()
+        return i + rows.start, j + cols.start, tile[i, j]
+
+    pairs = _calcSeqidTiles(codes, findPairs, omitgaps, n_cpu, tile_size)
+    if pairs:
+        i, j, data = [concatenate(column) for column in zip(*pairs)]
+    else:
+        i = j = data = zeros(0)
+    matrix = coo_matrix((data, (i, j)), shape=(number, number))
+    matrix = (matrix + matrix.T).tocsr()
+    LOGGER.report('Pairs of sequences sharing {0} identity were found in '
+                  '%.2fs.'.format(seqid), '_seqid')
+    return matrix
 
-def uniqueSequences(msa, seqid=0.98, turbo=True):
+
+def uniqueSequences(msa, seqid=0.98, turbo=True, **kwargs):
     """Returns a boolean array marking unique sequences in *msa*.  A sequence
-    sharing sequence identity of *seqid* or more with another sequence coming
-    before itself in *msa* will have a **True** value in the array."""
+    sharing sequence identity of *seqid* or more with another unique sequence
+    coming before itself in *msa* will have a **False** value in the array.
 
-    msa = getMSA(msa)
+    When *neighbors* are not given, each tile of *tile_size* sequences is
+    compared only to unique sequences found before it.
+
+    :arg neighbors: identities of pairs of sequences returned by
+        :func:`.buildSeqidMatrix` at a *seqid* level equal to or lower than
+        *seqid*
+    :type neighbors: :class:`~scipy.sparse.csr_matrix`
 
-    from .seqtools import msaeye
+    :arg n_cpu: number of threads comparing tiles, default is 1
+    :type n_cpu: int"""
+
+    msa = getMSA(msa)
 
     if not (0 < seqid <= 1):
         raise ValueError('seqid must satisfy 0 < seqid <= 1')
 
-    return msaeye(msa, zeros(msa.shape[0], bool),
-                  unique=seqid, turbo=bool(turbo))
+    neighbors = kwargs.pop('neighbors', None)
+    if neighbors is None:
+        n_cpu = _getNCPU(**kwargs)
+        tile_size = kwargs.get('tile_size', SEQID_TILE_SIZE)
+        return _findUniqueSequences(_encodeMSA(msa), seqid, n_cpu, tile_size)
+    elif neighbors.shape != (msa.shape[0], msa.shape[0]):
+        raise ValueError('neighbors must be a square matrix with a row for '
+                         'each sequence in msa')
 
-uniqueSequences.__doc__ += doc_turbo
+    from scipy.sparse import triu
+    neighbors = triu(neighbors, 1).tocsr()
+    indptr, indices = neighbors.indptr, neighbors.indices
+    similar = neighbors.data >= seqid
+
+    unique = ones(msa.shape[0], bool)
+    for i in (indptr[1:] > indptr[:-1]).nonzero()[0]:
+        if unique[i]:
+            start, stop = indptr[i], indptr[i + 1]
+            unique[indices[start:stop][similar[start:stop]]] = False
+    return unique
 
 
 def calcRankorder(matrix, zscore=False, **kwargs):
@@ -625,20 +891,39 @@ def calcMeff(msa, seqid=.8, refine=False, weight=False, **kwargs):
     Sequences are not refined by default. When *refine* is set **True**, the
     MSA will be refined by the first sequence.
 
-    The weight for each sequence are returned when *weight* is **True**."""
+    The weight for each sequence are returned when *weight* is **True**.
+
+    :arg neighbors: identities of pairs of sequences returned by
+        :func:`.buildSeqidMatrix` for the (refined) *msa* with *omitgaps*
+        set **False** at a *seqid* level equal to or lower than *seqid*,
+        which are calculated when not given
+    :type neighbors: :class:`~scipy.sparse.csr_matrix`
+
+    Other keyword arguments, e.g. *n_cpu*, are passed to
+    :func:`.buildSeqidMatrix`."""
 
     msa = getMSA(msa)
-    from .msatools import msameff
     LOGGER.timeit('_meff')
-    refine = 1 if refine else 0
-    weight = 0 if weight else 1  # A Mark for return weighted array.
-    if (not weight):
-        w = zeros((msa.shape[0]), float)
-        meff = msameff(msa, theta=1.-seqid, meff_only=weight,
-                       refine=refine, w=w)
-    else:
-        meff = msameff(msa, theta=1.-seqid, meff_only=weight, refine=refine)
+    if refine:
+        first = msa[0].view(uint8)
+        msa = msa[:, (first >= 65) & (first <= 90)]
+    number, length = msa.shape
+
+    neighbors = kwargs.pop('neighbors', None)
+    if neighbors is None:
+        neighbors = buildSeqidMatrix(msa, seqid=seqid, omitgaps=False,
+                                     **kwargs)
+    elif neighbors.shape != (number, number):
+        raise ValueError('neighbors must be a square matrix with a row for '
+                         'each sequence in msa')
+
+    neighbors = neighbors.tocoo()
+    similar = _isMeffSimilar(neighbors.data, length, 1. - seqid)
+    w = 1. / (1. + bincount(neighbors.row[similar], minlength=number))
+    meff = w.sum()
     LOGGER.report('Meff was calculated in %.2fs.', '_meff')
+    if weight:
+        return meff, w
     return meff
 
 def alignSequencesByChain(PDBs, **kwargs):
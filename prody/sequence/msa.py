@@ -424,6 +424,9 @@ def refineMSA(msa, index=None, label=None, rowocc=None, seqid=None, colocc=None,
         will be removed after other refinements are applied
     :type colocc: float
 
+    :arg n_cpu: number of threads identifying unique sequences, default is 1
+    :type n_cpu: int
+
     :arg keep: keep columns corresponding to residues not resolved in the PDB
         structure, default is **False**, applies when *label* is a PDB
         identifier
@@ -603,7 +606,8 @@ def refineMSA(msa, index=None, label=None, rowocc=None, seqid=None, colocc=None,
     if seqid is not None:
         before = arr.shape[0]
         LOGGER.timeit('_refine')
-        unique = uniqueSequences(arr, seqid)
+        unique = uniqueSequences(arr, seqid,
+                                 n_cpu=kwargs.get('n_cpu', 1))
         if index is not None:
             unique[index] = True
         unique = unique.nonzero()[0]
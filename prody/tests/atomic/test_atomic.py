@@ -78,6 +78,21 @@ class TestSaveLoad(unittest.TestCase):
             assert_equal(atoms.getData(label), ATOMS.getData(label),
                          'failed to load ' + label)
 
+    def testSaveLoadMemmap(self):
+
+        filename = saveAtoms(ATOMS, os.path.join(TEMPDIR, 'atoms'),
+                             memmap=True)
+        self.assertTrue(filename.endswith('.ag'))
+        atoms = loadAtoms(filename)
+        assert_equal(atoms.getCoordsets(), ATOMS.getCoordsets())
+        for label in ATOMS.getDataLabels():
+            assert_equal(atoms.getData(label), ATOMS.getData(label),
+                         'failed to load ' + label)
+        self.assertEqual(atoms.getTitle(), ATOMS.getTitle())
+        atoms.setCoords(atoms.getCoords() + 1)
+        assert_equal(loadAtoms(filename).getCoordsets(),
+                     ATOMS.getCoordsets())
+
 
 class TestPickling(unittest.TestCase):
 
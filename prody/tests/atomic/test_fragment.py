@@ -57,3 +57,26 @@ class TestFragment(TestCase):
     def testSplitNohCopy(self):
 
         self.assertEqual(SPLIT_NOH_COPY.numFragments(), 5)
+
+
+class TestInferBonds(TestCase):
+
+    def setUp(self):
+
+        self.water = AtomGroup('water')
+        self.water.setCoords([[0, 0, 0], [0.96, 0, 0], [-0.24, 0.93, 0],
+                              [5, 0, 0]])
+        self.water.setElements(['O', 'H', 'H', 'NA'])
+
+    def testElements(self):
+
+        self.water.inferBonds()
+        self.assertEqual(self.water._bonds.tolist(), [[0, 1], [0, 2]])
+        self.assertEqual(self.water.getFragindices().tolist(), [0, 0, 0, 1])
+
+    def testNoElements(self):
+
+        self.water.setElements(['', '', '', ''])
+        bonds = self.water.inferBonds(set_bonds=False)
+        self.assertEqual(len(bonds), 3)
+        self.assertIsNone(self.water._bonds)
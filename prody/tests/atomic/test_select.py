@@ -546,3 +546,41 @@ def testGetBoolArray():
     ca = pdb3mht.ca
     assert_equal(len(ca), len(SELECT.getBoolArray(ca, 'index 510')))
 
+
+
+class TestSelectionCache(unittest.TestCase):
+
+    """Test that memoized selection results follow changes in atoms."""
+
+    def testDataChanges(self):
+
+        atoms = pdb3mht.copy()
+        selstr = 'resname GLY and (name CA or name N)'
+        n_atoms = len(atoms.select(selstr))
+        gly = atoms.select('resname GLY')
+        gly.setResnames('ALA')
+        self.assertIsNone(atoms.select(selstr))
+        gly.setResnames('GLY')
+        self.assertEqual(len(atoms.select(selstr)), n_atoms)
+        atoms[gly.getIndices()[0]].setName('XX')
+        self.assertEqual(len(atoms.select(selstr)), n_atoms - 1)
+
+    def testFlags(self):
+
+        atoms = pdb3mht.copy()
+        atoms.setFlags('user', atoms.getResnums() < 10)
+        self.assertEqual(len(atoms.select('user and name CA')),
+                         len(atoms.select('resnum < 10 and name CA')))
+        atoms.setFlags('user', atoms.getResnums() < 20)
+        self.assertEqual(len(atoms.select('user and name CA')),
+                         len(atoms.select('resnum < 20 and name CA')))
+
+    def testCoords(self):
+
+        atoms = pdb3mht.copy()
+        selstr = 'not index 0 and within 8 of index 0'
+        self.assertTrue(atoms.select(selstr))
+        coords = atoms.getCoords()
+        coords[0] += 1000
+        atoms.setCoords(coords)
+        self.assertIsNone(atoms.select(selstr))
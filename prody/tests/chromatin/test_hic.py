@@ -0,0 +1,45 @@
+"""This module contains unit tests for :mod:`~prody.chromatin.hic`."""
+
+from io import StringIO
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+from prody import HiC, parseHiCStream, LOGGER
+from prody.tests import unittest
+
+LOGGER.verbosity = 'none'
+
+TRIPLETS = ''.join('{0}\t{1}\t{2}\n'.format(i * 100, j * 100, i + j + 1)
+                   for i in range(6) for j in range(i, min(i + 3, 6))
+                   if 2 not in (i, j))
+
+
+class TestSparseHiC(unittest.TestCase):
+
+    def setUp(self):
+
+        self.sparse = HiC('sparse', *parseHiCStream(StringIO(TRIPLETS)))
+        self.dense = HiC('dense', *parseHiCStream(StringIO(TRIPLETS),
+                                                  dense=True))
+
+    def testParse(self):
+
+        self.assertTrue(self.sparse.isSparse())
+        self.assertFalse(self.dense.isSparse())
+        self.assertEqual(self.sparse.bin, 100)
+        assert_equal(self.sparse.mask, [True, True, False, True, True, True])
+        assert_equal(self.sparse.getCompleteMap().toarray(),
+                     self.dense.getCompleteMap())
+        assert_equal(self.sparse.map.toarray(), self.dense.map)
+
+    def testKirchhoff(self):
+
+        assert_allclose(self.sparse.getKirchhoff().toarray(),
+                        self.dense.getKirchhoff())
+
+    def testNormalize(self):
+
+        self.sparse.normalize()
+        self.dense.normalize()
+        assert_allclose(self.sparse.map.toarray(), self.dense.map)
@@ -0,0 +1,68 @@
+"""This module contains unit tests for :mod:`~prody.chromatin.norm`."""
+
+import numpy as np
+from numpy.testing import assert_allclose
+from scipy.sparse import csr_matrix
+
+from prody import KRnorm, SCN, VCnorm, HiC, LOGGER
+from prody.chromatin.norm import bnewt
+from prody.tests import unittest
+
+LOGGER.verbosity = 'none'
+
+
+def makeMap(n=60, seed=1):
+
+    rng = np.random.RandomState(seed)
+    M = rng.poisson(2, (n, n)) * (1. + rng.rand(n, n))
+    M = np.triu(M) + np.triu(M, 1).T
+    M /= 1. + np.abs(np.subtract.outer(np.arange(n), np.arange(n)))
+    M[[4, 30]] = 0
+    M[:, [4, 30]] = 0
+    return M
+
+
+class TestNormalization(unittest.TestCase):
+
+    def setUp(self):
+
+        self.dense = makeMap()
+        self.sparse = csr_matrix(self.dense)
+
+    def testKRnorm(self):
+
+        N = KRnorm(self.dense, tol=1e-8)
+        assert_allclose(N.sum(1)[self.dense.any(1)], 1., rtol=1e-6)
+        assert_allclose(N[[4, 30]], 0.)
+        assert_allclose(KRnorm(self.sparse, tol=1e-8).toarray(), N)
+        assert_allclose(KRnorm(self.dense, tol=1e-8, largemem=True,
+                               chunk_size=7), N)
+
+    def testSCN(self):
+
+        N = SCN(self.dense)
+        assert_allclose(N, N.T)
+        assert_allclose(SCN(self.sparse).toarray(), N)
+        assert_allclose(SCN(self.dense, largemem=True, chunk_size=7), N)
+
+    def testVCKRnorm(self):
+
+        for M in (self.dense, self.sparse):
+            V = VCnorm(M)
+            N = KRnorm(V, tol=1e-8)
+            N = N.toarray() if hasattr(N, 'toarray') else N
+            assert_allclose(N.sum(1)[self.dense.any(1)], 1., rtol=1e-6)
+            assert_allclose(N, N.T)
+
+        hic = HiC(map=self.dense)
+        hic.normalize(VCnorm)
+        hic.normalize(KRnorm)
+        assert_allclose(hic.map.sum(1), 1., rtol=1e-5)
+
+    def testCheck(self):
+
+        M = self.dense.copy()
+        M[0, 1] += 1.
+        self.assertRaises(ValueError, bnewt, M)
+        self.assertRaises(ValueError, KRnorm, M)
+        self.assertRaises(ValueError, bnewt, csr_matrix(-self.dense))
@@ -0,0 +1,41 @@
+"""This module contains unit tests for :mod:`~prody.chromatin.straw`."""
+
+import struct
+
+import numpy as np
+from numpy.testing import assert_equal
+
+from prody.chromatin.straw import decodeBlock
+from prody.tests import unittest
+
+BINX = [10, 12, 11, 13]
+BINY = [20, 20, 22, 22]
+COUNTS = [3, 1, 7, 2]
+
+
+class TestDecodeBlock(unittest.TestCase):
+
+    def testVersion6(self):
+
+        data = struct.pack('<i', 4) + b''.join(
+            struct.pack('<iif', x, y, c) for x, y, c in zip(BINX, BINY, COUNTS))
+        assert_equal(decodeBlock(data, 6), [BINX, BINY, COUNTS])
+
+    def testRows(self):
+
+        for useShort, fmt in ((0, '<hh'), (1, '<hf')):
+            data = struct.pack('<iiibbh', 4, 10, 20, useShort, 1, 2)
+            data += struct.pack('<hh', 0, 2) + struct.pack(fmt, 0, 3) + \
+                struct.pack(fmt, 2, 1)
+            data += struct.pack('<hh', 2, 2) + struct.pack(fmt, 1, 7) + \
+                struct.pack(fmt, 3, 2)
+            assert_equal(decodeBlock(data, 8), [BINX, BINY, COUNTS])
+
+    def testDense(self):
+
+        for useShort, empty, dtype in ((0, -32768, '<i2'), (1, np.nan, '<f4')):
+            grid = np.full((3, 4), empty, dtype=dtype)
+            grid[np.subtract(BINY, 20), np.subtract(BINX, 10)] = COUNTS
+            data = struct.pack('<iiibbih', 4, 10, 20, useShort, 2, 12, 4)
+            data += grid.tobytes()
+            assert_equal(decodeBlock(data, 8), [BINX, BINY, COUNTS])
@@ -0,0 +1,48 @@
+"""This module contains unit tests for :mod:`~prody.dynamics.adaptive`."""
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from prody import AdaptiveANM, ANM, LOGGER
+from prody.tests import unittest
+from prody.tests.datafiles import parseDatafile
+
+LOGGER.verbosity = 'none'
+
+N_MODES = 10
+
+
+class TestIncrementalANM(unittest.TestCase):
+
+    def setUp(self):
+
+        structA = parseDatafile('1ubi_ca')
+        structB = structA.copy()
+        noise = np.random.RandomState(0).normal(0, 1., (structB.numAtoms(), 3))
+        structB.setCoords(structB.getCoords() + noise)
+        self.adaptive = AdaptiveANM(structA, structB, alignSel='all',
+                                    incremental=True, n_modes=N_MODES)
+        for _ in range(2):
+            self.adaptive.runStep(structA=self.adaptive.structA,
+                                  structB=self.adaptive.structB)
+
+    def testModes(self):
+
+        atoms = self.adaptive.structA
+        anm = self.adaptive._updateANM(atoms, N_MODES)
+
+        full = ANM()
+        full.buildHessian(atoms.getCoords(), cutoff=15., gamma=1.)
+        full.calcModes(N_MODES)
+        assert_allclose(anm.getEigvals(), full.getEigvals(), rtol=1e-6)
+        overlaps = np.abs(np.dot(anm.getEigvecs().T, full.getEigvecs()))
+        assert_allclose(overlaps.diagonal(), 1., atol=1e-6)
+
+    def testStepRecords(self):
+
+        self.assertEqual(len(self.adaptive.stepTimes), 2)
+        self.assertTrue(all(t >= 0 for t in self.adaptive.stepTimes))
+        self.assertEqual(len(self.adaptive.modeTimes), 2)
+        for step_time, mode_time in zip(self.adaptive.stepTimes,
+                                        self.adaptive.modeTimes):
+            self.assertTrue(0 <= mode_time <= step_time)
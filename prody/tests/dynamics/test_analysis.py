@@ -0,0 +1,93 @@
+"""This module contains unit tests for :mod:`prody.dynamics.analysis` module."""
+
+import os
+import tempfile
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from prody import parsePDB, ANM, GNM, LOGGER
+from prody import calcCrossCorr, calcCovariance, calcDistFlucts
+from prody.tests import unittest
+from prody.tests.datafiles import pathDatafile
+
+LOGGER.verbosity = 'none'
+
+ATOMS = parsePDB(pathDatafile('pdb1ubi.pdb'), subset='ca')
+
+ANM_MODEL = ANM()
+ANM_MODEL.buildHessian(ATOMS)
+ANM_MODEL.calcModes(20)
+
+GNM_MODEL = GNM()
+GNM_MODEL.buildKirchhoff(ATOMS)
+GNM_MODEL.calcModes(20)
+
+
+def calcCovarianceDirectly(modes):
+
+    array = modes.getArray()
+    return np.dot(array * modes.getVariances(), array.T)
+
+
+def calcCrossCorrDirectly(modes, norm=True):
+
+    cov = calcCovarianceDirectly(modes)
+    if modes.is3d():
+        n_atoms = modes.numAtoms()
+        cov = cov.reshape((n_atoms, 3, n_atoms, 3)).trace(axis1=1, axis2=3)
+    if norm:
+        diag = np.sqrt(cov.diagonal())
+        cov = cov / np.outer(diag, diag)
+    return cov
+
+
+class TestCrossCorr(unittest.TestCase):
+
+    def testCrossCorr(self):
+
+        for model in (ANM_MODEL, GNM_MODEL, ANM_MODEL[:5]):
+            for norm in (True, False):
+                assert_allclose(calcCrossCorr(model, norm=norm),
+                                calcCrossCorrDirectly(model, norm),
+                                atol=1e-12,
+                                err_msg='failed to calculate cross-'
+                                        'correlations for {0}'.format(model))
+
+    def testCrossCorrBlocks(self):
+
+        expected = calcCrossCorr(ANM_MODEL)
+        result = calcCrossCorr(ANM_MODEL, n_cpu=2, max_memory=0.01)
+        assert_allclose(result, expected, atol=1e-12,
+                        err_msg='blocked cross-correlations do not match')
+
+    def testCrossCorrMemmap(self):
+
+        n_atoms = ANM_MODEL.numAtoms()
+        handle, filename = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            out = np.memmap(filename, dtype=float, mode='w+',
+                            shape=(n_atoms, n_atoms))
+            calcCrossCorr(ANM_MODEL, out=out, max_memory=0.01)
+            assert_allclose(out, calcCrossCorrDirectly(ANM_MODEL), atol=1e-12,
+                            err_msg='cross-correlations written to memmap do '
+                                    'not match')
+            del out
+        finally:
+            os.remove(filename)
+
+    def testDistFlucts(self):
+
+        cc = calcCrossCorrDirectly(GNM_MODEL, norm=False)
+        diag = cc.diagonal()
+        assert_allclose(calcDistFlucts(GNM_MODEL, norm=False, max_memory=0.01),
+                        diag[:, np.newaxis] + diag - 2 * cc, atol=1e-12,
+                        err_msg='failed to calculate distance fluctuations')
+
+    def testCovariance(self):
+
+        modes = ANM_MODEL[:5]
+        assert_allclose(calcCovariance(modes, n_cpu=2, max_memory=0.01),
+                        calcCovarianceDirectly(modes), atol=1e-12,
+                        err_msg='failed to calculate covariance')
@@ -359,7 +359,82 @@ class TestANM(TestGNM):
                         err_msg='slow method does not reproduce same Hessian')
         assert_equal(slow._getKirchhoff(), anm._getKirchhoff(),
                      'slow method does not reproduce same Kirchhoff')
-    
+
+    def testBuildHessianKDTree(self):
+        fast = ANM()
+        fast.buildHessian(ATOMS, kdtree=True)
+        assert_allclose(fast._getHessian(), anm._getHessian(),
+                        rtol=0, atol=ATOL,
+                        err_msg='KDTree method does not reproduce same Hessian')
+
+    def testBuildHessianSparse(self):
+        sparse = ANM()
+        sparse.buildHessian(ATOMS, sparse=True)
+        assert_allclose(sparse._getHessian().toarray(), ANM_HESSIAN,
+                        rtol=0, atol=ATOL,
+                        err_msg='failed to get correct sparse Hessian matrix')
+        assert_allclose(sparse._getKirchhoff().toarray(), anm._getKirchhoff(),
+                        rtol=0, atol=ATOL,
+                        err_msg='failed to get correct sparse Kirchhoff matrix')
+
+    def testCalcModesSparseSolvers(self):
+        sparse = ANM()
+        sparse.buildHessian(ATOMS, sparse=True)
+        for solver in ('arpack-shift-invert', 'lobpcg'):
+            sparse.calcModes(20, solver=solver)
+            assert_allclose(sparse.getEigvals(), ANM_EVALUES[6:26],
+                            rtol=RTOL, atol=ATOL*10,
+                            err_msg='failed to get correct eigenvalues '
+                                    'using ' + solver)
+            _temp = np.abs(np.dot(sparse.getEigvecs().T, ANM_EVECTORS))
+            assert_allclose(_temp, np.eye(20), rtol=RTOL, atol=ATOL,
+                            err_msg='failed to get correct eigenvectors '
+                                    'using ' + solver)
+
+    def testBuildHessianGammaFunction(self):
+        func = ANM()
+        func.buildHessian(ATOMS, gamma=lambda dist2, i, j: 2.)
+        assert_allclose(func._getHessian(), 2 * anm._getHessian(),
+                        rtol=0, atol=ATOL,
+                        err_msg='failed to use gamma function in Hessian')
+
+
+class TestGamma(unittest.TestCase):
+
+    def setUp(self):
+
+        self.atoms = parsePDB(pathDatafile('pdb1ubi.pdb'), subset='ca',
+                              secondary=True)
+        kdtree = KDTree(self.atoms.getCoords())
+        kdtree.search(15.)
+        self.i, self.j = kdtree.getIndices().T
+        self.dist2 = kdtree.getDistances() ** 2
+
+    def _testGammaBatch(self, gamma):
+
+        expected = [gamma.gamma(dist2, i, j)
+                    for dist2, i, j in zip(self.dist2, self.i, self.j)]
+        assert_equal(gamma.gamma_batch(self.dist2, self.i, self.j), expected,
+                     'gamma_batch does not reproduce gamma')
+
+    def testGammaStructureBased(self):
+
+        self._testGammaBatch(GammaStructureBased(self.atoms, helix=5.,
+                                                 sheet=7.))
+
+    def testGammaVariableCutoff(self):
+
+        self._testGammaBatch(GammaVariableCutoff(self.atoms.getResnames(),
+                                                 default_radius=5., LYS=6.))
+
+    def testBuildKirchhoffSparse(self):
+
+        sparse = GNM()
+        sparse.buildKirchhoff(ATOMS, sparse=True)
+        assert_allclose(sparse._getKirchhoff().toarray(), GNM_KIRCHHOFF,
+                        rtol=0, atol=ATOL,
+                        err_msg='failed to get correct sparse Kirchhoff')
+
 
 class TestGNMCalcModes(unittest.TestCase):
 
@@ -117,5 +117,50 @@ class TestPCAResults(TestPCA):
         cov = pca.getCovariance()
         assert_equal(cov, cov.T, 'Covariance is not symmetric')
 
+
+class TestPCAChunks(unittest.TestCase):
+
+    def testChunks(self):
+
+        coordsets = COORDSETS.astype(np.float32)
+        expected = np.cov(coordsets.reshape((len(coordsets), -1)).T, bias=1)
+        for chunk_size in (1, 7, len(coordsets)):
+            model = PCA()
+            model.buildCovariance(coordsets, chunk_size=chunk_size)
+            assert_allclose(model.getCovariance(), expected, rtol=0,
+                            atol=1e-10, err_msg='failed to accumulate '
+                            'covariance in chunks of {0}'.format(chunk_size))
+
+    def testTrajectory(self):
+
+        dcd = DCDFile(pathDatafile('dcd'))
+        ensemble = Ensemble(dcd)
+        ensemble.addCoordset(dcd.getCoordsets().astype(float))
+        ensemble.setCoords(ensemble.getCoordsets(0))
+        ensemble.superpose()
+        coordsets = ensemble.getCoordsets()
+        expected = np.cov(coordsets.reshape((len(coordsets), -1)).T, bias=1)
+        model = PCA()
+        model.buildCovariance(dcd, chunk_size=2)
+        assert_allclose(model.getCovariance(), expected, rtol=0, atol=1e-10,
+                        err_msg='failed to build covariance for trajectory')
+        assert_equal(dcd.nextIndex(), 0,
+                     'trajectory is not rewound to the initial frame')
+
+    def testSketch(self):
+
+        model = PCA()
+        model.buildCovariance(COORDSETS, sketch=100)
+        assert_equal(model.getCovariance(), None)
+        model.calcModes(5)
+        assert_allclose(model.getEigvals(), pca.getEigvals()[:5],
+                        rtol=1e-2, err_msg='failed to approximate '
+                                           'eigenvalues from sketch')
+        overlaps = np.abs((model.getEigvecs() *
+                           pca.getEigvecs()[:, :5]).sum(0))
+        assert_allclose(overlaps, 1, atol=1e-3,
+                        err_msg='failed to approximate eigenvectors from '
+                                'sketch')
+
 if __name__ == '__main__':
     unittest.main()
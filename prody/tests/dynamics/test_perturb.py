@@ -0,0 +1,69 @@
+"""This module contains unit tests for :mod:`prody.dynamics.perturb` module."""
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from prody import parsePDB, ANM, GNM, LOGGER, calcPerturbResponse
+from prody.dynamics.perturb import calcDynamicFlexibilityIndex
+from prody.tests import unittest
+from prody.tests.datafiles import pathDatafile
+
+LOGGER.verbosity = 'none'
+
+ATOMS = parsePDB(pathDatafile('pdb1ubi.pdb'), subset='ca')
+
+
+def calcPerturbResponseDirectly(model):
+
+    cov = np.dot(model.getArray() * model.getVariances(), model.getArray().T)
+    n_atoms = model.numAtoms()
+    prs_matrix = cov ** 2
+    if model.is3d():
+        prs_matrix = prs_matrix.reshape((n_atoms, 3, n_atoms, 3)).sum(3).sum(1)
+    prs_matrix = prs_matrix / prs_matrix.diagonal()[:, np.newaxis]
+    W = 1 - np.eye(n_atoms)
+    return (prs_matrix, np.average(prs_matrix, weights=W, axis=1),
+            np.average(prs_matrix, weights=W, axis=0))
+
+
+class TestPerturbResponse(unittest.TestCase):
+
+    def setUp(self):
+
+        self.anm = ANM()
+        self.anm.buildHessian(ATOMS)
+        self.anm.calcModes(20)
+        self.gnm = GNM()
+        self.gnm.buildKirchhoff(ATOMS)
+        self.gnm.calcModes(20)
+
+    def testPerturbResponse(self):
+
+        for model in (self.anm, self.gnm, self.anm[:5]):
+            expected = calcPerturbResponseDirectly(model)
+            result = calcPerturbResponse(model, max_memory=0.01)
+            for name, res, exp in zip(('matrix', 'effectiveness',
+                                       'sensitivity'), result, expected):
+                assert_allclose(res, exp, atol=1e-12,
+                                err_msg='failed to calculate PRS {0} for {1}'
+                                        .format(name, model))
+
+    def testPerturbResponseCovariance(self):
+
+        expected = calcPerturbResponse(self.anm)[0]
+        self.anm.getCovariance()
+        assert_allclose(calcPerturbResponse(self.anm, max_memory=0.01)[0],
+                        expected, atol=1e-12,
+                        err_msg='PRS from covariance does not match PRS '
+                                'from modes')
+
+    def testDynamicFlexibilityIndex(self):
+
+        select = 'resnum 10 to 20'
+        prs_matrix = calcPerturbResponse(self.anm)[0]
+        assert_allclose(calcDynamicFlexibilityIndex(self.anm, ATOMS, select,
+                                                    max_memory=0.01),
+                        calcDynamicFlexibilityIndex(prs_matrix, ATOMS, select),
+                        atol=1e-12,
+                        err_msg='dfi from model does not match dfi from '
+                                'PRS matrix')
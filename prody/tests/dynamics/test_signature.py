@@ -1,9 +1,15 @@
 """This module contains unit tests for :mod:`~prody.KDTree` module."""
 
-from numpy.testing import assert_array_equal, assert_equal
+import os
+import shutil
+import tempfile
+
+from numpy import abs, asarray
+from numpy.testing import assert_array_equal, assert_equal, assert_allclose
 from numpy.random import rand, randint
 
-from prody.dynamics import sdarray
+from prody.dynamics import sdarray, calcEnsembleENMs
+from prody.ensemble import PDBEnsemble
 
 from prody.tests import unittest
 from prody.tests.datafiles import parseDatafile
@@ -43,3 +49,50 @@ class TestSDArray(unittest.TestCase):
 
         s = S[0, 0, 0]
         #assert_array_equal(s, A[0, 0, 0], 'failed at sdarray slicing')
+
+
+class TestCalcEnsembleENMs(unittest.TestCase):
+
+    def setUp(self):
+
+        atoms = parseDatafile('multi_model_truncated', subset='ca')
+        self.ensemble = PDBEnsemble()
+        self.ensemble.setAtoms(atoms)
+        self.ensemble.setCoords(atoms.getCoords())
+        self.ensemble.addCoordset(atoms.getCoordsets())
+        self.cache = tempfile.mkdtemp()
+
+    def tearDown(self):
+
+        shutil.rmtree(self.cache)
+
+    def _compare(self, result, expected, err_msg):
+
+        assert_allclose(asarray(result.getEigvals()),
+                        asarray(expected.getEigvals()),
+                        rtol=1e-6, err_msg=err_msg + ' (eigenvalues)')
+        assert_allclose(abs(asarray(result.getEigvecs())),
+                        abs(asarray(expected.getEigvecs())),
+                        atol=1e-6, err_msg=err_msg + ' (eigenvectors)')
+
+    def testParallel(self):
+
+        for model in ('gnm', 'anm'):
+            serial = calcEnsembleENMs(self.ensemble, model=model, match=False)
+            parallel = calcEnsembleENMs(self.ensemble, model=model,
+                                        match=False, n_jobs=2)
+            self._compare(parallel, serial,
+                          'parallel {0} modes do not match'.format(model))
+
+    def testCache(self):
+
+        for model in ('gnm', 'anm'):
+            modes = calcEnsembleENMs(self.ensemble, model=model, match=False,
+                                     cache=self.cache)
+            cached = calcEnsembleENMs(self.ensemble, model=model, match=False,
+                                      cache=self.cache)
+            self._compare(cached, modes,
+                          'cached {0} modes do not match'.format(model))
+
+        assert_equal(len(os.listdir(self.cache)), 6,
+                     'one cache file per conformation and model is expected')
@@ -0,0 +1,58 @@
+"""This module contains unit tests for :mod:`~prody.ensemble.ensfile`."""
+
+import os
+import shutil
+
+from numpy.testing import assert_equal
+
+from prody import EnsembleFile, saveEnsemble, loadEnsemble
+from prody.tests import TestCase, TEMPDIR
+
+from . import ENSEMBLE, PDBENSEMBLE, PDBENSEMBLEA
+
+
+class TestEnsembleFile(TestCase):
+
+    def setUp(self):
+
+        self.filename = os.path.join(TEMPDIR, 'test_ensfile.ens')
+
+    def tearDown(self):
+
+        shutil.rmtree(self.filename, ignore_errors=True)
+
+    def testSaveLoad(self):
+
+        for ensemble in (ENSEMBLE, PDBENSEMBLEA):
+            for compress in (False, True):
+                filename = saveEnsemble(ensemble, self.filename[:-4],
+                                        chunk_size=2, compress=compress)
+                self.assertEqual(filename, self.filename)
+                loaded = loadEnsemble(filename)
+                self.assertIs(type(loaded), type(ensemble))
+                assert_equal(loaded.getCoordsets(), ensemble.getCoordsets())
+                assert_equal(loaded.getWeights(), ensemble.getWeights())
+        self.assertEqual(loaded.getLabels(), PDBENSEMBLEA.getLabels())
+        assert_equal(loaded.getMSA().getArray(),
+                     PDBENSEMBLEA.getMSA().getArray())
+
+    def testAppendGather(self):
+
+        ensfile = EnsembleFile(self.filename, 'w', chunk_size=2)
+        ensfile.write(PDBENSEMBLE)
+        ensfile.close()
+        ensfile = EnsembleFile(self.filename, 'a')
+        ensfile.write(PDBENSEMBLE)
+        ensfile.close()
+
+        ensfile = EnsembleFile(self.filename)
+        n_confs = PDBENSEMBLE.numConfs()
+        self.assertEqual(len(ensfile), 2 * n_confs)
+        indices = [n_confs, 1, 0]
+        confs = PDBENSEMBLE._confs
+        assert_equal(ensfile.getCoordsets(indices), confs[[0, 1, 0]])
+        labels = PDBENSEMBLE.getLabels()
+        self.assertEqual(ensfile.getLabels(indices),
+                         [labels[0], labels[1], labels[0]])
+        subset = ensfile.getEnsemble(slice(n_confs, None))
+        assert_equal(subset.getWeights(), PDBENSEMBLE.getWeights())
@@ -1,7 +1,7 @@
 """This module contains unit tests for :mod:`~prody.KDTree` module."""
 
 from numpy import tile, array, arange, ones
-from numpy.testing import assert_allclose
+from numpy.testing import assert_allclose, assert_equal
 
 from prody.tests import unittest
 from prody.kdtree import KDTree
@@ -40,6 +40,19 @@ class TestKDTree(unittest.TestCase):
                             rtol=RTOL, atol=ATOL,
                             err_msg='KDTree all search failed')
 
+    def testSearchCenters(self):
+
+        kdtree = self.kdtree
+        centers = self.coords[[0, 5, 9]] + 0.5
+        offsets, indices, radii = kdtree.searchCenters(1, centers)
+        assert_equal(offsets, [0, 2, 4, 5])
+        for i, center in enumerate(centers):
+            kdtree.search(1, center)
+            assert_equal(indices[offsets[i]:offsets[i+1]],
+                         kdtree.getIndices())
+            assert_allclose(radii[offsets[i]:offsets[i+1]],
+                            kdtree.getDistances(), rtol=RTOL, atol=ATOL)
+
 
 COORDS = array([[-1., -1., 0.],
                 [-1.,  5., 0.],
@@ -73,3 +86,11 @@ class TestKDTreePBC(unittest.TestCase):
         KDTREE_PBC.search(2)
         self.assertEqual(8, KDTREE_PBC.getCount())
 
+    def testCentersPBC(self):
+
+        centers = array([[2., 2., 0.], [0., 0., 0.]])
+        offsets, indices, radii = KDTREE_PBC.searchCenters(2, centers)
+        assert_equal(offsets, [0, 5, 9])
+        KDTREE_PBC.search(2, centers[0])
+        assert_equal(indices[:5], sorted(KDTREE_PBC.getIndices()))
+
@@ -1,13 +1,19 @@
 """This module contains unit tests for :mod:`prody.measure.transform` module.
 """
 
-from numpy import zeros, ones, eye, all
-from numpy.testing import assert_equal
+from numpy import zeros, ones, eye, all, array, dot, sqrt, triu_indices
+from numpy import arange
+from numpy.linalg import svd, det
+from numpy.random import RandomState
+from numpy.testing import assert_equal, assert_allclose
 
 from prody.tests import unittest
 from prody.tests.datafiles import parseDatafile
 
-from prody.measure import moveAtoms, wrapAtoms
+from prody.atomic import AtomMap
+from prody.measure import moveAtoms, wrapAtoms, alignCoordsets
+from prody.measure import getTransformation, getTransformations
+from prody.measure import calcPairwiseRMSDMatrix
 
 UBI = parseDatafile('1ubi')
 
@@ -52,3 +58,159 @@ class TestWrapAtoms(unittest.TestCase):
         diff = xyz - UBI.getCoords()
         self.assertTrue(all(diff == unitcell))
 
+
+class TestTransformations(unittest.TestCase):
+
+    def setUp(self):
+
+        random = RandomState(0)
+        self.tar = UBI.getCoords()
+        self.mobs = []
+        for _ in range(5):
+            u, _, vh = svd(random.normal(size=(3, 3)))
+            mob = self.tar + random.normal(size=self.tar.shape)
+            self.mobs.append(dot(mob, dot(u, vh).T) + random.normal(size=3))
+        self.mobs = array(self.mobs)
+        self.weights = random.rand(5, len(self.tar), 1)
+
+    def testBatched(self):
+
+        rotations, translations = getTransformations(self.mobs, self.tar)
+        for i, mob in enumerate(self.mobs):
+            rotation, translation = getTransformation(mob, self.tar)
+            assert_allclose(rotations[i], rotation, atol=1e-10,
+                            err_msg='batched rotation does not match')
+            assert_allclose(translations[i], translation, atol=1e-10,
+                            err_msg='batched translation does not match')
+
+    def testBatchedWeighted(self):
+
+        rotations, translations = getTransformations(self.mobs, self.tar,
+                                                     self.weights)
+        for i, mob in enumerate(self.mobs):
+            rotation, translation = getTransformation(mob, self.tar,
+                                                      self.weights[i])
+            assert_allclose(rotations[i], rotation, atol=1e-10,
+                            err_msg='batched weighted rotation does not match')
+            assert_allclose(translations[i], translation, atol=1e-10,
+                            err_msg='batched weighted translation does not '
+                                    'match')
+
+    def testAlignCoordsets(self):
+
+        atoms = UBI.copy()
+        for mob in self.mobs:
+            atoms.addCoordset(mob)
+        ca = atoms.ca
+        tar = ca.getCoords()
+        alignCoordsets(ca)
+        assert_equal(atoms.getCoordsets(0), self.tar,
+                     err_msg='reference coordinate set is changed')
+        for i, mob in enumerate(self.mobs):
+            rotation, translation = getTransformation(mob[ca.getIndices()],
+                                                      tar)
+            assert_allclose(atoms.getCoordsets(i + 1),
+                            dot(mob, rotation.T) + translation, atol=1e-10,
+                            err_msg='failed to align coordinate sets')
+
+    def testAlignCoordsetsWeighted(self):
+
+        indices = UBI.ca.getIndices()
+        for which in (indices, indices[::-1][:-5]):
+            atoms = UBI.copy()
+            for mob in self.mobs:
+                atoms.addCoordset(mob)
+            if len(which) == len(indices):
+                selection = atoms.ca
+            else:
+                selection = AtomMap(atoms, which, dummies=arange(5),
+                                    mapping=arange(5, len(indices)))
+            weights = selection.getMasses()
+            tar = self.tar[which]
+            alignCoordsets(selection, weights=weights)
+            weights = weights.reshape((-1, 1))
+            if len(which) != len(indices):
+                weights = weights[5:]
+            for i, mob in enumerate(self.mobs):
+                rotation, translation = getTransformation(mob[which], tar,
+                                                          weights)
+                assert_allclose(atoms.getCoordsets(i + 1),
+                                dot(mob, rotation.T) + translation,
+                                atol=1e-10, err_msg='failed to align '
+                                'coordinate sets using weights')
+
+
+class TestPairwiseRMSDMatrix(unittest.TestCase):
+
+    def setUp(self):
+
+        random = RandomState(1)
+        ca = UBI.ca.getCoords()
+        self.coordsets = []
+        for _ in range(7):
+            u, _, vh = svd(random.normal(size=(3, 3)))
+            xyz = ca + random.normal(size=ca.shape)
+            self.coordsets.append(dot(xyz, dot(u, vh).T) +
+                                  random.normal(size=3))
+        self.coordsets = array(self.coordsets)
+        self.weights = random.rand(7, len(ca))
+
+    def calcRMSDs(self, superpose):
+
+        n_confs = len(self.coordsets)
+        rmsds = zeros((n_confs, n_confs))
+        for i in range(n_confs):
+            for j in range(n_confs):
+                xyz = self.coordsets[j]
+                if superpose:
+                    rotation, translation = getTransformation(
+                        xyz, self.coordsets[i])
+                    xyz = dot(xyz, rotation.T) + translation
+                diff = self.coordsets[i] - xyz
+                rmsds[i, j] = sqrt((diff ** 2).sum(1).mean())
+        return rmsds
+
+    def testSuperposed(self):
+
+        assert_allclose(calcPairwiseRMSDMatrix(self.coordsets),
+                        self.calcRMSDs(True), atol=1e-10,
+                        err_msg='failed to calculate pairwise RMSDs')
+
+    def testNotSuperposed(self):
+
+        assert_allclose(calcPairwiseRMSDMatrix(self.coordsets,
+                                               superpose=False),
+                        self.calcRMSDs(False), atol=1e-10,
+                        err_msg='failed to calculate pairwise RMSDs without '
+                                'superposition')
+
+    def testTiles(self):
+
+        expected = calcPairwiseRMSDMatrix(self.coordsets, self.weights)
+        result = calcPairwiseRMSDMatrix(self.coordsets, self.weights,
+                                        max_memory=0.001, n_cpu=2)
+        assert_allclose(result, expected, atol=1e-10,
+                        err_msg='tiled pairwise RMSDs do not match')
+        result = calcPairwiseRMSDMatrix(self.coordsets, self.weights,
+                                        max_memory=0.001, format='arr')
+        assert_allclose(result, expected[triu_indices(7, 1)], atol=1e-10,
+                        err_msg='condensed pairwise RMSDs do not match')
+
+    def testWeighted(self):
+
+        result = calcPairwiseRMSDMatrix(self.coordsets, self.weights)
+        for i in range(len(self.coordsets)):
+            for j in range(i + 1, len(self.coordsets)):
+                weights = self.weights[i] * self.weights[j]
+                xyz = []
+                for k in (i, j):
+                    center = dot(weights, self.coordsets[k]) / weights.sum()
+                    xyz.append(self.coordsets[k] - center)
+                u, s, vh = svd(dot(xyz[1].T * weights, xyz[0]))
+                if det(dot(u, vh)) < 0:
+                    s[-1] *= -1
+                msd = (dot(weights, (xyz[0] ** 2).sum(1) +
+                           (xyz[1] ** 2).sum(1)) - 2 * s.sum()) / weights.sum()
+                self.assertAlmostEqual(result[i, j], sqrt(msd), places=10,
+                                       msg='weighted pairwise RMSD does not '
+                                           'match')
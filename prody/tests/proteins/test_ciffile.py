@@ -0,0 +1,82 @@
+"""This module contains unit tests for :mod:`~prody.proteins.ciffile`."""
+
+from io import StringIO
+
+from numpy.testing import assert_equal
+
+from prody import parseMMCIFStream, LOGGER
+from prody.tests import unittest
+
+LOGGER.verbosity = 'none'
+
+FIELDS = ('group_PDB', 'id', 'type_symbol', 'label_atom_id', 'label_alt_id',
+          'label_comp_id', 'label_asym_id', 'label_seq_id',
+          'pdbx_PDB_ins_code', 'Cartn_x', 'Cartn_y', 'Cartn_z', 'occupancy',
+          'B_iso_or_equiv', 'auth_seq_id', 'auth_comp_id', 'auth_asym_id',
+          'auth_atom_id', 'pdbx_PDB_model_num')
+
+ATOMS = [
+    ('ATOM', 'N', 'N', '.', 'ALA', 'A', 1, 'N'),
+    ('ATOM', 'C', 'CA', 'A', 'ALA', 'A', 1, 'CA'),
+    ('ATOM', 'C', 'CA', 'B', 'ALA', 'A', 1, 'CA'),
+    ('ATOM', 'C', '"C5\'"', '.', 'DG', 'B', 2, '"C5\'"'),
+    ('HETATM', 'O', 'O', '.', 'HOH', 'C', 3, 'O'),
+]
+
+
+def makeCIF(n_models=2):
+
+    lines = ['data_TEST\n', '#\n', '_entry.id TEST\n', '#\n', 'loop_\n']
+    lines.extend('_atom_site.{0}\n'.format(field) for field in FIELDS)
+    serial = 1
+    for model in range(1, n_models + 1):
+        for i, (group, element, name, alt, resname, chain, resnum,
+                auth) in enumerate(ATOMS):
+            lines.append('{0} {1} {2} {3} {4} {5} {6} {7} ? {8:.3f} 0.000 '
+                         '0.000 1.00 {9:.2f} {7} {5} {6} {10} {11}\n'
+                         .format(group, serial, element, name, alt, resname,
+                                 chain, resnum, i + model / 10., i, auth,
+                                 model))
+            serial += 1
+    lines.append('#\n')
+    return ''.join(lines)
+
+
+class TestParseMMCIFStream(unittest.TestCase):
+
+    def testModels(self):
+
+        ag = parseMMCIFStream(StringIO(makeCIF()))
+        self.assertEqual(ag.numAtoms(), 4)
+        self.assertEqual(ag.numCoordsets(), 2)
+        assert_equal(ag.getCoordsets()[:, :, 0],
+                     [[0.1, 1.1, 3.1, 4.1], [0.2, 1.2, 3.2, 4.2]])
+        assert_equal(ag.getNames(), ['N', 'CA', "C5'", 'O'])
+        assert_equal(ag.getChids(), ['A', 'A', 'B', 'C'])
+        assert_equal(ag.getFlags('hetatm'), [False, False, False, True])
+        assert_equal(ag.getFlags('pdbter'), [False, True, True, True])
+
+    def testModelArgument(self):
+
+        ag = parseMMCIFStream(StringIO(makeCIF(3)), model=2)
+        self.assertEqual(ag.numCoordsets(), 1)
+        assert_equal(ag.getCoords()[:, 0], [0.2, 1.2, 3.2, 4.2])
+        assert_equal(ag.getSerials(), [6, 7, 9, 10])
+
+        text = makeCIF(3) + '_struct.title TEST\n#\n'
+        ag, header = parseMMCIFStream(StringIO(text), model=1, header=True)
+        self.assertEqual(ag.numCoordsets(), 1)
+        assert_equal(ag.getCoords()[:, 0], [0.1, 1.1, 3.1, 4.1])
+        assert_equal(ag.getSerials(), [1, 2, 4, 5])
+        self.assertEqual(header.getDict()['TEST']['data']['_struct.title'],
+                         'TEST')
+
+    def testFilters(self):
+
+        ag = parseMMCIFStream(StringIO(makeCIF()), chain='A', altloc='B')
+        assert_equal(ag.getNames(), ['N', 'CA'])
+        assert_equal(ag.getAltlocs(), ['.', 'B'])
+        assert_equal(ag.getCoordsets()[:, :, 0], [[0.1, 2.1], [0.2, 2.2]])
+
+        ag = parseMMCIFStream(StringIO(makeCIF()), subset='ca')
+        assert_equal(ag.getResnames(), ['ALA'])
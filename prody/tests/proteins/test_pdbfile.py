@@ -1,6 +1,7 @@
 """This module contains unit tests for :mod:`~prody.proteins`."""
 
 import os
+from io import StringIO
 
 import numpy as np
 from numpy.testing import *
@@ -193,6 +194,24 @@ class TestWritePDB(unittest.TestCase):
             assert_equal(out.getCoords(), self.ag.getCoordsets(i),
                  'failed to write model {0} coordinates correctly'.format(i+1))
 
+    @dec.slow
+    def testCoordinateColumns(self):
+        """Test formatting of coordinates, including ones that overflow."""
+
+        coords = self.ag.getCoordsets()
+        coords[0, 0] = [-0.0004, 12.3455, 9999.9994]
+        coords[1, 0] = [12345.678, -1000.5, 0.0005]
+        ag = self.ag.copy()
+        ag.setCoords(coords)
+        stream = StringIO()
+        writePDBStream(stream, ag)
+        lines = [line for line in stream.getvalue().split('\n')
+                 if line.startswith(('ATOM', 'HETATM'))]
+        expected = ['%8.3f%8.3f%8.3f' % tuple(xyz)
+                    for xyz in coords.reshape((-1, 3))]
+        self.assertEqual([line[30:30 + len(xyz)]
+                          for line, xyz in zip(lines, expected)], expected)
+
     @dec.slow
     def tearDown(self):
         """Remove test file."""
@@ -251,3 +270,42 @@ class TestParsePDBAltloc(unittest.TestCase):
 
         self.assertEqual(len(parsePDB(self.pdbfile, altloc='C')), 496,
             'failed to parse alternate locations C correctly')
+
+
+class TestParsePDBColumns(unittest.TestCase):
+
+    def parseLines(self, path, **kwargs):
+        """Returns atomgroup parsed line by line by :func:`_parsePDBLines`."""
+
+        columns = proteins.pdbfile._parsePDBColumns
+        proteins.pdbfile._parsePDBColumns = lambda *args: None
+        try:
+            return parsePDB(path, **kwargs)
+        finally:
+            proteins.pdbfile._parsePDBColumns = columns
+
+    def assertSameAtoms(self, path, **kwargs):
+
+        result = parsePDB(path, **kwargs)
+        expected = self.parseLines(path, **kwargs)
+        self.assertEqual(result.numCoordsets(), expected.numCoordsets())
+        assert_equal(result._getCoordsets(), expected._getCoordsets(),
+                     'column-wise parsing failed to parse coordinates')
+        for label in expected.getDataLabels():
+            assert_equal(result.getData(label), expected.getData(label),
+                         'column-wise parsing failed to parse ' + label)
+        assert_equal(result.getFlags('pdbter'), expected.getFlags('pdbter'))
+
+    def testMultiModel(self):
+
+        path = pathDatafile(DATA_FILES['multi_model_truncated']['file'])
+        self.assertSameAtoms(path)
+        self.assertSameAtoms(path, model=2)
+        self.assertSameAtoms(path, subset='ca')
+
+    def testAltlocAnisou(self):
+
+        path = pathDatafile('pdb1ejg.pdb')
+        self.assertSameAtoms(path)
+        self.assertSameAtoms(path, altloc=True)
+        self.assertSameAtoms(path, altloc='B', chain='A')
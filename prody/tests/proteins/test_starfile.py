@@ -0,0 +1,107 @@
+"""This module contains unit tests for :mod:`~prody.proteins.starfile`."""
+
+import os
+
+from numpy.testing import assert_equal
+
+from prody import parseSTAR, writeSTAR, LOGGER
+from prody.tests import TEMPDIR, unittest
+
+LOGGER.verbosity = 'none'
+
+STAR = """
+data_optics
+
+loop_
+_rlnOpticsGroup #1
+_rlnVoltage #2
+1 300.0
+
+data_particles
+
+loop_
+_rlnImageName #1
+_rlnAnglePsi #2
+_rlnClassNumber #3
+000001@particles.mrcs -10.5 1
+000002@particles.mrcs 20.25 2
+000003@particles.mrcs 30.0 1
+
+data_notes
+_title 'two words'
+
+loop_
+_id
+_note
+1
+;
+text over
+two lines
+;
+
+data_split
+
+loop_
+_a
+_b
+1
+2
+3 4
+"""
+
+
+class TestParseSTAR(unittest.TestCase):
+
+    def setUp(self):
+
+        self.filename = os.path.join(TEMPDIR, 'test_starfile.star')
+        self.output = os.path.join(TEMPDIR, 'test_starfile_out.star')
+        with open(self.filename, 'w') as out:
+            out.write(STAR)
+
+    def tearDown(self):
+
+        for filename in (self.filename, self.output):
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    def testColumns(self):
+
+        loop = parseSTAR(self.filename, shlex=True)[1][0]
+        self.assertEqual(loop.numRows, 3)
+        self.assertEqual(loop.fields, ['_rlnImageName', '_rlnAnglePsi',
+                                       '_rlnClassNumber'])
+        psi = loop.getData('_rlnAnglePsi')
+        assert_equal(psi, [-10.5, 20.25, 30.0])
+        self.assertIs(loop.getData('_rlnAnglePsi'), psi)
+        assert_equal(loop.getData('_rlnClassNumber'), [1, 2, 1])
+        self.assertEqual(loop.getData('_rlnClassNumber').dtype.kind, 'i')
+        assert_equal(loop.getData('_rlnImageName')[1],
+                     '000002@particles.mrcs')
+
+    def testSplitRows(self):
+
+        loop = parseSTAR(self.filename, shlex=True)[3][0]
+        self.assertEqual(loop.numRows, 2)
+        assert_equal(loop.getData('_b'), [2, 4])
+        self.assertEqual(loop.numRows, 2)
+        self.assertEqual(loop[1], {'_a': '3', '_b': '4'})
+
+    def testRows(self):
+
+        star = parseSTAR(self.filename, shlex=True)
+        self.assertEqual(star[1][0][2], {'_rlnImageName':
+                                         '000003@particles.mrcs',
+                                         '_rlnAnglePsi': '30.0',
+                                         '_rlnClassNumber': '1'})
+        self.assertEqual(star[2].getLoop(0).data,
+                         [{'_id': '1', '_note': '; text over two lines ;'}])
+
+    def testWriteSTAR(self):
+
+        star = parseSTAR(self.filename, shlex=True)
+        writeSTAR(self.output, star)
+        again = parseSTAR(self.output, shlex=True)
+        for block in ('optics', 'particles'):
+            self.assertEqual(again[block][0].data, star[block][0].data)
+        self.assertEqual(again['notes'].data, ['two words'])
@@ -314,6 +314,18 @@ class TestIdentity(TestCase):
         assert_array_almost_equal(FASTA_EYE,
                                   buildSeqidMatrix(FASTA, turbo=False))
 
+    def testIdentityMatrixTiles(self):
+
+        assert_array_almost_equal(FASTA_EYE,
+                                  buildSeqidMatrix(FASTA, tile_size=7, n_cpu=2))
+
+    def testIdentityNeighbors(self):
+
+        expect = FASTA_EYE * (FASTA_EYE >= 0.5)
+        expect[range(FASTA_NUMBER), range(FASTA_NUMBER)] = 0
+        result = buildSeqidMatrix(FASTA, seqid=0.5, tile_size=7)
+        assert_array_almost_equal(expect, result.toarray())
+
 
 class TestUnique(TestCase):
 
@@ -342,6 +354,11 @@ class TestUnique(TestCase):
                     unique[j] = False
 
         assert_array_equal(unique, uniqueSequences(FASTA, seqid))
+        assert_array_equal(unique, uniqueSequences(FASTA, seqid, tile_size=7,
+                                                   n_cpu=2))
+        neighbors = buildSeqidMatrix(FASTA, seqid=0.4)
+        assert_array_equal(unique, uniqueSequences(FASTA, seqid,
+                                                   neighbors=neighbors))
 
 
 class TestCalcOMES(TestCase):
@@ -703,6 +720,10 @@ class TestCalcMeff(TestCase):
         expect = 4.66689144189144
         result = calcMeff(FASTA, seqid=0.4, refine=True)
         assert_array_almost_equal(expect, result)
+        neighbors = buildSeqidMatrix(FASTA[:, FASTA_ALPHA[0]], seqid=0.4,
+                                     omitgaps=False)
+        result = calcMeff(FASTA, seqid=0.4, refine=True, neighbors=neighbors)
+        assert_array_almost_equal(expect, result)
         result = calcMeff(FASTA, seqid=0.4, refine=True, weight=True)
         expect = (expect,
                   array([0.071428571, 0.071428571, 0.066666667, 0.083333333,
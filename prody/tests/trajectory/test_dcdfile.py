@@ -3,9 +3,10 @@
 from os.path import join
 from prody.tests import TestCase
 
+from numpy import array, concatenate
 from numpy.testing import assert_equal, assert_allclose
 
-from prody import DCDFile, writeDCD, parseDCD
+from prody import DCDFile, Trajectory, writeDCD, parseDCD
 
 from prody.tests import TEMPDIR
 from prody.tests.ensemble import ALLATOMS, ENSEMBLE, RTOL, ATOL, DCD
@@ -46,3 +47,89 @@ class TestDCDFile(TestCase):
         assert_allclose(coordsets[:n_csets], ENSEMBLE._getCoordsets(),
                         rtol=RTOL, atol=ATOL,
                         err_msg='failed to parse DCD file correctly')
+
+    def testGetCoordsetsMemmap(self):
+        writeDCD(self.dcd, DCD)
+        dcd = DCDFile(self.dcd)
+        self.assertIsNotNone(dcd._memmap)
+        coordsets = DCD._getCoordsets()
+        indices = [2, 0]
+        assert_equal(dcd.getCoordsets(indices), coordsets[[0, 2]],
+                     'failed to gather frames from memory map')
+        assert_equal(dcd.getCoordsets(slice(1, None, 2)), coordsets[1::2],
+                     'failed to slice frames from memory map')
+        dcd.setAtoms(ALLATOMS[10:20])
+        assert_equal(dcd.getCoordsets(indices), coordsets[[0, 2], 10:20],
+                     'failed to gather selected atoms from memory map')
+        sequential = DCDFile(self.dcd, memmap=False)
+        sequential.setAtoms(ALLATOMS[10:20])
+        assert_equal(sequential.getCoordsets(indices),
+                     dcd.getCoordsets(indices),
+                     'memory mapped and sequential reads do not match')
+        dcd.close()
+        sequential.close()
+
+    def testIterChunksPrefetch(self):
+        writeDCD(self.dcd, DCD)
+        second = join(TEMPDIR, 'temp2.dcd')
+        writeDCD(second, DCD)
+        traj = Trajectory(self.dcd, prefetch=1)
+        traj.addFile(second)
+        traj.setAtoms(ALLATOMS[:50])
+        coordsets = DCD._getCoordsets()
+        chunks = [chunk.copy() for chunk in traj.iterChunks(2, prefetch=2)]
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 2])
+        assert_equal(chunks[1], coordsets[[2, 0], :50],
+                     'failed to read chunks across files')
+        self.assertEqual(traj.nextIndex(), 6)
+        traj.reset()
+        frames = [frame.getCoords() for frame in traj]
+        assert_equal(frames[3:], coordsets[:, :50],
+                     'failed to iterate prefetched frames')
+        traj.close()
+
+    def testBreakPrefetch(self):
+        writeDCD(self.dcd, DCD)
+        coordsets = DCD._getCoordsets()
+        for traj in (DCDFile(self.dcd, prefetch=1),
+                     Trajectory(self.dcd, prefetch=1)):
+            for frame in traj:
+                if frame.getIndex() == 1:
+                    break
+            self.assertEqual(traj.nextIndex(), 2)
+            assert_allclose(traj.nextCoordset(), coordsets[2],
+                            rtol=RTOL, atol=ATOL,
+                            err_msg='failed to continue after breaking')
+            traj.close()
+
+    def testReadFramesSequentially(self):
+        writeDCD(self.dcd, DCD)
+        dcd = DCDFile(self.dcd)
+        # frame records that cannot be decoded in bulk, such as those of
+        # 64 bit files, are read one by one
+        dcd._is64bit = True
+        chunks = [chunk.copy() for chunk in dcd.iterChunks(2, prefetch=1)]
+        assert_allclose(concatenate(chunks), DCD._getCoordsets(),
+                        rtol=RTOL, atol=ATOL,
+                        err_msg='failed to read frames one by one')
+        self.assertEqual(dcd.nextIndex(), len(DCD))
+        dcd.close()
+
+    def testMixedUnitcells(self):
+        coordsets = DCD._getCoordsets()
+        unitcell = array([10., 20., 30., 90., 90., 90.])
+        dcd = DCDFile(self.dcd, 'w')
+        for coords in coordsets:
+            dcd.write(coords, unitcell)
+        dcd.close()
+        second = join(TEMPDIR, 'temp2.dcd')
+        writeDCD(second, DCD)
+        unitcells = []
+        for prefetch in (0, 1):
+            traj = Trajectory(self.dcd, prefetch=prefetch)
+            traj.addFile(second)
+            unitcells.append([frame.getUnitcell() for frame in traj])
+            traj.close()
+        self.assertEqual([cell is None for cell in unitcells[1]],
+                         [False] * len(DCD) + [True] * len(DCD))
+        assert_allclose(unitcells[1][:len(DCD)], unitcells[0][:len(DCD)])
@@ -5,6 +5,7 @@
 
 import os
 from time import time
+from numbers import Integral
 from struct import calcsize, unpack, pack
 from os.path import getsize
 import datetime
@@ -35,6 +36,21 @@ PISQUARE = np.pi ** 2
 RECSCALE32BIT = 1
 RECSCALE64BIT = 2
 
+def _convertUnitcells(unitcells):
+    """Returns unit cell lengths and angles, in the order that ProDy uses,
+    for unit cell records read from a DCD file.  *unitcells* may be a single
+    record or an array of records."""
+
+    unitcells = unitcells[..., [0, 2, 5, 1, 3, 4]]
+    # Files generated by CHARMM, or by NAMD > 2.5, store the cosines of the
+    # periodic cell angles, which improves rounding behavior for orthogonal
+    # cells so that the angles end up at precisely 90 degrees, unlike acos()
+    cosines = np.all(abs(unitcells[..., 3:]) <= 1, axis=-1)
+    angles = unitcells[..., 3:]
+    angles[cosines] = 90. - np.arcsin(angles[cosines]) * 90 / PISQUARE
+    return unitcells
+
+
 class DCDFile(TrajFile):
 
     """A class for reading and writing DCD files. DCD header and first frame
@@ -42,14 +58,25 @@ class DCDFile(TrajFile):
     the reference coordinate set.  This class has been tested for 32-bit DCD
     files.  32-bit floating-point coordinate array can be casted automatically
     to a specified type, such as 64-bit float, using *astype* keyword argument,
-    i.e. ``astype=float``, using :meth:`ndarray.astype` method."""
+    i.e. ``astype=float``, using :meth:`ndarray.astype` method.
+
+    Files opened for reading are also memory mapped, unless ``memmap=False``
+    is passed, so that :meth:`getCoordsets` gathers requested frames and
+    selected atoms directly from the mapped file without reading frames one
+    at a time.  Passing ``prefetch=k`` makes iterating over frames read
+    *k* chunks of frames ahead on a background thread (see
+    :meth:`~.TrajBase.iterChunks`)."""
 
     def __init__(self, filename, mode='rb', **kwargs):
 
         TrajFile.__init__(self, filename, mode)
         self._astype = kwargs.get('astype', None)
+        self._prefetch = int(kwargs.get('prefetch', 0))
+        self._memmap = None
         if not self._mode.startswith('w'):
             self._parseHeader()
+            if self._mode == 'rb' and kwargs.get('memmap', True):
+                self._memmap = self._mapFrames()
 
     __init__.__doc__ = TrajFile.__init__.__doc__
 
@@ -222,6 +249,73 @@ class DCDFile(TrajFile):
         self._file.seek(self._first_byte)
         self._nfi = 0
 
+    def _getFrameDtype(self):
+        """Returns a structured dtype for frame records with fields for unit
+        cell (*unitcell*) and coordinate (*xyz*) data.  *xyz* field has shape
+        (3, n_atoms+2), as the first and last items of each row are Fortran
+        record markers."""
+
+        endian = self._endian
+        if isinstance(endian, bytes):
+            endian = endian.decode()
+        endian = endian or '='
+        fields = []
+        if self._unitcell:
+            fields.extend([('uc_start', endian + 'i4'),
+                           ('unitcell', endian + 'f8', (6,)),
+                           ('uc_end', endian + 'i4')])
+        fields.append(('xyz', endian + 'f4', (3, self._n_atoms + 2)))
+        return np.dtype(fields)
+
+    def _mapFrames(self):
+        """Returns a memory map of frame records (see :meth:`_getFrameDtype`),
+        or **None** when the file cannot be mapped."""
+
+        if self._is64bit or not self._n_csets:
+            return None
+        dtype = self._getFrameDtype()
+        if dtype.itemsize != self._bytes_per_frame:
+            return None
+        try:
+            return np.memmap(self._filename, dtype=dtype, mode='r',
+                             offset=self._first_byte, shape=(self._n_csets,))
+        except (IOError, OSError, ValueError) as err:
+            LOGGER.warning('DCD file could not be memory mapped ({0}), '
+                           'frames will be read sequentially.'.format(err))
+            return None
+
+    def _readFrames(self, coords, unitcells=None):
+
+        n = min(len(coords), self._n_csets - self._nfi)
+        if n <= 0:
+            return 0
+        dtype = self._getFrameDtype()
+        if self._is64bit or dtype.itemsize != self._bytes_per_frame:
+            # frame records that do not match the dtype are read one by one
+            n_atoms = self._n_atoms
+            n_floats = self._n_floats
+            for i in range(n):
+                unitcell = self._nextUnitcell()
+                xyz = np.frombuffer(self._file.read(self._itemsize * n_floats),
+                                    self._dtype)
+                if len(xyz) != n_floats:
+                    return i
+                coords[i] = xyz.reshape((3, n_atoms + 2))[:, 1:-1].T
+                if unitcells is not None and unitcell is not None:
+                    unitcells[i] = unitcell
+                self._nfi += 1
+            return n
+        data = self._file.read(n * self._bytes_per_frame)
+        n = len(data) // self._bytes_per_frame
+        records = np.frombuffer(data, dtype, n)
+        coords[:n] = records['xyz'][:, :, 1:-1].transpose(0, 2, 1)
+        if unitcells is not None and self._unitcell:
+            unitcells[:n] = _convertUnitcells(records['unitcell'])
+        self._nfi += n
+        return n
+
+    _readFrames.__doc__ = TrajBase._readFrames.__doc__
+
     def hasUnitcell(self):
 
         return self._unitcell
@@ -292,15 +386,8 @@ class DCDFile(TrajFile):
         if self._unitcell:
             self._file.read(4)
             unitcell = fromstring(self._file.read(48), dtype=np.float64)
-            unitcell = unitcell[[0,2,5,1,3,4]]
-            if np.all(abs(unitcell[3:]) <= 1):
-                # This file was generated by CHARMM, or by NAMD > 2.5, with the angle */
-                # cosines of the periodic cell angles written to the DCD file.        */
-                # This formulation improves rounding behavior for orthogonal cells    */
-                # so that the angles end up at precisely 90 degrees, unlike acos().   */
-                unitcell[3:] = 90. - np.arcsin(unitcell[3:]) * 90 / PISQUARE
             self._file.read(4)
-            return unitcell
+            return _convertUnitcells(unitcell)
 
     def getCoordsets(self, indices=None):
         """Returns coordinate sets at given *indices*. *indices* may be an
@@ -309,6 +396,8 @@ class DCDFile(TrajFile):
 
         if self._closed:
             raise ValueError('I/O operation on closed file')
+        if self._memmap is not None:
+            return self._gatherCoordsets(indices)
         if (self._indices is None and
             (indices is None or indices == slice(None))):
             nfi = self._nfi
@@ -338,6 +427,48 @@ class DCDFile(TrajFile):
 
     getCoordsets.__doc__ = TrajBase.getCoordsets.__doc__
 
+    def _gatherCoordsets(self, indices):
+        """Returns coordinate sets at *indices* for selected atoms, copied
+        from the memory map in a single gather into a (n_sets, n_atoms, 3)
+        array."""
+
+        n_csets = self._n_csets
+        if indices is None:
+            indices = slice(None)
+        if isinstance(indices, Integral):
+            if indices < 0:
+                indices += n_csets
+            if not 0 <= indices < n_csets:
+                raise IndexError('index {0} is out of range'.format(indices))
+            indices = slice(indices, indices + 1)
+        elif isinstance(indices, slice):
+            start, stop, step = indices.indices(n_csets)
+            if step < 0:
+                # frames are returned in file order
+                indices = np.arange(start, stop, step)[::-1]
+        elif isinstance(indices, (list, np.ndarray)):
+            indices = np.unique(indices)
+            if len(indices) and (indices[0] < 0 or indices[-1] >= n_csets):
+                raise IndexError('indices must be between 0 and {0}'
+                                 .format(n_csets - 1))
+        else:
+            raise TypeError('indices must be an integer or a list of integers')
+
+        xyz = self._memmap['xyz']
+        atoms = self._indices
+        if atoms is None:
+            if isinstance(indices, slice):
+                xyz = xyz[indices, :, 1:-1]
+            else:
+                xyz = xyz[indices][:, :, 1:-1]
+            return np.array(xyz.transpose(0, 2, 1),
+                            self._astype or self._dtype, order='C')
+        if isinstance(indices, slice):
+            indices = np.arange(*indices.indices(n_csets))
+        # skip record marker preceding the first atom
+        xyz = xyz[indices[:, None, None], np.arange(3), atoms[:, None] + 1]
+        return np.asarray(xyz, self._astype or self._dtype)
+
     def write(self, coords, unitcell=None, **kwargs):
         """Write *coords* to a file open in 'a' or 'w' mode.  *coords* may be
         a NUmpy array or a ProDy object that stores or points to coordinate
@@ -463,6 +594,13 @@ class DCDFile(TrajFile):
             dcd.seek(0, 2)
         self._nfi = self._n_csets
 
+    def close(self):
+
+        self._memmap = None
+        TrajFile.close(self)
+
+    close.__doc__ = TrajBase.close.__doc__
+
     def flush(self):
         """Flush the internal output buffer."""
 
@@ -2,6 +2,9 @@
 """This module defines base class for trajectory handling."""
 
 from numbers import Integral
+from threading import Thread, Event
+
+import numpy as np
 from numpy import ndarray, unique
 
 from prody.ensemble import Ensemble
@@ -9,6 +12,11 @@ from prody.utilities import checkCoords, checkWeights
 
 from .frame import Frame
 
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
+
 __all__ = ['TrajBase']
 
 
@@ -30,13 +38,53 @@ class TrajBase(object):
         self._frame = None # if atoms are set, always return the same frame
         self._nfi = 0
         self._closed = False
+        self._prefetch = 0 # number of chunks read ahead during iteration
 
     def __iter__(self):
 
         if self._closed:
             raise ValueError('I/O operation on closed file')
-        while self._nfi < self._n_csets:
-            yield next(self)
+        if self._prefetch and not self._mixesUnitcells():
+            frames = self._iterPrefetched()
+            try:
+                for frame in frames:
+                    yield frame
+            finally:
+                frames.close()
+        else:
+            while self._nfi < self._n_csets:
+                yield next(self)
+
+    def _iterPrefetched(self):
+        """Yield frames decoded in chunks on a background thread.  The next
+        frame index is left after the last yielded frame."""
+
+        index = self._nfi
+        size = max(1, min(100, 2 ** 24 // (12 * max(self._n_atoms, 1))))
+        ag = self._ag
+        blocks = self._iterBlocks(size, self._prefetch)
+        try:
+            for coords, unitcells, n in blocks:
+                for i in range(n):
+                    # frames are copied out, as buffers are reused for later
+                    # chunks
+                    unitcell = (None if unitcells is None else
+                                unitcells[i].copy())
+                    if ag is None:
+                        frame = Frame(self, index, coords[i].copy(), unitcell)
+                    else:
+                        ag._setCoords(coords[i].copy(),
+                                      self._title + ' frame ' + str(index),
+                                      overwrite=True)
+                        frame = self._frame
+                        Frame.__init__(frame, self, index, None, unitcell)
+                    index += 1
+                    yield frame
+        finally:
+            # blocks are closed first, as they leave the next frame index
+            # after the last chunk that was read
+            blocks.close()
+            self.goto(index)
 
     def __str__(self):
 
@@ -306,6 +354,125 @@ class TrajBase(object):
         while self._nfi < self._n_csets:
             yield self.nextCoordset()
 
+    def iterChunks(self, size=100, prefetch=0):
+        """Yield coordinate sets for (selected) atoms in arrays of up to
+        *size* frames.  Iteration starts from the next frame in line and
+        crosses file boundaries.  When *prefetch* is greater than zero,
+        following chunks are read and decoded on a background thread while
+        the current one is processed, and up to *prefetch* of them are kept
+        ready.  Arrays are reused for later chunks, so a chunk needs to be
+        copied if it will be used after the next one is requested.  The
+        trajectory should not be accessed otherwise until iteration is over.
+
+        :arg size: maximum number of frames in a chunk, default is 100
+        :type size: int
+
+        :arg prefetch: number of chunks to read ahead, default is 0
+        :type prefetch: int"""
+
+        if self._closed:
+            raise ValueError('I/O operation on closed file')
+        for coords, unitcells, n in self._iterBlocks(size, prefetch,
+                                                     self._indices):
+            yield coords[:n]
+
+    def _iterBlocks(self, size, prefetch=0, indices=None):
+        """Yield ``(coords, unitcells, n_frames)`` for chunks of up to *size*
+        frames read from a ring of ``prefetch + 1`` reusable buffers.  When
+        *indices* are given, only coordinates of those atoms are stored.  The
+        next frame index is left after the last yielded frame."""
+
+        size = int(size)
+        if size < 1:
+            raise ValueError('size must be a positive integer')
+        prefetch = int(prefetch)
+        if prefetch < 0:
+            raise ValueError('prefetch must be a non-negative integer')
+        n_atoms = self._n_atoms
+        n_selected = n_atoms if indices is None else len(indices)
+        dtype = self._getDtype()
+        unitcell = self.hasUnitcell()
+        blocks = [(np.zeros((size, n_selected, 3), dtype),
+                   np.zeros((size, 6)) if unitcell else None)
+                  for i in range(prefetch + 1)]
+        if indices is not None:
+            buffer = np.zeros((size, n_atoms, 3), dtype)
+
+        def read(block):
+            coords, unitcells = block
+            if indices is None:
+                return self._readFrames(coords, unitcells)
+            n = self._readFrames(buffer, unitcells)
+            np.take(buffer[:n], indices, 1, out=coords[:n])
+            return n
+
+        if not prefetch:
+            block = blocks[0]
+            while True:
+                n = read(block)
+                if not n:
+                    break
+                yield block + (n,)
+            return
+
+        nfi = self._nfi
+        free = Queue()
+        ready = Queue()
+        for block in blocks:
+            free.put(block)
+        stop = Event()
+
+        def produce():
+            try:
+                while not stop.is_set():
+                    block = free.get()
+                    if block is None:
+                        break
+                    n = read(block)
+                    ready.put((block, n))
+                    if not n:
+                        break
+            except Exception as err:
+                ready.put((None, err))
+
+        thread = Thread(target=produce)
+        thread.daemon = True
+        thread.start()
+        try:
+            while True:
+                block, n = ready.get()
+                if block is None:
+                    raise n
+                if not n:
+                    break
+                nfi += n
+                yield block + (n,)
+                free.put(block)
+        finally:
+            stop.set()
+            free.put(None)
+            thread.join()
+            self.goto(nfi)
+
+    def _mixesUnitcells(self):
+        """Returns **True** when only some frames have unit cells, in which
+        case frames are not prefetched during iteration."""
+
+        return False
+
+    def _readFrames(self, coords, unitcells=None):
+        """Read coordinates of all atoms for the next ``len(coords)`` frames
+        into *coords*, and their unit cells into *unitcells* when it is not
+        **None**, and return the number of frames read.  Unlike
+        :meth:`nextCoordset`, linked atoms are not updated."""
+
+        pass
+
+    def _getDtype(self):
+        """Returns data type of coordinates read from the trajectory."""
+
+        pass
+
     def getCoordsets(self, indices=None):
         """Returns coordinate sets at given *indices*. *indices* may be an
         integer, a list of ordered integers or **None**. **None** returns all
@@ -20,7 +20,9 @@ class Trajectory(TrajBase):
     def __init__(self, name, **kwargs):
         """Trajectory can be instantiated with a *name* or a filename. When
         name is a valid path to a trajectory file it will be opened for
-        reading."""
+        reading.  Passing ``prefetch=k`` makes iterating over frames read *k*
+        chunks of frames ahead on a background thread, across file
+        boundaries (see :meth:`~.TrajBase.iterChunks`)."""
 
         TrajBase.__init__(self, name)
         self._trajectory = None
@@ -29,6 +31,7 @@ class Trajectory(TrajBase):
         self._n_files = 0
         self._cfi = 0 # current file index
         assert 'mode' not in kwargs, 'mode is an invalid keyword argument'
+        self._prefetch = int(kwargs.pop('prefetch', 0))
         self._kwargs = kwargs
         if os.path.isfile(name):
             self.addFile(name)
@@ -154,20 +157,20 @@ class Trajectory(TrajBase):
             raise TypeError('indices must be an integer or a list of '
                             'integers')
 
-        nfi = self._nfi
-        self.reset()
-        coords = np.zeros((len(indices), self.numSelected(), 3),
-                          self._trajectories[0]._dtype)
-        prev = -1
-        next = self.nextCoordset
-        for i, index in enumerate(indices):
-            diff = index - prev
-            if diff > 1:
-                self.skip(diff - 1)
-            coords[i] = next()
-            prev = index
-        self.goto(nfi)
-        return coords
+        # each file gathers its own frames, so that memory mapped files
+        # are read without iterating over frames
+        coords = []
+        first = 0
+        for traj in self._trajectories:
+            last = first + traj.numFrames()
+            which = indices[(indices >= first) & (indices < last)]
+            if len(which):
+                coords.append(traj.getCoordsets(which - first))
+            first = last
+        if not coords:
+            return np.zeros((0, self.numSelected(), 3),
+                            self._trajectories[0]._dtype)
+        return np.concatenate(coords)
 
     getCoordsets.__doc__ = TrajBase.getCoordsets.__doc__
 
@@ -216,6 +219,32 @@ class Trajectory(TrajBase):
 
     nextCoordset.__doc__ = TrajBase.nextCoordset.__doc__
 
+    def _readFrames(self, coords, unitcells=None):
+
+        n = 0
+        while n < len(coords) and self._nfi < self._n_csets:
+            traj = self._trajectory
+            while traj._nfi == traj._n_csets:
+                self._nextFile()
+                traj = self._trajectory
+            if unitcells is None or not traj.hasUnitcell():
+                m = traj._readFrames(coords[n:])
+            else:
+                m = traj._readFrames(coords[n:], unitcells[n:])
+            if not m:
+                break
+            n += m
+            self._nfi += m
+        return n
+
+    _readFrames.__doc__ = TrajBase._readFrames.__doc__
+
+    def _getDtype(self):
+
+        return self._trajectories[0]._getDtype()
+
+    _getDtype.__doc__ = TrajBase._getDtype.__doc__
+
     def goto(self, n):
 
         if self._closed:
@@ -291,6 +320,13 @@ class Trajectory(TrajBase):
 
     hasUnitcell.__doc__ = TrajBase.hasUnitcell.__doc__
 
+    def _mixesUnitcells(self):
+
+        unitcells = [traj.hasUnitcell() for traj in self._trajectories]
+        return any(unitcells) and not all(unitcells)
+
+    _mixesUnitcells.__doc__ = TrajBase._mixesUnitcells.__doc__
+
     def getTimestep(self):
         """Returns list of timestep sizes, one number from each file."""
 
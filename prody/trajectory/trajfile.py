@@ -53,6 +53,7 @@ class TrajFile(TrajBase):
         self._bytes_per_frame = None
         self._first_byte = None
         self._dtype = np.float32
+        self._astype = None
 
         self._timestep = 1
         self._first_ts = 0
@@ -140,7 +141,7 @@ class TrajFile(TrajBase):
         n_atoms = self.numSelected()
         coords = np.zeros((len(indices), n_atoms, 3), self._dtype)
 
-        prev = 0
+        prev = -1
         next = self.nextCoordset
         for i, index in enumerate(indices):
             diff = index - prev
@@ -160,6 +161,12 @@ class TrajFile(TrajBase):
 
     getCoordsets.__doc__ = TrajBase.getCoordsets.__doc__
 
+    def _getDtype(self):
+
+        return np.dtype(self._astype or self._dtype)
+
+    _getDtype.__doc__ = TrajBase._getDtype.__doc__
+
     def skip(self, n):
 
         if self._closed:
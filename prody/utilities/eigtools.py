@@ -8,10 +8,132 @@ __all__ = ['solveEig', 'ZERO']
 
 ZERO = 1e-6
 
-def solveEig(M, n_modes=None, zeros=False, turbo=True, expct_n_zeros=None, reverse=False):
+SOLVERS = ('auto', 'dense', 'arpack-shift-invert', 'lobpcg')
+
+def _issparse(M):
+    try:
+        from scipy.sparse import issparse
+    except ImportError:
+        return False
+    return issparse(M)
+
+def _importSparseLA():
+    try:
+        from scipy.sparse import linalg as scipy_sparse_la
+    except ImportError:
+        raise ImportError('failed to import scipy.sparse.linalg, '
+                          'which is required for sparse matrix '
+                          'decomposition')
+    return scipy_sparse_la
+
+def _checkNullspace(M, nullspace):
+    """Returns an orthonormal basis for *nullspace* vectors if they are in the
+    null space of *M*, otherwise returns **None**."""
+
+    if nullspace is None:
+        return None
+    nullspace = np.asarray(nullspace, float)
+    if nullspace.ndim == 1:
+        nullspace = nullspace.reshape((-1, 1))
+    if nullspace.ndim != 2 or nullspace.shape[0] != M.shape[0]:
+        LOGGER.debug('Shape of null space vectors does not match the matrix, '
+                     'no deflation is performed.')
+        return None
+
+    u, s, _ = np.linalg.svd(nullspace, full_matrices=False)
+    basis = u[:, s > ZERO * max(s.max(), 1.)] if len(s) else u[:, :0]
+    residual = np.abs(M.dot(basis)).max() if basis.size else 0.
+    scale = np.abs(M.diagonal()).max() if M.shape[0] else 1.
+    if residual > ZERO * max(scale, 1.):
+        LOGGER.debug('Given vectors are not in the null space of the matrix, '
+                     'no deflation is performed.')
+        return None
+    return basis
+
+def _getStartVectors(v0, dof, k, basis=None):
+    """Returns *k* start vectors for an iterative solver, reusing columns of
+    *v0* and filling the remaining ones with random vectors."""
+
+    X = np.random.rand(dof, k) - 0.5
+    if v0 is not None:
+        v0 = np.asarray(v0, float)
+        if v0.ndim == 1:
+            v0 = v0.reshape((-1, 1))
+        if v0.shape[0] == dof:
+            n = min(k, v0.shape[1])
+            X[:, :n] = v0[:, :n]
+        else:
+            LOGGER.debug('Shape of start vectors does not match the matrix, '
+                         'random start vectors are used.')
+    if basis is not None and basis.size:
+        X -= np.dot(basis, np.dot(basis.T, X))
+    return X
+
+def _lobpcgTol(M):
+    """Returns default residual tolerance for LOBPCG, which is tighter than
+    the Scipy default so that eigenvalues match those from ARPACK."""
+
+    return 1e-8 * max(np.abs(M.diagonal()).max(), 1.)
+
+def solveEig(M, n_modes=None, zeros=False, turbo=True, expct_n_zeros=None, reverse=False, **kwargs):
+    """Returns eigenvalues, eigenvectors and inverse eigenvalues of symmetric
+    matrix *M*, which may be a :class:`numpy.ndarray` or a sparse matrix.
+
+    :arg solver: eigensolver, one of ``'auto'``, ``'dense'``,
+        ``'arpack-shift-invert'`` and ``'lobpcg'``, default is ``'auto'``,
+        which uses a dense solver for arrays, and for sparse matrices LOBPCG
+        when start vectors are given and ARPACK in shift-invert mode
+        otherwise
+    :type solver: str
+
+    :arg sigma: shift used in shift-invert mode, default is a small negative
+        number proportional to the mean of the diagonal of *M*, which keeps
+        the shifted matrix non-singular for positive semi-definite matrices
+    :type sigma: float
+
+    :arg nullspace: vectors known to be in the null space of *M*, e.g. rigid
+        body motions, which are deflated analytically by iterative solvers
+        and returned as zero modes
+    :type nullspace: :class:`numpy.ndarray`
+
+    :arg v0: start vectors, e.g. eigenvectors from a previous calculation,
+        used as a warm start by iterative solvers
+    :type v0: :class:`numpy.ndarray`
+
+    :arg tol: convergence tolerance of iterative solvers, for LOBPCG default
+        is a residual norm of 1e-8 times the largest diagonal element
+    :type tol: float
+
+    :arg maxiter: maximum number of iterations of iterative solvers
+    :type maxiter: int
+
+    When all modes are requested from an iterative solver, the matrix is
+    converted to a dense array and decomposed by a dense solver."""
+
     linalg = importLA()
     dof = M.shape[0]
 
+    solver = str(kwargs.pop('solver', 'auto')).lower()
+    if solver not in SOLVERS:
+        raise ValueError('solver must be one of {0}'
+                         .format(', '.join(repr(s) for s in SOLVERS)))
+    sigma = kwargs.pop('sigma', None)
+    v0 = kwargs.pop('v0', None)
+    if solver == 'auto':
+        if not _issparse(M):
+            solver = 'dense'
+        elif v0 is not None:
+            solver = 'lobpcg'
+        else:
+            solver = 'arpack-shift-invert'
+
+    tol = kwargs.pop('tol', None)
+    maxiter = kwargs.pop('maxiter', None)
+    nullspace = kwargs.pop('nullspace', None)
+    basis = None
+    if solver != 'dense' and nullspace is not None:
+        basis = _checkNullspace(M, nullspace)
+
     if expct_n_zeros is None:
         expct_n_zeros = 0
         warn_zeros = False
@@ -31,21 +153,98 @@ def solveEig(M, n_modes=None, zeros=False, turbo=True, expct_n_zeros=None, rever
             else:
                 eigvals = (0, n_modes+expct_n_zeros-1)
 
+    def _dense(M):
+        return M.toarray() if _issparse(M) else M
+
+    def _smallest(M, k):
+        """Returns *k* smallest eigenvalues and eigenvectors using the
+        selected iterative solver."""
+
+        scipy_sparse_la = _importSparseLA()
+
+        m = 0 if basis is None else basis.shape[1]
+        if m:
+            basis_values = (basis * M.dot(basis)).sum(0)
+            if k <= m:
+                return basis_values[:k], basis[:, :k]
+        k_ = k - m
+
+        if solver == 'lobpcg' and dof - m < 5 * k_:
+            # LOBPCG would switch to a dense solver that ignores constraints
+            LOGGER.debug('Too many eigenvalues requested for LOBPCG, a dense '
+                         'solver is used.')
+            return linalg.eigh(_dense(M), eigvals=(0, k - 1))
+
+        if solver == 'lobpcg':
+            from scipy.sparse import diags
+            diagonal = np.abs(M.diagonal()).astype(float)
+            diagonal[diagonal < ZERO] = 1.
+            precond = diags(1. / diagonal)
+            X = _getStartVectors(v0, dof, k_, basis)
+            values, vectors = scipy_sparse_la.lobpcg(
+                M, X, M=precond, Y=basis if m else None,
+                tol=tol or _lobpcgTol(M), maxiter=maxiter or 1000,
+                largest=False)
+        else:
+            from scipy.sparse import csc_matrix, identity
+            shift = sigma
+            if shift is None:
+                shift = -1e-3 * max(np.abs(M.diagonal()).mean(), ZERO)
+            lu = scipy_sparse_la.splu(csc_matrix(M) -
+                                      shift * identity(dof, format='csc'),
+                                      permc_spec='MMD_AT_PLUS_A')
+            if m:
+                def solve(x):
+                    x = x - np.dot(basis, np.dot(basis.T, x))
+                    x = lu.solve(x)
+                    return x - np.dot(basis, np.dot(basis.T, x))
+            else:
+                solve = lu.solve
+            OPinv = scipy_sparse_la.LinearOperator((dof, dof), matvec=solve,
+                                                   dtype=float)
+            start = None
+            if v0 is not None:
+                start = _getStartVectors(v0, dof, 1 if np.ndim(v0) < 2 else
+                                         np.shape(v0)[1], basis).sum(1)
+            values, vectors = scipy_sparse_la.eigsh(
+                M, k=k_, sigma=shift, which='LM', OPinv=OPinv, v0=start,
+                tol=tol or 0, maxiter=maxiter)
+
+        if m:
+            values = np.concatenate((basis_values, values))
+            vectors = np.hstack((basis, vectors))
+        order = values.argsort()
+        return values[order], vectors[:, order]
+
+    def _largest(M, k):
+        """Returns *k* largest eigenvalues and eigenvectors in ascending
+        order using the selected iterative solver."""
+
+        scipy_sparse_la = _importSparseLA()
+        if solver == 'lobpcg':
+            X = _getStartVectors(v0, dof, k)
+            values, vectors = scipy_sparse_la.lobpcg(
+                M, X, tol=tol or _lobpcgTol(M), maxiter=maxiter or 1000,
+                largest=True)
+        else:
+            start = None
+            if v0 is not None:
+                start = _getStartVectors(v0, dof, 1 if np.ndim(v0) < 2 else
+                                         np.shape(v0)[1]).sum(1)
+            values, vectors = scipy_sparse_la.eigsh(M, k=k, which='LA',
+                                                    v0=start, tol=tol or 0,
+                                                    maxiter=maxiter)
+        order = values.argsort()
+        return values[order], vectors[:, order]
+
     def _eigh(M, eigvals=None, turbo=True):
         if linalg.__package__.startswith('scipy'):
-            from scipy.sparse import issparse
-
             if eigvals:
                 turbo = False
-            if not issparse(M):
-                values, vectors = linalg.eigh(M, turbo=turbo, eigvals=eigvals)
+            if solver == 'dense':
+                values, vectors = linalg.eigh(_dense(M), turbo=turbo,
+                                              eigvals=eigvals)
             else:
-                try:
-                    from scipy.sparse import linalg as scipy_sparse_la
-                except ImportError:
-                    raise ImportError('failed to import scipy.sparse.linalg, '
-                                      'which is required for sparse matrix '
-                                      'decomposition')
                 if eigvals:
                     j = eigvals[0]
                     k = eigvals[-1] + 1
@@ -53,35 +252,36 @@ def solveEig(M, n_modes=None, zeros=False, turbo=True, expct_n_zeros=None, rever
                     j = 0
                     k = dof
 
-                if k >= dof:
-                    k -= 1
-                    LOGGER.warning('Cannot calculate all eigenvalues for sparse matrices, thus '
-                                   'the last eigenvalue is omitted. See scipy.sparse.linalg.eigsh '
-                                   'for more information')
-                values, vectors = scipy_sparse_la.eigsh(M, k=k, which='SA')
-                values = values[j:k]
-                vectors = vectors[:, j:k]
+                if reverse and k == dof and 0 < j < dof - 1:
+                    values, vectors = _largest(M, dof - j)
+                elif k >= dof - 1:
+                    LOGGER.debug('Too many eigenvalues requested for an '
+                                 'iterative solver, a dense solver is used.')
+                    values, vectors = linalg.eigh(_dense(M), eigvals=eigvals)
+                    return values, vectors
+                else:
+                    values, vectors = _smallest(M, k)
+                    values = values[j:k]
+                    vectors = vectors[:, j:k]
         else:
             if n_modes is not None:
                 LOGGER.info('Scipy is not found, all modes were calculated.')
-            else:
-                n_modes = dof
-            values, vectors = linalg.eigh(M)
+            values, vectors = linalg.eigh(_dense(M))
         return values, vectors
 
     def _calc_n_zero_modes(M):
-        from scipy.sparse import issparse
-
-        if not issparse(M):
-            w = linalg.eigvalsh(M)
+        if (solver == 'dense' or dof < 4 or
+                not linalg.__package__.startswith('scipy')):
+            w = linalg.eigvalsh(_dense(M))
         else:
-            try:
-                from scipy.sparse import linalg as scipy_sparse_la
-            except ImportError:
-                raise ImportError('failed to import scipy.sparse.linalg, '
-                                    'which is required for sparse matrix '
-                                    'decomposition')
-            w, _ = scipy_sparse_la.eigsh(M, k=dof-1, which='SA')
+            # increase the number of eigenvalues until a non-zero one is found
+            # instead of decomposing the whole matrix
+            k = min(2 * (n_modes + expct_n_zeros), dof - 2)
+            while True:
+                w = _smallest(M, k)[0]
+                if (w >= ZERO).any() or k >= dof - 2:
+                    break
+                k = min(2 * k, dof - 2)
         n_zeros = sum(w < ZERO)
         return n_zeros
 
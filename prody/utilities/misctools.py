@@ -592,17 +592,27 @@ def fixArraySize(arr, sizes, value=0):
     return arr2
 
 def isSymmetric(M, rtol=1e-05, atol=1e-08):
-    """Checks if the matrix is symmetric."""
+    """Checks if the matrix is symmetric.  *M* may be a sparse matrix."""
     if M.shape != M.T.shape:
         return False
+
+    from scipy.sparse import issparse
+    if issparse(M):
+        diff = abs(M - M.T) - rtol * abs(M.T)
+        return diff.nnz == 0 or diff.max() <= atol
     return allclose(M, M.T, rtol=rtol, atol=atol)
 
 def makeSymmetric(M):
-    """Makes sure the matrix is symmetric."""
-    
+    """Makes sure the matrix is symmetric.  Sparse matrices are returned in
+    compressed sparse row format."""
+
     if isSymmetric(M):
         return M
 
+    from scipy.sparse import issparse
+    if issparse(M):
+        return _makeSymmetricSparse(M)
+
     # make square 
     n, m = M.shape
     l = max((n, m))
@@ -620,6 +630,27 @@ def makeSymmetric(M):
         M = (M + M.T) / 2.
     return M
 
+def _makeSymmetricSparse(M):
+
+    from scipy.sparse import coo_matrix, triu as sptriu, tril as sptril
+
+    # make square
+    l = max(M.shape)
+    M = M.tocoo()
+    M = coo_matrix((M.data, (M.row, M.col)), shape=(l, l)).tocsr()
+
+    # determine which part of the matrix has values
+    U = sptriu(M, k=1)
+    L = sptril(M, k=-1)
+
+    if U.sum() == 0:
+        M = M + L.T
+    elif L.sum() == 0:
+        M = M + U.T
+    else:
+        M = (M + M.T) / 2.
+    return M.tocsr()
+
 def index(A, a):
     if isinstance(A, list):
         return A.index(a)
@@ -50,6 +50,18 @@ if PY3K:
             else:
                 return ''
 
+        def __next__(self):
+
+            # iterating streams lines from the file, unless they were already
+            # read into memory by readline
+            if getattr(self, '_lines', None) is None:
+                line = io.TextIOWrapper.readline(self)
+            else:
+                line = self.readline()
+            if not line:
+                raise StopIteration
+            return line
+
         def readlines(self, size=None):
 
             lines = self._getlines()